@@ -0,0 +1,130 @@
+# box_back/box_back/app/algorithms.py
+import hashlib
+import os
+import threading
+import time
+from collections import namedtuple
+
+from django.conf import settings
+from django.db import transaction
+
+from .models import ActiveAlgorithm, AlgorithmVersion
+
+BUILTIN_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'packing_algorithm.py')
+
+# 当前激活的算法：version_id 为空表示部署的 packing_algorithm.py；
+# sha256 为源码的哈希，用作缓存键中的算法版本
+ActiveVersion = namedtuple('ActiveVersion', ['version_id', 'sha256', 'source'])
+
+# 影子运行的候选版本，sample_rate 为参与比较的请求比例
+ShadowVersion = namedtuple('ShadowVersion', ['version_id', 'sha256', 'source', 'sample_rate'])
+
+_lock = threading.Lock()
+_builtin = {'stat': None, 'sha256': None}
+_active = {'checked_at': None, 'value': None, 'shadow': None}
+
+
+def builtin_version():
+    """部署的算法文件内容的哈希；文件未变化时直接返回上次的结果"""
+    st = os.stat(BUILTIN_PATH)
+    stat_key = (st.st_mtime_ns, st.st_size)
+    with _lock:
+        if _builtin['stat'] == stat_key:
+            return _builtin['sha256']
+    with open(BUILTIN_PATH, 'rb') as f:
+        value = hashlib.sha256(f.read()).hexdigest()
+    with _lock:
+        _builtin['stat'] = stat_key
+        _builtin['sha256'] = value
+    return value
+
+
+def source_sha256(source):
+    return hashlib.sha256(source.encode('utf-8')).hexdigest()
+
+
+def active_version():
+    """
+    返回当前激活的算法版本 (ActiveVersion)
+
+    每 ALGORITHM_POLL_INTERVAL 秒至多查询一次数据库中的指针；指针变化时读取新版本的
+    源码并整体替换，同一请求应只调用一次并把结果传给后续的计算。
+    """
+    now = time.monotonic()
+    with _lock:
+        checked_at, current = _active['checked_at'], _active['value']
+    if checked_at is not None and now - checked_at < settings.ALGORITHM_POLL_INTERVAL:
+        if current.version_id is not None or current.sha256 == builtin_version():
+            return current
+
+    pointer = (ActiveAlgorithm.objects.filter(pk=ActiveAlgorithm.SINGLETON_ID)
+               .values_list('version_id', 'version__sha256', 'shadow_version_id', 'shadow_version__sha256',
+                            'shadow_rate').first())
+    version_id, sha256, shadow_id, shadow_sha256, shadow_rate = pointer or (None, None, None, None, 0)
+    if version_id is None:
+        value = ActiveVersion(None, builtin_version(), None)
+    elif current is not None and current.version_id == version_id:
+        value = current
+    else:
+        source = AlgorithmVersion.objects.values_list('source', flat=True).get(pk=version_id)
+        value = ActiveVersion(version_id, sha256, source)
+
+    with _lock:
+        shadow = _active['shadow']
+    if shadow_id is None or shadow_rate <= 0:
+        shadow = None
+    elif shadow is not None and shadow.version_id == shadow_id:
+        shadow = shadow._replace(sample_rate=shadow_rate)
+    else:
+        source = AlgorithmVersion.objects.values_list('source', flat=True).get(pk=shadow_id)
+        shadow = ShadowVersion(shadow_id, shadow_sha256, source, shadow_rate)
+    with _lock:
+        _active['checked_at'] = now
+        _active['value'] = value
+        _active['shadow'] = shadow
+    return value
+
+
+def algorithm_version():
+    """当前激活算法的版本哈希"""
+    return active_version().sha256
+
+
+def shadow_version():
+    """当前影子运行的候选版本 (ShadowVersion)，没有时返回 None；与激活指针一起定期检查"""
+    active_version()
+    with _lock:
+        return _active['shadow']
+
+
+def algorithm_ref(version):
+    """供 packing.loader 使用的 (key, source)；内置算法为 None"""
+    if version.version_id is None:
+        return None
+    return version.sha256, version.source
+
+
+def create_version(source, name='', activate=True):
+    """保存一个新的算法版本（保存后不再修改），activate 为 True 时同时设为激活版本"""
+    with transaction.atomic():
+        version = AlgorithmVersion.objects.create(name=name, source=source, sha256=source_sha256(source))
+        if activate:
+            activate_version(version.id)
+    return version
+
+
+def activate_version(version_id):
+    """把激活指针指向 version_id（None 表示内置算法）；本进程立即生效，其他进程在下次检查指针时生效"""
+    ActiveAlgorithm.objects.update_or_create(
+        pk=ActiveAlgorithm.SINGLETON_ID, defaults={'version_id': version_id})
+    with _lock:
+        _active['checked_at'] = None
+
+
+def set_shadow(version_id, sample_rate):
+    """设置影子运行的候选版本和抽样比例；version_id 为 None 或 sample_rate 为 0 时停止影子运行"""
+    ActiveAlgorithm.objects.update_or_create(
+        pk=ActiveAlgorithm.SINGLETON_ID,
+        defaults={'shadow_version_id': version_id, 'shadow_rate': sample_rate if version_id is not None else 0})
+    with _lock:
+        _active['checked_at'] = None
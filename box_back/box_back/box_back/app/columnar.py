@@ -0,0 +1,44 @@
+# box_back/box_back/app/columnar.py
+"""
+任务摆放结果的列式二进制格式（?format=columnar 或 Accept: application/vnd.boxback.columnar）
+
+布局（小端序）：
+    4 字节   魔数 b'BXC1'
+    uint32   头部长度 H
+    H 字节   UTF-8 JSON 头部，用空格补齐到 4 字节的倍数
+    其后依次为各列数据，每列起始位置按 4 字节对齐
+
+头部字段：version、task（id、creator、worker、space_info、created_at）、
+count（物品数）、names（名称表）以及 buffers。buffers 中每项为
+{name, dtype, offset, length}，offset 相对于列数据区的起点，length 为元素个数：
+    order_id     int32[count]
+    name_index   uint32[count]     names 中的下标
+    position     float32[count*3]  x, y, z 交错
+    dimensions   float32[count*3]  x, y, z 交错
+    flags        uint8[count]      bit0 face_up，bit1 fragile
+"""
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+
+from .packing.columns import (  # noqa: F401
+    FLAG_FACE_UP, FLAG_FRAGILE, MAGIC, ROW_FIELDS, decode_rows, encode_rows, iter_decoded_rows,
+)
+
+MEDIA_TYPE = 'application/vnd.boxback.columnar'
+
+
+def encode_task(task_info, rows):
+    """把任务的物品行编码为列式二进制；task_info 为写入头部的任务信息"""
+    return encode_rows(rows, header={'task': task_info})
+
+
+class ColumnarRenderer(BaseRenderer):
+    """列式格式的渲染器；视图已编码好的字节原样输出，错误信息等其他数据按 JSON 输出"""
+    media_type = MEDIA_TYPE
+    format = 'columnar'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if isinstance(data, bytes):
+            return data
+        return JSONRenderer().render(data, accepted_media_type, renderer_context)
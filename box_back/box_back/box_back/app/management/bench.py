@@ -0,0 +1,32 @@
+# box_back/box_back/app/management/bench.py
+"""基准测试命令共用的辅助函数"""
+from contextlib import contextmanager
+
+from django.db import transaction
+
+
+class _Rollback(Exception):
+    pass
+
+
+def fake_placements(count):
+    """生成用于测量写入速度的摆放结果"""
+    return [{
+        'order_id': i,
+        'name': f'bench-{i}',
+        'position': {'x': i % 10, 'y': (i // 10) % 10, 'z': i // 100},
+        'dimensions': {'x': 1, 'y': 1, 'z': 1},
+        'face_up': False,
+        'fragile': False,
+    } for i in range(count)]
+
+
+@contextmanager
+def rolled_back():
+    """在事务中执行，结束后回滚，测量过程中写入的数据不会保留"""
+    try:
+        with transaction.atomic():
+            yield
+            raise _Rollback
+    except _Rollback:
+        pass
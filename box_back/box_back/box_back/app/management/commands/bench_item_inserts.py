@@ -0,0 +1,51 @@
+# box_back/box_back/app/management/commands/bench_item_inserts.py
+import time
+
+from django.core.management.base import BaseCommand
+
+from box_back.app.models import Item, Task, User
+from box_back.app.services import build_item, create_items
+
+from ..bench import fake_placements, rolled_back
+
+
+class Command(BaseCommand):
+    help = "比较逐条 create 与事务内 bulk_create 保存任务物品的耗时（每 1000 个物品的毫秒数）"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--items', type=int, nargs='+', default=[1000, 10000], help='每次写入的物品数量')
+        parser.add_argument('--batch-size', type=int, default=None, help='bulk_create 每批行数，默认使用 PACKING_ITEM_BATCH_SIZE')
+
+    def handle(self, *args, **options):
+        user = User.objects.create(name='bench_item_inserts')
+        try:
+            self.stdout.write(f"{'items':>8} {'per-row ms/1k':>15} {'bulk ms/1k':>12} {'speedup':>8}")
+            for count in options['items']:
+                placed = fake_placements(count)
+                before = self._per_row(user, placed)
+                after = self._bulk(user, placed, options['batch_size'])
+                self.stdout.write(
+                    f"{count:>8} {before * 1000 / count:>15.1f} {after * 1000 / count:>12.1f} {before / after:>7.1f}x")
+        finally:
+            # 级联删除测量过程中创建的任务和物品
+            user.delete()
+
+    def _per_row(self, user, placed):
+        """原来的写法：自动提交模式下每个物品一条 INSERT"""
+        task = Task.objects.create(creator=user, worker=user, space_x=10, space_y=10, space_z=10)
+        start = time.perf_counter()
+        for item_data in placed:
+            build_item(task, item_data).save()
+        elapsed = (time.perf_counter() - start) * 1000
+        Item.objects.filter(task=task).delete()
+        task.delete()
+        return elapsed
+
+    def _bulk(self, user, placed, batch_size):
+        """现在的写法：一个事务内分批 bulk_create，测量后回滚"""
+        start = time.perf_counter()
+        with rolled_back():
+            task = Task.objects.create(creator=user, worker=user, space_x=10, space_y=10, space_z=10)
+            create_items(task, placed, batch_size=batch_size)
+            elapsed = (time.perf_counter() - start) * 1000
+        return elapsed
@@ -0,0 +1,97 @@
+# box_back/box_back/app/management/commands/bench_packing.py
+import json
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from box_back.app.algorithms import active_version, algorithm_ref
+from box_back.app.models import AlgorithmVersion
+from box_back.app.packing.benchmark import (GROWTH_CASES, MAX_PER_ITEM_GROWTH, PALLET_CASES, SCALING_CASES, SIZES,
+                                            WORKLOADS, check_growth, check_time_limit, compare, format_table,
+                                            run_suite, suite_cases)
+from box_back.app.packing.loader import ENGINES
+from box_back.app.services import packing_pool
+
+
+class Command(BaseCommand):
+    help = ("在合成订单上测量 place_items 的耗时、内存峰值、容积利用率和违反约束的次数；"
+            "给出多个版本时以第一个为基准比较其余版本。给定 --time-limit 或 --scaling 时，"
+            "任一用例超时即以失败退出；给定 --growth 时，每个物品的耗时随物品数增长过快即以失败退出")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workloads', nargs='+', choices=list(WORKLOADS), default=list(WORKLOADS),
+                            help='订单种类')
+        parser.add_argument('--sizes', type=int, nargs='+', default=list(SIZES), help='订单的物品数量')
+        parser.add_argument('--seeds', type=int, default=1, help='每种订单和规模生成的订单数')
+        parser.add_argument('--versions', nargs='+', default=['active'],
+                            help='算法版本：active、builtin、AlgorithmVersion 的 id，或内置引擎 '
+                                 'extreme_point、heightmap、heightmap:<网格边长>')
+        parser.add_argument('--timeout', type=float, default=3600, help='单个用例的墙钟时限（秒）')
+        parser.add_argument('--scaling', action='store_true',
+                            help='只运行 SCALING_CASES 中的大订单，耗时上限默认为 PACKING_TIMEOUT_S')
+        parser.add_argument('--growth', action='store_true',
+                            help='只运行 GROWTH_CASES 中的订单，检查耗时随物品数近似线性增长')
+        parser.add_argument('--pallet', action='store_true',
+                            help='只运行 PALLET_CASES 中的托盘订单，例如用 --versions extreme_point heightmap 比较两个引擎')
+        parser.add_argument('--max-growth', type=float, default=MAX_PER_ITEM_GROWTH,
+                            help='--growth 时每个物品的平均耗时最多增长的倍数')
+        parser.add_argument('--time-limit', type=float, help='单个用例耗时的上限（秒），超过时命令失败')
+        parser.add_argument('--no-memory', action='store_true', help='不测量内存峰值（省去第二次运行）')
+        parser.add_argument('--json', action='store_true', help='以 JSON 输出结果')
+
+    def handle(self, *args, **options):
+        if options['scaling']:
+            cases = list(SCALING_CASES)
+        elif options['growth']:
+            cases = list(GROWTH_CASES)
+        elif options['pallet']:
+            cases = list(PALLET_CASES)
+        else:
+            cases = suite_cases(options['workloads'], options['sizes'], options['seeds'])
+        time_limit = options['time_limit']
+        if time_limit is None and options['scaling']:
+            time_limit = settings.PACKING_TIMEOUT_S
+        pool = packing_pool()
+        report = []
+        for label in options['versions']:
+            results = run_suite(cases, pool, self._algorithm(label), measure_memory=not options['no_memory'],
+                                timeout=options['timeout'])
+            report.append({'version': label, 'results': results})
+            if not options['json']:
+                self.stdout.write(format_table(results, label=label))
+                self.stdout.write('')
+
+        baseline = report[0]
+        for entry in report[1:]:
+            entry['regressions'] = compare(entry['results'], baseline['results'],
+                                           settings.ALGORITHM_BENCH_MAX_SLOWDOWN,
+                                           settings.ALGORITHM_BENCH_MAX_UTILIZATION_DROP)
+            if not options['json']:
+                self.stdout.write(f"{entry['version']} vs {baseline['version']}: "
+                                  f"{'; '.join(entry['regressions']) or 'no regressions'}")
+        failures = []
+        if time_limit is not None:
+            for entry in report:
+                entry['time_limit_failures'] = check_time_limit(entry['results'], time_limit * 1000)
+                failures.extend(f"{entry['version']} {reason}" for reason in entry['time_limit_failures'])
+        if options['growth']:
+            for entry in report:
+                entry['growth_failures'] = check_growth(entry['results'], options['max_growth'])
+                failures.extend(f"{entry['version']} {reason}" for reason in entry['growth_failures'])
+        if options['json']:
+            self.stdout.write(json.dumps(report, indent=2))
+        if failures:
+            raise CommandError('; '.join(failures))
+
+    def _algorithm(self, label):
+        if label == 'active':
+            return algorithm_ref(active_version())
+        if label == 'builtin':
+            return None
+        if label.partition(':')[0] in ENGINES:
+            return label
+        try:
+            version = AlgorithmVersion.objects.get(pk=int(label))
+        except (ValueError, AlgorithmVersion.DoesNotExist):
+            raise CommandError(f"Unknown algorithm version: {label}")
+        return version.sha256, version.source
@@ -0,0 +1,55 @@
+# box_back/box_back/app/management/commands/bench_task_memory.py
+import hashlib
+import tracemalloc
+
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+from rest_framework.renderers import JSONRenderer
+
+from box_back.app.models import Task, User
+from box_back.app.serializers import TaskSerializer
+from box_back.app.services import create_items
+from box_back.app.streaming import stream_task_json
+
+from ..bench import fake_placements, rolled_back
+
+
+def _peak(build):
+    """执行 build，返回 (Python 内存分配峰值 MB, 返回值)"""
+    tracemalloc.start()
+    try:
+        result = build()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak / 1024 / 1024, result
+
+
+class Command(BaseCommand):
+    help = "比较一次性渲染与流式输出任务 JSON 的内存峰值（tracemalloc），并检查输出是否一致"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--items', type=int, nargs='+', default=[1000, 10000, 100000], help='任务的物品数量')
+        parser.add_argument('--storage', choices=['rows', 'blob'], default='rows', help='物品的保存方式')
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"{'items':>8} {'render MB':>10} {'stream MB':>10} identical")
+        with rolled_back(), override_settings(PLACEMENT_STORAGE=options['storage']):
+            user = User.objects.create(name='bench_task_memory')
+            for count in options['items']:
+                task = Task.objects.create(creator=user, worker=user, space_x=10, space_y=10, space_z=10)
+                create_items(task, fake_placements(count))
+                task = Task.objects.select_related('creator', 'worker').get(pk=task.pk)
+                before, rendered = _peak(lambda: self._render(task))
+                after, streamed = _peak(lambda: self._stream(task))
+                self.stdout.write(f"{count:>8} {before:>10.1f} {after:>10.1f} {rendered == streamed}")
+
+    def _render(self, task):
+        """原来的写法：构造完整的 serializer.data 后一次渲染"""
+        return hashlib.sha256(JSONRenderer().render(TaskSerializer(task).data)).hexdigest()
+
+    def _stream(self, task):
+        digest = hashlib.sha256()
+        for chunk in stream_task_json(task, TaskSerializer):
+            digest.update(chunk)
+        return digest.hexdigest()
@@ -0,0 +1,48 @@
+# box_back/box_back/app/management/commands/bench_task_serializers.py
+import time
+
+from django.core.management.base import BaseCommand
+from rest_framework.renderers import JSONRenderer
+
+from box_back.app.models import Task, User
+from box_back.app.serializers import ItemSerializer, TaskSerializer
+from box_back.app.services import create_items
+
+from ..bench import fake_placements, rolled_back
+
+
+class Command(BaseCommand):
+    help = "比较 ItemSerializer 与 values_list 快速路径序列化一个任务的耗时，并检查输出是否一致"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--items', type=int, nargs='+', default=[100, 10000, 100000], help='任务的物品数量')
+        parser.add_argument('--repeat', type=int, default=3, help='每种方式重复次数，取最短时间')
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"{'items':>8} {'ItemSerializer ms':>18} {'fast path ms':>13} {'speedup':>8} identical")
+        with rolled_back():
+            user = User.objects.create(name='bench_task_serializers')
+            for count in options['items']:
+                task = Task.objects.create(creator=user, worker=user, space_x=10, space_y=10, space_z=10)
+                create_items(task, fake_placements(count))
+                before, old = self._best(options['repeat'], lambda: self._legacy(task))
+                after, new = self._best(options['repeat'], lambda: TaskSerializer(task).data)
+                identical = JSONRenderer().render(old) == JSONRenderer().render(new)
+                self.stdout.write(
+                    f"{count:>8} {before:>18.1f} {after:>13.1f} {before / after:>7.1f}x {identical}")
+
+    def _legacy(self, task):
+        """原来的写法：TaskSerializer 嵌套 ItemSerializer(many=True)"""
+        data = dict(TaskSerializer(task, fields=['id', 'creator', 'worker', 'space_info']).data)
+        data['items'] = ItemSerializer(task.items.all(), many=True).data
+        data['created_at'] = TaskSerializer(task, fields=['created_at']).data['created_at']
+        return data
+
+    def _best(self, repeat, build):
+        best = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            data = build()
+            elapsed = (time.perf_counter() - start) * 1000
+            best = elapsed if best is None else min(best, elapsed)
+        return best, data
@@ -0,0 +1,52 @@
+# box_back/box_back/app/management/commands/pack_placements.py
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from box_back.app.columnar import ROW_FIELDS
+from box_back.app.models import Item, Task
+from box_back.app.placements import pack_rows, unpack_rows
+
+
+class Command(BaseCommand):
+    help = "把已有任务的 Item 行转换为任务上的压缩 blob（--reverse 则把 blob 展开回 Item 行）"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reverse', action='store_true', help='把 blob 展开回 Item 行')
+        parser.add_argument('--limit', type=int, default=None, help='最多转换的任务数')
+
+    def handle(self, *args, **options):
+        if options['reverse']:
+            tasks = Task.objects.filter(placement_blob__isnull=False)
+            convert = self._unpack
+        else:
+            tasks = Task.objects.filter(placement_blob__isnull=True, items__isnull=False).distinct()
+            convert = self._pack
+        task_ids = list(tasks.order_by('id').values_list('id', flat=True)[:options['limit']])
+        converted = 0
+        for task_id in task_ids:
+            # 每个任务一个事务，中途中断时已转换的任务保持完整
+            with transaction.atomic():
+                task = Task.objects.select_for_update().get(pk=task_id)
+                count = convert(task)
+            converted += 1
+            self.stdout.write(f"Task {task_id}: {count} items")
+        self.stdout.write(f"Converted {converted} tasks")
+
+    def _pack(self, task):
+        rows = list(Item.objects.filter(task=task).order_by('id').values_list(*ROW_FIELDS))
+        task.placement_blob = pack_rows(rows)
+        task.placement_count = len(rows)
+        task.placement_volume = sum(row[5] * row[6] * row[7] for row in rows)
+        task.save(update_fields=['placement_blob', 'placement_count', 'placement_volume'])
+        Item.objects.filter(task=task).delete()
+        return len(rows)
+
+    def _unpack(self, task):
+        rows = unpack_rows(task.placement_blob)
+        Item.objects.bulk_create([Item(task=task, **dict(zip(ROW_FIELDS, row))) for row in rows],
+                                 batch_size=settings.PACKING_ITEM_BATCH_SIZE)
+        task.placement_blob = None
+        task.placement_count = len(rows)
+        task.save(update_fields=['placement_blob', 'placement_count'])
+        return len(rows)
@@ -0,0 +1,30 @@
+# box_back/box_back/app/management/commands/packing_worker.py
+import time
+
+from django.core.management.base import BaseCommand
+
+from box_back.app.models import Task
+from box_back.app.services import run_task_job
+
+
+class Command(BaseCommand):
+    help = "处理异步装箱任务：轮询数据库中 pending 状态的任务并逐个计算"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=float, default=1.0, help='没有任务时的轮询间隔（秒）')
+        parser.add_argument('--once', action='store_true', help='处理完当前所有待处理任务后退出')
+
+    def handle(self, *args, **options):
+        while True:
+            task_id = (Task.objects.filter(status=Task.STATUS_PENDING)
+                       .order_by('created_at', 'id')
+                       .values_list('id', flat=True)
+                       .first())
+            if task_id is None:
+                if options['once']:
+                    break
+                time.sleep(options['interval'])
+                continue
+            if run_task_job(task_id):
+                task = Task.objects.get(pk=task_id)
+                self.stdout.write(f"Task {task_id}: {task.status}")
@@ -0,0 +1,58 @@
+# box_back/box_back/app/management/commands/verify_tasks.py
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand
+
+from box_back.app.models import Item, Task
+from box_back.app.packing.columns import decode_columns
+from box_back.app.packing.verify import check_boxes
+from box_back.app.placements import blob_segments
+
+
+def task_boxes(task):
+    """任务全部物品的 (order_id 数组, 位置 (n, 3), 尺寸 (n, 3))；blob 任务直接由列数据构造"""
+    if task.placement_blob is not None:
+        # 追加过物品的 blob 有多段，逐段解码后拼接
+        segments = [decode_columns(segment)[1] for segment in blob_segments(task.placement_blob)]
+        return (np.concatenate([np.frombuffer(columns['order_id'], dtype=np.int32) for columns in segments]),
+                np.concatenate([np.frombuffer(columns['position'], dtype=np.float64).reshape(-1, 3)
+                                for columns in segments]),
+                np.concatenate([np.frombuffer(columns['dimensions'], dtype=np.float64).reshape(-1, 3)
+                                for columns in segments]))
+    rows = np.array(Item.objects.filter(task_id=task.id).order_by('id').values_list(
+        'order_id', 'position_x', 'position_y', 'position_z', 'width', 'height', 'depth'), dtype=np.float64)
+    rows = rows.reshape(-1, 7)
+    return rows[:, 0].astype(np.int64), rows[:, 1:4], rows[:, 4:7]
+
+
+class Command(BaseCommand):
+    help = ("校验已保存任务的摆放结果：容器边界、物品互不重叠、order_id 不重复"
+            "（原始输入不再保存，尺寸和 face_up 无法复查）")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--task', type=int, nargs='+', default=None, help='只校验这些任务')
+        parser.add_argument('--limit', type=int, default=None, help='最多校验的任务数（从最新的开始）')
+
+    def handle(self, *args, **options):
+        tasks = Task.objects.filter(status=Task.STATUS_DONE).order_by('-id')
+        if options['task']:
+            tasks = tasks.filter(pk__in=options['task'])
+        task_ids = list(tasks.values_list('id', flat=True)[:options['limit']])
+
+        invalid = 0
+        start = time.perf_counter()
+        for task_id in task_ids:
+            task = Task.objects.only('id', 'space_x', 'space_y', 'space_z', 'placement_blob').get(pk=task_id)
+            order_ids, lo, size = task_boxes(task)
+            counts, pairs = check_boxes(lo, size, (task.space_x, task.space_y, task.space_z))
+            duplicates = len(order_ids) - len(np.unique(order_ids))
+            if counts['bounds'] or counts['overlap'] or duplicates:
+                invalid += 1
+                examples = ', '.join(f"{order_ids[a]}/{order_ids[b]}" for a, b in pairs)
+                self.stdout.write(
+                    f"task {task_id}: {len(order_ids)} items, bounds={counts['bounds']} "
+                    f"overlap={counts['overlap']} duplicate_order_ids={duplicates}"
+                    + (f" (overlapping order_ids: {examples})" if examples else ''))
+        elapsed = time.perf_counter() - start
+        self.stdout.write(f"Checked {len(task_ids)} tasks in {elapsed:.2f} s, {invalid} invalid")
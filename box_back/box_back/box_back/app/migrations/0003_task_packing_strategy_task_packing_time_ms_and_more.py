@@ -0,0 +1,28 @@
+# Generated by Django 5.1.4 on 2026-10-18 12:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0002_rename_item_id_item_order_id'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='task',
+            name='packing_strategy',
+            field=models.CharField(blank=True, default='', max_length=50),
+        ),
+        migrations.AddField(
+            model_name='task',
+            name='packing_time_ms',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='item',
+            name='order_id',
+            field=models.IntegerField(),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.1.4 on 2026-10-18 12:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0004_task_status'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PlacementCache',
+            fields=[
+                ('key', models.CharField(max_length=64, primary_key=True, serialize=False)),
+                ('algorithm_version', models.CharField(db_index=True, max_length=64)),
+                ('result', models.JSONField()),
+                ('hits', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+    ]
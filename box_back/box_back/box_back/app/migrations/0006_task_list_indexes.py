@@ -0,0 +1,21 @@
+# Generated by Django 5.1.4 on 2026-10-18 12:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0005_placementcache'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['creator', 'created_at'], name='task_creator_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['worker', 'created_at'], name='task_worker_created_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.4 on 2026-10-18 12:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0007_task_placement_blob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='task',
+            name='revision',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.1.4 on 2026-10-18 12:32
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0009_algorithm_registry'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='activealgorithm',
+            name='shadow_rate',
+            field=models.FloatField(default=0),
+        ),
+        migrations.AddField(
+            model_name='activealgorithm',
+            name='shadow_version',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='app.algorithmversion'),
+        ),
+        migrations.CreateModel(
+            name='ShadowComparison',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('active_sha256', models.CharField(max_length=64)),
+                ('item_count', models.PositiveIntegerField()),
+                ('active_time_ms', models.FloatField()),
+                ('active_utilization', models.FloatField()),
+                ('candidate_time_ms', models.FloatField(blank=True, null=True)),
+                ('candidate_utilization', models.FloatField(blank=True, null=True)),
+                ('error', models.TextField(blank=True, default='')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('candidate', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='shadow_comparisons', to='app.algorithmversion')),
+            ],
+        ),
+    ]
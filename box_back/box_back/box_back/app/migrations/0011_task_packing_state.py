@@ -0,0 +1,18 @@
+# Generated by Django 5.1.4 on 2026-10-18 12:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0010_shadow_comparison'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='task',
+            name='packing_state',
+            field=models.BinaryField(blank=True, null=True),
+        ),
+    ]
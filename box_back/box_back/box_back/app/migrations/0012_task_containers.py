@@ -0,0 +1,29 @@
+# Generated by Django 5.1.4 on 2026-10-18 12:42
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0011_task_packing_state'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='task',
+            name='container_index',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='task',
+            name='parent',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='containers', to='app.task'),
+        ),
+        migrations.AddField(
+            model_name='task',
+            name='utilization',
+            field=models.FloatField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.4 on 2026-10-18 16:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0012_task_containers'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='task',
+            name='packing_truncated',
+            field=models.BooleanField(default=False),
+        ),
+    ]
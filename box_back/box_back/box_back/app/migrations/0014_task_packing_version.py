@@ -0,0 +1,18 @@
+# Generated by Django 5.1.4 on 2026-10-18 18:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0013_task_packing_truncated'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='task',
+            name='packing_version',
+            field=models.CharField(blank=True, default='', max_length=64),
+        ),
+    ]
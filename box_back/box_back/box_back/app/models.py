@@ -18,6 +18,18 @@ class User(models.Model):
 
 class Task(models.Model):
     """任务表，直接包含空间信息和物品"""
+    # 异步计算的状态
+    STATUS_PENDING = 'pending'
+    STATUS_RUNNING = 'running'
+    STATUS_DONE = 'done'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_RUNNING, 'Running'),
+        (STATUS_DONE, 'Done'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+    
     # 创建者与工人
     creator = models.ForeignKey(User, on_delete=models.CASCADE, related_name='created_tasks')
     worker = models.ForeignKey(User, on_delete=models.CASCADE, related_name='assigned_tasks', null=True, blank=True)
@@ -30,6 +42,45 @@ class Task(models.Model):
     # 创建时间
     created_at = models.DateTimeField(auto_now_add=True)
     
+    # 计算摆放所用的策略及耗时（毫秒）
+    packing_strategy = models.CharField(max_length=50, blank=True, default='')
+    packing_time_ms = models.FloatField(null=True, blank=True)
+    # 计算到了时间预算的截止时间，摆放是已经放置的部分或尚未收敛的结果
+    packing_truncated = models.BooleanField(default=False)
+    # 计算摆放所用的算法版本：激活版本的 sha256 或内置引擎（如 heightmap:0.5），用于生成 ETag
+    packing_version = models.CharField(max_length=64, blank=True, default='')
+    
+    # 计算状态；同步创建的任务直接为 done，异步任务由后台进程处理
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_DONE)
+    error = models.TextField(blank=True, default='')
+    # 异步任务待计算的输入（space_info、items 及选项），计算完成后清空
+    input_data = models.JSONField(null=True, blank=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    
+    # 摆放结果的物品数量和总体积
+    placement_count = models.IntegerField(null=True, blank=True)
+    placement_volume = models.FloatField(null=True, blank=True)
+    # PLACEMENT_STORAGE 为 blob 时，全部物品压缩保存在这里而不是 Item 表（格式见 placements.py）
+    placement_blob = models.BinaryField(null=True, blank=True)
+    # 摆放结果每次修改后递增，用于生成 ETag
+    revision = models.PositiveIntegerField(default=0)
+    # 追加物品时保存的空间索引和极点（格式见 packing/incremental.py），只对相同 revision 的摆放有效
+    packing_state = models.BinaryField(null=True, blank=True)
+    
+    # 多容器模式：第一个容器即任务本身，其余容器保存为 parent 指向它的子任务，按 container_index 编号
+    parent = models.ForeignKey('self', on_delete=models.CASCADE, related_name='containers', null=True, blank=True)
+    container_index = models.PositiveSmallIntegerField(default=0)
+    # 多容器模式下容器内物品的容积利用率，单容器任务为空
+    utilization = models.FloatField(null=True, blank=True)
+    
+    class Meta:
+        # 与任务列表的游标分页顺序一致
+        indexes = [
+            models.Index(fields=['creator', 'created_at'], name='task_creator_created_idx'),
+            models.Index(fields=['worker', 'created_at'], name='task_worker_created_idx'),
+        ]
+    
     def __str__(self):
         return f"Task {self.id} by {self.creator.name}"
     
@@ -75,3 +126,57 @@ class Item(models.Model):
     @property
     def dimensions(self):
         return {'x': self.width, 'y': self.height, 'z': self.depth}
+
+class PlacementCache(models.Model):
+    """摆放结果缓存，键为输入和算法版本的哈希，所有 web 进程共享"""
+    key = models.CharField(max_length=64, primary_key=True)
+    algorithm_version = models.CharField(max_length=64, db_index=True)
+    # compute_placement 的结果：items、strategy、time_ms
+    result = models.JSONField()
+    hits = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    def __str__(self):
+        return f"{self.key[:12]} ({self.hits} hits)"
+
+class AlgorithmVersion(models.Model):
+    """上传的算法版本，保存后不再修改"""
+    name = models.CharField(max_length=255, blank=True, default='')  # 上传的文件名
+    source = models.TextField()
+    sha256 = models.CharField(max_length=64, db_index=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    def __str__(self):
+        return f"Algorithm {self.id}: {self.name}"
+
+
+class ActiveAlgorithm(models.Model):
+    """当前使用的算法版本指针，只有一行；version 为空时使用部署的 packing_algorithm.py"""
+    SINGLETON_ID = 1
+    
+    version = models.ForeignKey(AlgorithmVersion, on_delete=models.PROTECT, null=True, blank=True)
+    # 影子运行的候选版本：按 shadow_rate 的比例在后台对真实请求再计算一次，结果只用于比较
+    shadow_version = models.ForeignKey(AlgorithmVersion, on_delete=models.PROTECT, null=True, blank=True,
+                                       related_name='+')
+    shadow_rate = models.FloatField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    def __str__(self):
+        return f"Active algorithm: {self.version_id or 'builtin'}"
+
+
+class ShadowComparison(models.Model):
+    """候选算法在一个真实请求上与激活版本的比较结果"""
+    candidate = models.ForeignKey(AlgorithmVersion, on_delete=models.CASCADE, related_name='shadow_comparisons')
+    active_sha256 = models.CharField(max_length=64)
+    item_count = models.PositiveIntegerField()
+    active_time_ms = models.FloatField()
+    active_utilization = models.FloatField()
+    # 候选算法出错时以下两项为空，错误信息记录在 error
+    candidate_time_ms = models.FloatField(null=True, blank=True)
+    candidate_utilization = models.FloatField(null=True, blank=True)
+    error = models.TextField(blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    def __str__(self):
+        return f"Shadow {self.candidate_id} #{self.id}"
\ No newline at end of file
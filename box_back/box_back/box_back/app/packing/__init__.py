@@ -0,0 +1,2 @@
+# box_back/box_back/app/packing/__init__.py
+# 装箱引擎及其辅助模块，默认的 packing_algorithm.place_items 基于此实现
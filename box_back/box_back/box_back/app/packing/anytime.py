@@ -0,0 +1,69 @@
+# box_back/box_back/app/packing/anytime.py
+import random
+import time
+
+from .engine import DeadlineExceeded, ExtremePointPacker, build_output
+from .heightmap import HeightmapPacker
+from .metrics import is_inside, volume_utilization
+from .records import height_order, normalize_items, packing_order
+from .sku import group_by_sku
+from .spatial import EPS
+
+
+def _packer_factory(engine, space_dimensions, deadline):
+    """engine（loader.engine_ref 的格式）对应的 (新建引擎的函数, SKU 组的初始顺序)"""
+    name, _, option = engine.partition(':')
+    if name == 'heightmap':
+        resolution = float(option) if option else None
+        return (lambda: HeightmapPacker(space_dimensions, resolution=resolution, deadline=deadline)), height_order
+    if name == 'extreme_point':
+        return (lambda: ExtremePointPacker(space_dimensions, deadline=deadline)), packing_order
+    raise ValueError(f"Unknown packing engine: {engine}")
+
+
+def improve_placement(items_data, space_dimensions, initial, deadline, seed=0, engine='extreme_point'):
+    """
+    在截止时间 deadline (time.perf_counter()) 之前尝试改进已有的摆放结果
+
+    以 SKU 组的放置顺序为搜索空间做局部搜索：每轮随机交换两个组的位置并
+    用 engine 指定的内置引擎（与计算 initial 的引擎相同）重新装箱，利用率不下降
+    则接受该顺序。超过截止时间的那一轮直接丢弃，因此总耗时不超过截止时间加一次
+    检查的间隔。所有物品都已放进容器时利用率无法再提高，立即返回。
+
+    返回 (placed_items, improved)，improved 表示结果是否优于 initial。
+    """
+    if all(is_inside(item, space_dimensions) for item in initial):
+        return initial, False
+    new_packer, order = _packer_factory(engine, space_dimensions, deadline)
+    best_items = initial
+    best_utilization = volume_utilization(initial, space_dimensions)
+    # 初始顺序即计算 initial 的顺序，之后只接受利用率不低于当前顺序的交换
+    current = group_by_sku(normalize_items(items_data), order)
+    current_utilization = best_utilization
+    rng = random.Random(seed)
+    improved = False
+
+    while time.perf_counter() < deadline:
+        if len(current) < 2:
+            break
+        candidate = list(current)
+        i, j = rng.sample(range(len(candidate)), 2)
+        candidate[i], candidate[j] = candidate[j], candidate[i]
+        try:
+            placements, overflow = new_packer().pack_groups(candidate)
+        except DeadlineExceeded:
+            break
+        if time.perf_counter() > deadline:
+            # 高度图引擎到期时不抛出异常，而是把剩余的物品放入 overflow
+            break
+        placed_items = build_output(placements, overflow, space_dimensions)
+        utilization = volume_utilization(placed_items, space_dimensions)
+        if utilization >= current_utilization:
+            current, current_utilization = candidate, utilization
+        if utilization > best_utilization + EPS:
+            best_items, best_utilization = placed_items, utilization
+            improved = True
+        if not overflow:
+            break
+    return best_items, improved
+
@@ -0,0 +1,73 @@
+# box_back/box_back/app/packing/batch.py
+import time
+
+from .anytime import improve_placement
+from .itembatch import ItemBatch, as_batch
+from .loader import load_place_batch
+
+
+def pack_single(items_data, space_dimensions, time_budget_ms=None, algorithm=None):
+    """
+    使用指定算法版本计算一个任务的摆放，返回 (placed_items, 策略名称, 耗时毫秒, 是否到期截断)
+
+    items_data 为物品字典列表或 ItemBatch，placed_items 总是 ItemBatch。algorithm 见
+    loader.load_place_batch。给定 time_budget_ms 时初始摆放也受这一时限约束：内置引擎和
+    部署的算法到期后返回已经放置的部分，其余物品摆在容器外；剩余的时间用同一引擎做局部
+    搜索改进结果。部署的 packing_algorithm.py 即极点引擎；上传的算法无法用内置引擎代替，
+    不做局部搜索。返回时已经到了截止时间则认为计算被截断：初始摆放可能没有完成，或者
+    局部搜索还没有收敛，结果取决于机器负载，不能当作这组输入的确定结果。
+    """
+    items = as_batch(items_data)
+    start = time.perf_counter()
+    deadline = start + time_budget_ms / 1000 if time_budget_ms else None
+    placed_items = load_place_batch(algorithm, deadline)(items, space_dimensions)
+    # 内置引擎以引擎名称作为策略名称
+    strategy = algorithm.partition(':')[0] if isinstance(algorithm, str) else 'place_items'
+    if isinstance(algorithm, str):
+        engine = algorithm
+    else:
+        engine = 'extreme_point' if algorithm is None else None
+    if engine and deadline is not None and time.perf_counter() < deadline:
+        # 局部搜索按字典约定实现，只在有时间预算时转换
+        improved_items, improved = improve_placement(items.to_items(), space_dimensions,
+                                                     placed_items.to_placements(), deadline, engine=engine)
+        if improved:
+            placed_items = ItemBatch.from_placements(improved_items)
+            strategy = 'anytime'
+    end = time.perf_counter()
+    return placed_items, strategy, (end - start) * 1000, deadline is not None and end >= deadline
+
+
+def pack_single_compact(items_payload, space_dimensions, time_budget_ms=None, algorithm=None):
+    """在子进程中运行的 pack_single：物品和摆放结果都以 columns 的列式二进制传递"""
+    placed_items, strategy, time_ms, truncated = pack_single(ItemBatch.decode(items_payload), space_dimensions,
+                                                             time_budget_ms, algorithm)
+    return placed_items.encode(), strategy, time_ms, truncated
+
+
+def pack_many(jobs, pool=None, algorithm=None):
+    """
+    在 sandbox 子进程池中并行计算多个任务的摆放
+
+    jobs 为 (items_data, space_dimensions, time_budget_ms) 的列表，按相同顺序
+    返回 pack_single 的结果；某个任务出错（包括超时、子进程崩溃）时对应位置是该异常。
+    pool 为 None 时在当前进程中依次计算。
+    """
+    results = []
+    if pool is None:
+        for job in jobs:
+            try:
+                results.append(pack_single(*job, algorithm=algorithm))
+            except Exception as e:
+                results.append(e)
+        return results
+    futures = [pool.submit(pack_single_compact, as_batch(items_data).encode(), dict(space_dimensions),
+                           time_budget_ms, algorithm)
+               for items_data, space_dimensions, time_budget_ms in jobs]
+    for future in futures:
+        try:
+            payload, strategy, time_ms, truncated = future.result()
+            results.append((ItemBatch.decode(payload), strategy, time_ms, truncated))
+        except Exception as e:
+            results.append(e)
+    return results
@@ -0,0 +1,334 @@
+# box_back/box_back/app/packing/benchmark.py
+"""
+装箱算法的基准测试
+
+用固定种子生成几类合成订单，测量 place_items 的耗时、内存峰值、容积利用率、
+违反约束的次数以及悬空（支撑不足）的物品数（见 verify）。run_case 在 sandbox 子进程中运行，摆放结果以列式
+二进制传回父进程后再计算利用率和检查约束。SCALING_CASES 为检查耗时上限的大订单（见 check_time_limit），
+GROWTH_CASES 为检查耗时随物品数近似线性增长的订单（见 check_growth），PALLET_CASES 为托盘式的
+大批量少量 SKU 订单，用于比较各引擎按层铺放的耗时。
+"""
+import math
+import random
+import time
+import tracemalloc
+
+from .itembatch import ItemBatch
+from .loader import load_place_batch
+from .metrics import volume_utilization
+from .verify import count_unsupported, count_violations
+
+SIZES = (10, 100, 1000, 10000, 100000)
+
+# 上传算法时使用的小规模套件
+QUICK_SIZES = (10, 100, 500)
+
+# 耗时必须低于上限的大订单 (workload, count, seed)
+SCALING_CASES = (('distinct_fixed', 20000, 0), ('mixed', 400, 0))
+
+# 检查耗时增长的订单 (workload, count, seed)，同一种订单的物品数依次增大
+GROWTH_CASES = (('heavy_tailed', 20000, 0), ('heavy_tailed', 50000, 0),
+                ('distinct_floats', 20000, 0), ('distinct_floats', 50000, 0))
+
+# 物品数增大时每个物品的平均耗时最多增长的倍数，耗时与物品数成正比时为 1
+MAX_PER_ITEM_GROWTH = 1.25
+
+# 托盘订单 (workload, count, seed)：5 种 SKU 装进固定的大容器
+PALLET_CASES = (('pallet', 20000, 0), ('pallet', 60000, 0))
+
+
+def _uniform(count, rng):
+    """尺寸均匀分布的普通物品"""
+    return [{'name': f'uniform-{i}',
+             'dimensions': {'x': rng.randint(1, 10), 'y': rng.randint(1, 10), 'z': rng.randint(1, 10)},
+             'face_up': False, 'fragile': False}
+            for i in range(count)]
+
+
+def _heavy_tailed(count, rng):
+    """尺寸为长尾分布：大多数是小件，少数很大"""
+    items = []
+    for i in range(count):
+        scale = min(rng.paretovariate(1.5), 20)
+        items.append({'name': f'heavy-{i}',
+                      'dimensions': {axis: max(1, round(scale * rng.uniform(1, 4))) for axis in 'xyz'},
+                      'face_up': rng.random() < 0.1, 'fragile': rng.random() < 0.05})
+    return items
+
+
+def _identical_skus(count, rng):
+    """大量相同规格的物品，共 5 种 SKU"""
+    skus = [({'x': rng.randint(2, 8), 'y': rng.randint(2, 8), 'z': rng.randint(2, 8)}, rng.random() < 0.3)
+            for _ in range(5)]
+    items = []
+    for _ in range(count):
+        index = rng.randrange(len(skus))
+        dimensions, face_up = skus[index]
+        items.append({'name': f'sku-{index}', 'dimensions': dict(dimensions), 'face_up': face_up, 'fragile': False})
+    return items
+
+
+def _pallet(count, rng):
+    """托盘装载：与 identical_skus 相同的 5 种 SKU，装进固定的大容器（见 FIXED_SPACES）"""
+    return _identical_skus(count, rng)
+
+
+def _constrained(count, rng):
+    """大部分物品有 face_up 或 fragile 约束"""
+    return [{'name': f'constrained-{i}',
+             'dimensions': {'x': rng.randint(1, 10), 'y': rng.randint(1, 10), 'z': rng.randint(1, 10)},
+             'face_up': rng.random() < 0.6, 'fragile': rng.random() < 0.4}
+            for i in range(count)]
+
+
+def _distinct_floats(count, rng):
+    """尺寸为互不相同的小数，没有可以合并的 SKU，每个物品都要单独搜索位置"""
+    return [{'name': f'distinct-{i}',
+             'dimensions': {axis: round(rng.uniform(1, 10), 3) for axis in 'xyz'},
+             'face_up': rng.random() < 0.2, 'fragile': rng.random() < 0.05}
+            for i in range(count)]
+
+
+def _distinct_small(count, rng):
+    """尺寸为互不相同的小数的小件，装进固定的容器（见 FIXED_SPACES），容器中的极点很多"""
+    return [{'name': f'distinct-{i}',
+             'dimensions': {axis: round(rng.uniform(1, 5), 3) for axis in 'xyz'},
+             'face_up': rng.random() < 0.2, 'fragile': rng.random() < 0.05}
+            for i in range(count)]
+
+
+def _mixed(count, rng):
+    """大小悬殊、尺寸为两位小数的物品装进固定的容器（见 FIXED_SPACES），没有公共的网格尺寸"""
+    return [{'name': f'mixed-{i}',
+             'dimensions': {axis: round(rng.uniform(5, 30), 2) for axis in 'xyz'},
+             'face_up': rng.random() < 0.2, 'fragile': rng.random() < 0.05}
+            for i in range(count)]
+
+
+def _cartons(count, rng):
+    """以米为单位、尺寸有两位小数的纸箱，共 8 种 SKU，检查非整数尺寸的物品能否堆叠"""
+    skus = [({axis: rng.randint(15, 60) / 100 for axis in 'xyz'}, rng.random() < 0.5) for _ in range(8)]
+    items = []
+    for _ in range(count):
+        index = rng.randrange(len(skus))
+        dimensions, face_up = skus[index]
+        items.append({'name': f'carton-{index}', 'dimensions': dict(dimensions), 'face_up': face_up,
+                      'fragile': False})
+    return items
+
+
+# 合成订单的种类
+WORKLOADS = {
+    'uniform': _uniform,
+    'heavy_tailed': _heavy_tailed,
+    'identical_skus': _identical_skus,
+    'constrained': _constrained,
+    'distinct_floats': _distinct_floats,
+    'distinct_fixed': _distinct_small,
+    'mixed': _mixed,
+    'cartons': _cartons,
+    'pallet': _pallet,
+}
+
+# 使用固定容器的订单种类，物品多时装不下的物品摆在容器外
+FIXED_SPACES = {
+    'distinct_fixed': {'x': 100, 'y': 50, 'z': 100},
+    'mixed': {'x': 100, 'y': 100, 'z': 100},
+    'pallet': {'x': 200, 'y': 200, 'z': 200},
+}
+
+
+def generate(workload, count, seed):
+    """
+    生成 (items_data, space_dimensions)
+
+    同样的参数总是生成同样的订单。容器为立方体，容积等于物品总体积，
+    边长不小于最大的物品，因此利用率反映的是算法能装进多少；FIXED_SPACES 中的订单种类
+    使用固定的容器。
+    """
+    rng = random.Random(f'{workload}:{count}:{seed}')
+    items = WORKLOADS[workload](count, rng)
+    if workload in FIXED_SPACES:
+        return items, dict(FIXED_SPACES[workload])
+    total = sum(item['dimensions']['x'] * item['dimensions']['y'] * item['dimensions']['z'] for item in items)
+    largest = max((max(item['dimensions'].values()) for item in items), default=1)
+    side = max(math.ceil(total ** (1 / 3)), largest)
+    return items, {'x': side, 'y': side, 'z': side}
+
+
+def run_case(workload, count, seed, algorithm=None, measure_memory=False):
+    """
+    用 algorithm 版本的 place_batch（见 loader.load_place_batch，与服务层相同）计算一个
+    合成订单，返回 (列式编码的摆放结果, 耗时毫秒, 内存峰值 MB)
+
+    measure_memory 为 True 时再用 tracemalloc 运行一次，记录 Python 内存分配的峰值，
+    耗时只取第一次没有 tracemalloc 的运行。在 sandbox 子进程中运行，
+    利用率和约束检查由 evaluate 在父进程中完成，上传的代码无法影响。
+    """
+    items, space = generate(workload, count, seed)
+    items = ItemBatch.from_items(items)
+    place_batch = load_place_batch(algorithm)
+    start = time.perf_counter()
+    placed_items = place_batch(items, space)
+    time_ms = (time.perf_counter() - start) * 1000
+    peak_mb = None
+    if measure_memory:
+        tracemalloc.start()
+        try:
+            place_batch(items, space)
+            peak_mb = tracemalloc.get_traced_memory()[1] / 1024 / 1024
+        finally:
+            tracemalloc.stop()
+    return placed_items.encode(), time_ms, peak_mb
+
+
+def evaluate(workload, count, seed, payload, time_ms, peak_mb):
+    """由 run_case 的输出计算一个用例的测量结果"""
+    items, space = generate(workload, count, seed)
+    placed_items = ItemBatch.decode(payload)
+    violations, _ = count_violations(items, placed_items, space)
+    return {
+        'workload': workload,
+        'items': count,
+        'seed': seed,
+        'time_ms': time_ms,
+        'peak_mb': peak_mb,
+        'utilization': volume_utilization(placed_items, space),
+        'violations': sum(violations.values()),
+        'violation_counts': violations,
+        'unsupported': count_unsupported(placed_items, space),
+    }
+
+
+def suite_cases(workloads=None, sizes=SIZES, seeds=1):
+    """(workload, count, seed) 的列表，每种订单和规模各取 seeds 个种子"""
+    return [(workload, count, seed)
+            for workload in (workloads or WORKLOADS)
+            for count in sizes
+            for seed in range(seeds)]
+
+
+def run_suite(cases, pool=None, algorithm=None, measure_memory=False, timeout=None):
+    """
+    运行 suite_cases 给出的全部用例，按相同顺序返回 evaluate 的结果
+
+    pool 为 sandbox 子进程池，每个用例单独提交，timeout 为单个用例的墙钟时限；
+    pool 为 None 时在当前进程中依次运行。出错的用例返回带 error 的结果。
+    """
+    if pool is None:
+        outcomes = []
+        for case in cases:
+            try:
+                outcomes.append(run_case(*case, algorithm=algorithm, measure_memory=measure_memory))
+            except Exception as e:
+                outcomes.append(e)
+    else:
+        futures = [pool.submit(run_case, *case, algorithm=algorithm, measure_memory=measure_memory,
+                               timeout=timeout)
+                   for case in cases]
+        outcomes = []
+        for future in futures:
+            try:
+                outcomes.append(future.result())
+            except Exception as e:
+                outcomes.append(e)
+    results = []
+    for (workload, count, seed), outcome in zip(cases, outcomes):
+        try:
+            if isinstance(outcome, Exception):
+                raise outcome
+            results.append(evaluate(workload, count, seed, *outcome))
+        except Exception as e:
+            results.append({'workload': workload, 'items': count, 'seed': seed,
+                            'error': f"{type(e).__name__}: {e}"})
+    return results
+
+
+def compare(candidate, baseline, max_slowdown, max_utilization_drop):
+    """
+    把候选算法与基准算法在同一套用例上的结果比较，返回退化原因的列表（为空表示没有退化）
+
+    以下情况视为退化：任一用例出错；违反约束多于基准；总耗时超过基准的 max_slowdown 倍；
+    平均利用率比基准低 max_utilization_drop 以上。基准算法出错的用例不参与比较。
+    悬空的物品数只在报告中列出，不作为退化（上传的算法不要求支撑，见 verify.count_unsupported）。
+    """
+    reasons = []
+    pairs = []
+    for new, old in zip(candidate, baseline):
+        case = f"{new['workload']}/{new['items']}/{new['seed']}"
+        if 'error' in new:
+            reasons.append(f"{case}: {new['error']}")
+        elif 'error' not in old:
+            pairs.append((case, new, old))
+    for case, new, old in pairs:
+        if new['violations'] > old['violations']:
+            reasons.append(f"{case}: {new['violations']} constraint violations "
+                           f"(active version: {old['violations']})")
+    if not pairs:
+        return reasons
+
+    new_time = sum(new['time_ms'] for _, new, _ in pairs)
+    old_time = sum(old['time_ms'] for _, _, old in pairs)
+    if max_slowdown and new_time > old_time * max_slowdown:
+        reasons.append(f"Total runtime {new_time:.0f} ms is {new_time / old_time:.2f}x the active version "
+                       f"({old_time:.0f} ms), limit {max_slowdown:g}x")
+    new_utilization = sum(new['utilization'] for _, new, _ in pairs) / len(pairs)
+    old_utilization = sum(old['utilization'] for _, _, old in pairs) / len(pairs)
+    if old_utilization - new_utilization > max_utilization_drop:
+        reasons.append(f"Mean utilization {new_utilization:.1%} is below the active version "
+                       f"({old_utilization:.1%}) by more than {max_utilization_drop:.1%}")
+    return reasons
+
+
+def check_time_limit(results, limit_ms):
+    """耗时超过 limit_ms 或出错的用例，返回原因的列表（为空表示全部通过）"""
+    reasons = []
+    for result in results:
+        case = f"{result['workload']}/{result['items']}/{result['seed']}"
+        if 'error' in result:
+            reasons.append(f"{case}: {result['error']}")
+        elif result['time_ms'] > limit_ms:
+            reasons.append(f"{case}: {result['time_ms']:.0f} ms exceeds the {limit_ms:.0f} ms limit")
+    return reasons
+
+
+def check_growth(results, max_growth=MAX_PER_ITEM_GROWTH):
+    """
+    同一种订单相邻的两个规模之间，每个物品的平均耗时增长超过 max_growth 倍或出错的用例，
+    返回原因的列表（为空表示全部通过）
+    """
+    reasons = []
+    previous = {}
+    for result in results:
+        case = f"{result['workload']}/{result['items']}/{result['seed']}"
+        if 'error' in result:
+            reasons.append(f"{case}: {result['error']}")
+            continue
+        per_item = result['time_ms'] / max(result['items'], 1)
+        smaller = previous.get(result['workload'])
+        previous[result['workload']] = (result['items'], per_item)
+        if smaller is None or smaller[1] <= 0:
+            continue
+        growth = per_item / smaller[1]
+        if growth > max_growth:
+            reasons.append(f"{case}: {per_item:.3f} ms per item is {growth:.2f}x that at {smaller[0]} items, "
+                           f"limit {max_growth:g}x")
+    return reasons
+
+
+def format_table(results, label=None):
+    """把 run_suite 的结果排成文本表格；label 为每一行前面的算法名称"""
+    lines = []
+    prefix = f"{'version':<16} " if label is not None else ''
+    lines.append(f"{prefix}{'workload':<15} {'items':>7} {'seed':>4} {'time ms':>10} {'peak MB':>8} "
+                 f"{'util':>7} {'violations':>10} {'unsupported':>11}")
+    for result in results:
+        prefix = f"{label:<16} " if label is not None else ''
+        head = f"{prefix}{result['workload']:<15} {result['items']:>7} {result['seed']:>4}"
+        if 'error' in result:
+            lines.append(f"{head} error: {result['error']}")
+            continue
+        peak = f"{result['peak_mb']:>8.1f}" if result['peak_mb'] is not None else f"{'-':>8}"
+        lines.append(f"{head} {result['time_ms']:>10.1f} {peak} {result['utilization']:>7.1%} "
+                     f"{result['violations']:>10} {result['unsupported']:>11}")
+    return '\n'.join(lines)
@@ -0,0 +1,183 @@
+# box_back/box_back/app/packing/columns.py
+"""
+物品行的列式编码，布局见 app/columnar.py
+
+不依赖 Django，也用于在装箱子进程与 web 进程之间传递摆放结果。
+"""
+import json
+import struct
+import sys
+from array import array
+
+MAGIC = b'BXC1'
+FORMAT_VERSION = 1
+
+FLAG_FACE_UP = 1
+FLAG_FRAGILE = 2
+
+
+# 每个物品的一行数据，与 Item 的字段对应
+ROW_FIELDS = ('order_id', 'name', 'position_x', 'position_y', 'position_z',
+              'width', 'height', 'depth', 'face_up', 'fragile')
+
+_DTYPES = {'i': 'int32', 'I': 'uint32', 'f': 'float32', 'd': 'float64', 'B': 'uint8'}
+_TYPECODES = {dtype: typecode for typecode, dtype in _DTYPES.items()}
+
+
+def _little_endian(buffer):
+    if sys.byteorder != 'little' and buffer.itemsize > 1:
+        buffer.byteswap()
+    return buffer.tobytes()
+
+
+def encode_rows(rows, header=None, float_type='f'):
+    """
+    把 ROW_FIELDS 顺序的行编码为列式二进制
+
+    header 中的字段会合并进 JSON 头部；float_type 为位置和尺寸列的
+    array 类型码，'f' 为 float32，'d' 为 float64。
+    """
+    order_ids = array('i')
+    name_indexes = array('I')
+    positions = array(float_type)
+    dimensions = array(float_type)
+    flags = array('B')
+    names = {}
+
+    for order_id, name, x, y, z, width, height, depth, face_up, fragile in rows:
+        order_ids.append(order_id)
+        name_indexes.append(names.setdefault(name, len(names)))
+        positions.extend((x, y, z))
+        dimensions.extend((width, height, depth))
+        flags.append((FLAG_FACE_UP if face_up else 0) | (FLAG_FRAGILE if fragile else 0))
+    return encode_columns(list(names), order_ids, name_indexes, positions, dimensions, flags, header)
+
+
+def encode_columns(names, order_ids, name_indexes, positions, dimensions, flags, header=None):
+    """
+    由已经按列存放的数据生成列式二进制，各列为 array，格式与 encode_rows 相同
+
+    names 为去重后的名称列表，name_indexes 中是它的下标；positions 和 dimensions
+    依次存放每个物品的 x、y、z。
+    """
+    columns = [
+        ('order_id', order_ids),
+        ('name_index', name_indexes),
+        ('position', positions),
+        ('dimensions', dimensions),
+        ('flags', flags),
+    ]
+    buffers = []
+    chunks = []
+    offset = 0
+    for name, column in columns:
+        data = _little_endian(column)
+        padding = -len(data) % 4
+        buffers.append({'name': name, 'dtype': _DTYPES[column.typecode], 'offset': offset, 'length': len(column)})
+        chunks.append(data + b'\0' * padding)
+        offset += len(data) + padding
+
+    header = dict(header or {}, version=FORMAT_VERSION, count=len(order_ids),
+                  names=names, buffers=buffers)
+    header = json.dumps(header, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    header += b' ' * (-len(header) % 4)
+    return b''.join([MAGIC, struct.pack('<I', len(header)), header] + chunks)
+
+
+def decode_columns(data):
+    """
+    把列式二进制解码为 (头部, {列名: array})
+
+    position 和 dimensions 列依次存放每个物品的 x、y、z，可以直接交给 numpy.frombuffer。
+    """
+    if data[:4] != MAGIC:
+        raise ValueError("Not a columnar placement payload")
+    header_length, = struct.unpack_from('<I', data, 4)
+    header = json.loads(data[8:8 + header_length])
+    base = 8 + header_length
+    view = memoryview(data)
+    columns = {}
+    for buffer in header['buffers']:
+        column = array(_TYPECODES[buffer['dtype']])
+        start = base + buffer['offset']
+        column.frombytes(view[start:start + buffer['length'] * column.itemsize])
+        if sys.byteorder != 'little' and column.itemsize > 1:
+            column.byteswap()
+        columns[buffer['name']] = column
+    return header, columns
+
+
+def iter_decoded_rows(data):
+    """
+    encode_rows 的逆过程，返回 (头部, 行的迭代器)
+
+    各列先整体读入 array（每个物品约 57 字节），行元组在迭代时才逐个构造。
+    """
+    header, columns = decode_columns(data)
+    names = header['names']
+    positions = columns['position']
+    dimensions = columns['dimensions']
+    rows = (
+        (order_id, names[name_index],
+         positions[3 * i], positions[3 * i + 1], positions[3 * i + 2],
+         dimensions[3 * i], dimensions[3 * i + 1], dimensions[3 * i + 2],
+         bool(flag & FLAG_FACE_UP), bool(flag & FLAG_FRAGILE))
+        for i, (order_id, name_index, flag)
+        in enumerate(zip(columns['order_id'], columns['name_index'], columns['flags']))
+    )
+    return header, rows
+
+
+def decode_rows(data):
+    """encode_rows 的逆过程，返回 (头部, ROW_FIELDS 顺序的行列表)"""
+    header, rows = iter_decoded_rows(data)
+    return header, list(rows)
+
+
+def placement_row(item_data):
+    """把一条摆放结果转换为 ROW_FIELDS 顺序的行"""
+    position = item_data['position']
+    dimensions = item_data['dimensions']
+    return (item_data['order_id'], item_data['name'],
+            float(position['x']), float(position['y']), float(position['z']),
+            float(dimensions['x']), float(dimensions['y']), float(dimensions['z']),
+            bool(item_data.get('face_up', False)), bool(item_data.get('fragile', False)))
+
+
+def row_placement(row):
+    """placement_row 的逆过程"""
+    order_id, name, x, y, z, width, height, depth, face_up, fragile = row
+    return {
+        'order_id': order_id,
+        'name': name,
+        'position': {'x': x, 'y': y, 'z': z},
+        'dimensions': {'x': width, 'y': height, 'z': depth},
+        'face_up': face_up,
+        'fragile': fragile,
+    }
+
+
+def encode_placements(placed_items):
+    """把摆放结果编码为 float64 的列式二进制，解码后的数值与编码前完全相同"""
+    return encode_rows((placement_row(item_data) for item_data in placed_items), float_type='d')
+
+
+def decode_placements(data):
+    return [row_placement(row) for row in iter_decoded_rows(data)[1]]
+
+
+def encode_items(items_data):
+    """把待装箱的物品（name、dimensions、face_up、fragile）编码为列式二进制，位置列为 0"""
+    return encode_rows(
+        ((index, item['name'], 0.0, 0.0, 0.0,
+          float(item['dimensions']['x']), float(item['dimensions']['y']), float(item['dimensions']['z']),
+          bool(item.get('face_up', False)), bool(item.get('fragile', False)))
+         for index, item in enumerate(items_data)),
+        float_type='d')
+
+
+def decode_items(data):
+    return [
+        {'name': name, 'dimensions': {'x': width, 'y': height, 'z': depth}, 'face_up': face_up, 'fragile': fragile}
+        for _, name, _, _, _, width, height, depth, face_up, fragile in iter_decoded_rows(data)[1]
+    ]
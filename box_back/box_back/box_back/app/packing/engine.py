@@ -0,0 +1,545 @@
+# box_back/box_back/app/packing/engine.py
+import math
+import statistics
+import time
+
+from .columns import FLAG_FACE_UP, FLAG_FRAGILE
+from .itembatch import ItemBatch
+from .records import dominates, item_orientations, normalize_items, packing_order, size_key
+from .scoring import score_candidates
+from .sku import group_by_sku
+from .spatial import EPS, UNKNOWN_CAPACITY, PointIndex, SpatialIndex, admits, capacity
+
+# 非地面放置时，底面至少需要被支撑的比例
+MIN_SUPPORT = 0.7
+
+# 每次交给打分内核评估的极点数量
+CANDIDATE_BATCH = 8
+
+# 每个轴上网格数量的上限，避免大容器配小物品时网格过细
+MAX_CELLS_PER_AXIS = 128
+
+# 每个极点最多记住的放不下的尺寸键数
+MAX_FAILED_KEYS = 6
+
+# 极点的失败计数达到这一值时视为无用的极点删除。物品放进了其他极点时，之前失败的每个
+# 极点计 PLACED_FAILURE_WEIGHT；物品最终放不下时（容器已满）只计 1，之后更小的物品还可能用到
+MAX_POINT_FAILURES = 1024
+PLACED_FAILURE_WEIGHT = 16
+
+# 每个物品最多查看的极点数，超过后视为放不下
+MAX_POINT_VISITS = 1024
+
+
+class DeadlineExceeded(Exception):
+    """放置过程超过了给定的截止时间"""
+
+
+class ExtremePointPacker:
+    """
+    基于极点 (extreme point) 启发式的三维装箱引擎
+
+    候选极点按 (y, z, x) 排序，即优先靠下、靠里、靠左。每个物品按顺序收集
+    candidate_batch 个可能放得下的极点，把这些极点与所有摆放方向组成的候选
+    交给 score_candidates 一次性评估，取接触面积最大的可行放置；整批都不可行
+    时再看下一批。已放置的物品保存在 SpatialIndex 中，只有候选附近的物品参与评估。
+    """
+
+    def __init__(self, space_dimensions, min_support=MIN_SUPPORT, cell_size=None,
+                 candidate_batch=CANDIDATE_BATCH, use_numpy=None, deadline=None, keep_points=False):
+        self.space = (
+            float(space_dimensions['x']),
+            float(space_dimensions['y']),
+            float(space_dimensions['z']),
+        )
+        self.min_support = min_support
+        self.cell_size = cell_size
+        self.candidate_batch = candidate_batch
+        self.use_numpy = use_numpy
+        # time.perf_counter() 截止时间，超过后放置过程抛出 DeadlineExceeded
+        self.deadline = deadline
+        # 为 True 时保留放不下剩余物品的极点，追加物品时保存的极点还要留给之后更小的物品
+        self.keep_points = keep_points
+        self.index = None
+        self.placements = []
+        # 极点按 (y, z, x) 排序并附带容量上界保存，同时按网格登记以便放置后批量删除被覆盖的极点
+        self._points = PointIndex()
+        self._point_cells = {}
+        # 极点 -> 放不下的物品尺寸键（互不支配的最小键）
+        self._failed = {}
+        # 极点 -> 失败计数（见 MAX_POINT_FAILURES）
+        self._fail_counts = {}
+        # 尚未放置的物品排序后的尺寸在每一维上的最小值，键的形式与 size_key 相同
+        self._floor = (False, 0.0, 0.0, 0.0)
+        self._min_dim = 0.0
+        # 所有物品的最大边长，极点的容量只需计算到这一范围
+        self._max_dim = math.inf
+
+    def _default_cell_size(self, records):
+        sizes = [max(r['w'], r['h'], r['d']) for r in records]
+        cell = statistics.median(sizes) if sizes else 1.0
+        return max(cell, max(self.space) / MAX_CELLS_PER_AXIS)
+
+    def _cell_of(self, x, y, z):
+        c = self.index.cell_size
+        return (math.floor(x / c), math.floor(y / c), math.floor(z / c))
+
+    def _add_point(self, x, y, z):
+        X, Y, Z = self.space
+        m = self._min_dim
+        if x + m > X + EPS or y + m > Y + EPS or z + m > Z + EPS:
+            return
+        point = (y, z, x)
+        if point in self._points or self.index.contains_point(x, y, z):
+            return
+        bounds = self._capacity(x, y, z)
+        if any(admits(bound, self._floor) for bound in bounds):
+            self._points.add(point, bounds)
+            self._point_cells.setdefault(self._cell_of(x, y, z), set()).add(point)
+
+    def _remove_point(self, point):
+        self._points.remove(point)
+        y, z, x = point
+        self._point_cells[self._cell_of(x, y, z)].discard(point)
+        self._failed.pop(point, None)
+        self._fail_counts.pop(point, None)
+
+    def _extent(self, x, y, z, limit=math.inf):
+        """极点沿三个正方向的可用长度（上界，只会随放置变小），每个方向最多 limit"""
+        point = (x, y, z)
+        index = self.index
+        return tuple(index.reach(point, axis, min(self.space[axis], point[axis] + limit)) - point[axis]
+                     for axis in range(3))
+
+    def _capacity(self, x, y, z):
+        """
+        极点处各个可用长方体的容量上界，见 spatial.capacity
+
+        超过最大物品尺寸的空间没有意义，只在该范围内查找，代价与容器大小无关。
+        """
+        index = self.index
+        boxes = index.free_boxes((x, y, z), self._extent(x, y, z, self._max_dim))
+        if y <= EPS or self.min_support <= 0:
+            return capacity(boxes)
+        # 底面至少 min_support 的面积需要落在长方体底面内可以承重的顶面上。支撑只在从极点起
+        # x、z 方向的一段范围内，底面在该方向上的边长超过范围的 1 / min_support 时支撑比例必然不足
+        supported = []
+        footprints = []
+        for bx, by, bz in boxes:
+            area, reach_x, reach_z = index.solid_support(x, z, x + bx, z + bz, y)
+            supported.append((min(bx, (reach_x + EPS) / self.min_support), by,
+                              min(bz, (reach_z + EPS) / self.min_support)))
+            footprints.append((area + EPS) / self.min_support)
+        return capacity(supported, footprints)
+
+    def _refresh(self, point):
+        """放置后极点的容量可能变小，重新计算；返回剩余的物品是否都放不下"""
+        y, z, x = point
+        bounds = self._capacity(x, y, z)
+        self._points.update(point, bounds)
+        return not any(admits(bound, self._floor) for bound in bounds)
+
+    def _choose(self, batch, fragile):
+        """用打分内核一次性评估一批极点的所有可用方向，返回最佳放置或 None"""
+        rows = []
+        ids = set()
+        index = self.index
+        for (y, z, x), candidates in batch:
+            for w, h, d in candidates:
+                rows.append((x, y, z, w, h, d))
+            # 向外扩展一点，把紧贴候选位置的物品也算作邻居以统计接触面积
+            ids.update(index.nearby(
+                x - 2 * EPS, y - 2 * EPS, z - 2 * EPS,
+                x + max(o[0] for o in candidates) + 2 * EPS,
+                y + max(o[1] for o in candidates) + 2 * EPS,
+                z + max(o[2] for o in candidates) + 2 * EPS,
+            ))
+        ids = sorted(ids)
+        best = score_candidates(
+            rows, self.space,
+            [index.boxes[i] for i in ids],
+            [index.fragile[i] for i in ids],
+            self.min_support,
+            fragile_item=fragile,
+            use_numpy=self.use_numpy,
+        )
+        return None if best is None else rows[best]
+
+    def _fail(self, point, key):
+        """
+        记录 key 在极点放不下，返回该极点是否已经没有用处
+
+        放置只会增加障碍，支配 key 的物品在该极点同样放不下。剩余物品的尺寸下界
+        self._floor 支配某个放不下的键时，剩余的任何物品都放不下，极点可以删除。
+        """
+        keys = self._failed.get(point)
+        if keys is None:
+            keys = self._failed[point] = []
+        else:
+            keys[:] = [k for k in keys if not dominates(k, key)]
+            if len(keys) >= MAX_FAILED_KEYS:
+                del keys[0]
+        keys.append(key)
+        return dominates(self._floor, key)
+
+    def _find_position(self, record):
+        """
+        为物品找到最佳放置 (x, y, z, w, h, d)，放不下时返回 None
+
+        按 (y, z, x) 顺序只访问容量上界可能容纳该物品的极点（见 PointIndex），最多
+        MAX_POINT_VISITS 个，并跳过已知放不下的极点。各个方向先用空间索引的精确相交查询
+        过滤，只有不与已放置物品相交的候选才交给打分内核检查支撑和易碎约束。相交过滤失败时
+        重新计算极点的容量，过滤或打分失败都记入 _fail 和失败计数（见 MAX_POINT_FAILURES），
+        没有用处的极点随即删除。尺寸各不相同的订单中，已被包围、任何物品都放不上去的极点
+        因此不会被之后的每个物品重复检查。
+        """
+        orientations = item_orientations(record['w'], record['h'], record['d'], record['face_up'])
+        key = size_key(record['w'], record['h'], record['d'], record['face_up'])
+        X, Y, Z = self.space
+        failed = self._failed
+        floor = self._floor
+        fitting = self.index.fitting
+        useless = []
+        passed = []
+        found = None
+        batch = []
+        for visits, point in enumerate(self._points.candidates(key)):
+            if visits >= MAX_POINT_VISITS:
+                break
+            keys = failed.get(point)
+            if keys is not None and any(dominates(key, k) for k in keys):
+                if any(dominates(floor, k) for k in keys):
+                    useless.append(point)
+                continue
+            y, z, x = point
+            candidates = [o for o in orientations
+                          if x + o[0] <= X + EPS and y + o[1] <= Y + EPS and z + o[2] <= Z + EPS]
+            if candidates:
+                candidates = fitting(x, y, z, candidates)
+            if candidates:
+                batch.append((point, candidates))
+                if len(batch) < self.candidate_batch:
+                    continue
+            else:
+                passed.append(point)
+                if self._fail(point, key) | self._refresh(point):
+                    useless.append(point)
+                continue
+            found = self._choose(batch, record['fragile'])
+            if found:
+                break
+            for stale, _ in batch:
+                passed.append(stale)
+                if self._fail(stale, key):
+                    useless.append(stale)
+            batch = []
+        if batch and not found:
+            found = self._choose(batch, record['fragile'])
+            if not found:
+                for stale, _ in batch:
+                    passed.append(stale)
+                    if self._fail(stale, key):
+                        useless.append(stale)
+        # 物品放进了更靠后的极点时，前面失败的极点多半已被包围，计数增加得更快
+        step = PLACED_FAILURE_WEIGHT if found else 1
+        counts = self._fail_counts
+        for point in passed:
+            count = counts[point] = counts.get(point, 0) + step
+            if count >= MAX_POINT_FAILURES:
+                useless.append(point)
+        for point in dict.fromkeys(useless):
+            self._remove_point(point)
+        return found
+
+    def _occupy(self, x, y, z, w, h, d, fragile):
+        """把一个实心区域登记到索引中，删除被覆盖的极点并生成新的极点"""
+        index = self.index
+        box = (x, y, z, x + w, y + h, z + d)
+        index.insert(box, fragile)
+        # 删除被新物品覆盖的极点；新物品负方向一个网格内的极点容量可能变小，重新计算，
+        # 剩余物品都放不下的极点随即删除。只处理新物品附近的网格，代价与极点总数无关
+        lo = self._cell_of(x, y, z)
+        hi = self._cell_of(x + w, y + h, z + d)
+        point_cells = self._point_cells
+        reach = self._max_dim
+        for i in range(lo[0] - 1, hi[0] + 1):
+            for j in range(lo[1] - 1, hi[1] + 1):
+                for k in range(lo[2] - 1, hi[2] + 1):
+                    bucket = point_cells.get((i, j, k))
+                    if not bucket:
+                        continue
+                    for point in list(bucket):
+                        py, pz, px = point
+                        if (px >= box[3] - EPS or py >= box[4] - EPS or pz >= box[5] - EPS or
+                                px + reach <= x + EPS or py + reach <= y + EPS or pz + reach <= z + EPS):
+                            continue
+                        if (x - EPS <= px and y - EPS <= py and z - EPS <= pz) or self._refresh(point):
+                            self._remove_point(point)
+        # 新极点及其沿坐标轴负方向的投影
+        corner_x = (x + w, y, z)
+        corner_y = (x, y + h, z)
+        corner_z = (x, y, z + d)
+        for point, axes in ((corner_x, (1, 2)), (corner_y, (0, 2)), (corner_z, (1, 0))):
+            self._add_point(*point)
+            for axis in axes:
+                projected = list(point)
+                projected[axis] = index.project(point, axis)
+                self._add_point(*projected)
+
+    def _commit(self, record, x, y, z, w, h, d):
+        self.placements.append((record, (x, y, z), (w, h, d)))
+        self._occupy(x, y, z, w, h, d, record['fragile'])
+
+    def _block_fits(self, x, y, z, w, h, d, columns, fragile):
+        X, Y, Z = self.space
+        if x + w > X + EPS or y + h > Y + EPS or z + d > Z + EPS:
+            return False
+        index = self.index
+        if index.overlaps(x, y, z, x + w, y + h, z + d):
+            return False
+        if fragile and index.covered(x, z, x + w, z + d, y + h):
+            return False
+        if y > EPS:
+            # 多列的块要求底面完全被支撑，保证每个底层物品都不悬空
+            required = 1.0 if columns > 1 else self.min_support
+            area, on_fragile = index.support(x, z, x + w, z + d, y)
+            if on_fragile or area < required * w * d - EPS:
+                return False
+        return True
+
+    def _grow_block(self, x, y, z, w, h, d, count, fragile):
+        """
+        以已确定可放下单个物品的位置为起点，求能放下的最大块 (nx, ny, nz)
+
+        先铺满一层 (x, z)，再向上叠层；易碎品不叠放。放不下时把数量最多的轴减半。
+        """
+        ex, ey, ez = self._extent(x, y, z)
+        nx = max(1, min(int((ex + EPS) // w), count))
+        nz = max(1, min(int((ez + EPS) // d), count // nx))
+        ny = 1 if fragile else max(1, min(int((ey + EPS) // h), count // (nx * nz)))
+        while (nx, ny, nz) != (1, 1, 1):
+            if self._block_fits(x, y, z, nx * w, ny * h, nz * d, nx * nz, fragile):
+                break
+            if nx >= ny and nx >= nz:
+                nx = (nx + 1) // 2
+            elif nz >= ny:
+                nz = (nz + 1) // 2
+            else:
+                ny = (ny + 1) // 2
+        return nx, ny, nz
+
+    def _commit_block(self, records, x, y, z, w, h, d, nx, ny, nz):
+        """放置一整块相同物品，逐层（自下而上）展开为单个物品的位置"""
+        n = 0
+        for j in range(ny):
+            for k in range(nz):
+                for i in range(nx):
+                    self.placements.append((records[n], (x + i * w, y + j * h, z + k * d), (w, h, d)))
+                    n += 1
+        self._occupy(x, y, z, nx * w, ny * h, nz * d, records[0]['fragile'])
+
+    def _check_deadline(self):
+        if self.deadline is not None and time.perf_counter() > self.deadline:
+            raise DeadlineExceeded()
+
+    def _prepare(self, records):
+        """建立索引；返回每个位置上剩余物品（该记录及其之后的记录）的尺寸下界"""
+        floors = []
+        low = (math.inf, math.inf, math.inf)
+        for r in reversed(records):
+            dims = sorted((r['w'], r['h'], r['d']))
+            low = (min(low[0], dims[0]), min(low[1], dims[1]), min(low[2], dims[2]))
+            floors.append((False,) + low)
+        floors.reverse()
+        if records:
+            self._set_floor(floors[0])
+            max_dim = max(max(r['w'], r['h'], r['d']) for r in records)
+            if max_dim > self._max_dim:
+                # 已有极点的容量只计算到之前的最大尺寸，对更大的物品未知
+                for point in list(self._points):
+                    self._points.update(point, UNKNOWN_CAPACITY)
+            self._max_dim = max_dim
+        if self.index is None:
+            self.index = SpatialIndex(self.cell_size or self._default_cell_size(records))
+            self._add_point(0.0, 0.0, 0.0)
+        return floors
+
+    def _set_floor(self, floor):
+        if self.keep_points:
+            return
+        self._floor = floor
+        self._min_dim = floor[1]
+
+    def restore(self, index, points=None):
+        """
+        在已有的摆放上恢复引擎状态，之后的 pack/pack_groups 只放置新的物品
+
+        index 为容器内已放置物品按装载顺序登记的 SpatialIndex，新物品继续登记在其中。
+        给定 points（extreme_points 保存的极点和容量）时直接使用，不重新计算；否则按顺序
+        重放每个物品的占用过程重新生成极点，不做位置搜索。恢复的物品不计入 placements。
+        """
+        if points is None:
+            self.index = SpatialIndex(index.cell_size)
+            # 容量先计算到已有物品的最大尺寸，新物品更大时由 _prepare 标记为未知
+            self._max_dim = max((max(x1 - x0, y1 - y0, z1 - z0) for x0, y0, z0, x1, y1, z1 in index.boxes),
+                                default=math.inf)
+            self._add_point(0.0, 0.0, 0.0)
+            for (x0, y0, z0, x1, y1, z1), fragile in zip(index.boxes, index.fragile):
+                self._occupy(x0, y0, z0, x1 - x0, y1 - y0, z1 - z0, fragile)
+            return
+        self.index = index
+        max_dim, entries = points
+        self._max_dim = max_dim
+        for point, bounds in entries:
+            point = tuple(point)
+            self._points.add(point, bounds)
+            y, z, x = point
+            self._point_cells.setdefault(self._cell_of(x, y, z), set()).add(point)
+
+    def extreme_points(self):
+        """
+        当前的极点，交给 restore 恢复：(容量计算到的最大尺寸, [((y, z, x), 容量上界), ...])
+
+        只由基本类型组成，可以用 marshal 保存。
+        """
+        capacity = self._points.capacity
+        return self._max_dim, [(point, capacity[point]) for point in self._points]
+
+    def pack(self, records):
+        """
+        按给定顺序放置物品
+
+        返回 (placements, overflow)：placements 为 (record, position, dimensions)
+        列表，overflow 为容器内放不下的记录。
+        """
+        floors = self._prepare(records)
+        overflow = []
+        for record, floor in zip(records, floors):
+            self._check_deadline()
+            self._set_floor(floor)
+            found = self._find_position(record)
+            if found is None:
+                overflow.append(record)
+                continue
+            x, y, z, w, h, d = found
+            self._commit(record, x, y, z, w, h, d)
+        return self.placements, overflow
+
+    def pack_groups(self, groups):
+        """
+        按 SKU 组放置物品，每组内相同的物品以块为单位一次放置
+
+        先用打分内核为组内第一个物品选位置和方向，再在该位置尽量扩展成块，
+        因此耗时取决于块的数量而不是物品数量。返回值与 pack 相同。
+        """
+        floors = self._prepare([r for group in groups for r in group[:1]])
+        overflow = []
+        for group, floor in zip(groups, floors):
+            self._set_floor(floor)
+            remaining = group
+            while remaining:
+                self._check_deadline()
+                first = remaining[0]
+                found = self._find_position(first)
+                if found is None:
+                    # 同组物品完全相同，一个放不下则其余也放不下
+                    overflow.extend(remaining)
+                    break
+                x, y, z, w, h, d = found
+                nx, ny, nz = self._grow_block(x, y, z, w, h, d, len(remaining), first['fragile'])
+                count = nx * ny * nz
+                self._commit_block(remaining[:count], x, y, z, w, h, d, nx, ny, nz)
+                remaining = remaining[count:]
+        return self.placements, overflow
+
+
+def build_output(placements, overflow, space_dimensions, first_order_id=1, overflow_x=None):
+    """
+    转换为 place_items 约定的输出格式，order_id 即装载顺序
+
+    放不下的物品从 overflow_x（默认为容器的 X 边界）开始沿 X 轴依次摆在容器外，
+    保证每个物品都有位置。在已有的摆放上追加时 order_id 从 first_order_id 开始。
+    """
+    placed_items = []
+    for record, position, dims in placements:
+        placed_items.append({
+            'order_id': len(placed_items) + first_order_id,
+            'name': record['name'],
+            'position': {'x': position[0], 'y': position[1], 'z': position[2]},
+            'dimensions': {'x': dims[0], 'y': dims[1], 'z': dims[2]},
+            'face_up': record['face_up'],
+            'fragile': record['fragile'],
+        })
+    current_x = float(space_dimensions['x']) if overflow_x is None else overflow_x
+    for record in overflow:
+        placed_items.append({
+            'order_id': len(placed_items) + first_order_id,
+            'name': record['name'],
+            'position': {'x': current_x, 'y': 0.0, 'z': 0.0},
+            'dimensions': {'x': record['w'], 'y': record['h'], 'z': record['d']},
+            'face_up': record['face_up'],
+            'fragile': record['fragile'],
+        })
+        current_x += record['w']
+    return placed_items
+
+
+def build_batch(placements, overflow, space_dimensions):
+    """与 build_output 相同，但直接写入 ItemBatch 的各列，不构造摆放结果字典"""
+    batch = ItemBatch()
+    names = {}
+    order_id = batch.order_id
+    name_index = batch.name_index
+    position = batch.position
+    dimensions = batch.dimensions
+    flags = batch.flags
+    for record, point, dims in placements:
+        name_index.append(names.setdefault(record['name'], len(names)))
+        position.extend(point)
+        dimensions.extend(dims)
+        flags.append((FLAG_FACE_UP if record['face_up'] else 0) | (FLAG_FRAGILE if record['fragile'] else 0))
+    current_x = float(space_dimensions['x'])
+    for record in overflow:
+        name_index.append(names.setdefault(record['name'], len(names)))
+        position.extend((current_x, 0.0, 0.0))
+        dimensions.extend((record['w'], record['h'], record['d']))
+        flags.append((FLAG_FACE_UP if record['face_up'] else 0) | (FLAG_FRAGILE if record['fragile'] else 0))
+        current_x += record['w']
+    order_id.extend(range(1, len(flags) + 1))
+    batch.names = list(names)
+    return batch
+
+
+def pack_records(records, space_dimensions, min_support=MIN_SUPPORT, use_numpy=None, group_skus=True,
+                 order=packing_order, candidate_batch=CANDIDATE_BATCH, deadline=None):
+    """用极点引擎放置 normalize_items 给出的记录，返回 (placements, overflow)，参数见 pack_items"""
+    packer = ExtremePointPacker(space_dimensions, min_support=min_support,
+                                candidate_batch=candidate_batch, use_numpy=use_numpy, deadline=deadline)
+    try:
+        if group_skus:
+            return packer.pack_groups(group_by_sku(records, order))
+        return packer.pack(order(records))
+    except DeadlineExceeded:
+        # 保留截止时间前已经放置的物品，其余物品摆在容器外
+        placed = {record['index'] for record, _, _ in packer.placements}
+        return packer.placements, [record for record in order(records) if record['index'] not in placed]
+
+
+def pack_items(items_data, space_dimensions, min_support=MIN_SUPPORT, use_numpy=None, group_skus=True,
+               order=packing_order, candidate_batch=CANDIDATE_BATCH, deadline=None):
+    """
+    使用极点引擎计算物品位置，输入输出与 place_items 相同
+
+    group_skus 为 True 时先把相同尺寸和属性的物品合并为 SKU 组，按块放置；
+    order 决定物品（或 SKU 组）的放置顺序。给定 deadline（time.perf_counter() 时间）时，
+    到期后不再放置，返回已经放置的部分，其余物品摆在容器外。
+    """
+    placements, overflow = pack_records(normalize_items(items_data), space_dimensions, min_support, use_numpy,
+                                        group_skus, order, candidate_batch, deadline)
+    return build_output(placements, overflow, space_dimensions)
+
+
+def pack_batch(items, space_dimensions, **options):
+    """与 pack_items 相同，输入输出为 ItemBatch，options 见 pack_items"""
+    placements, overflow = pack_records(items.records(), space_dimensions, **options)
+    return build_batch(placements, overflow, space_dimensions)
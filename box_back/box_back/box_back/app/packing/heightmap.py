@@ -0,0 +1,504 @@
+# box_back/box_back/app/packing/heightmap.py
+"""
+基于高度图的装箱引擎（分层装载）
+
+容器底面离散为边长 resolution 的网格，高度图记录每个网格当前的堆放高度（实际高度，
+不取整）。只有物品底面的 x、z 向上取整为网格数，物品总是从网格边界开始摆放，
+结果在水平方向略偏保守，但物品之间不会重叠，也不会超出容器，竖直方向没有空隙。
+
+物品在每个轴上覆盖网格的一段前缀，cover_x、cover_z 记录顶面所在的物品在各网格 x、z
+方向覆盖的比例，上下两个物品在同一网格中都覆盖的部分取两者比例的较小值，由此计算
+实际的支撑面积。支撑图记录网格是否被顶面所在的物品完整覆盖：是时为该物品的顶面高度，
+否则为 -1。默认分辨率尽量取各水平尺寸的公约数（见 default_resolution），这时物品正好
+占整数个网格，没有部分覆盖的网格。
+物品底面占 cw × cd 个网格时，各位置的落点高度是高度图上 cw × cd 窗口的最大值；
+支撑图的窗口最小值等于落点高度表示底面被完全支撑，高度图的窗口最小值等于落点高度
+（窗口内的网格同高）时支撑面积通常足够，先于其余位置精确检查；易碎品标记的窗口最大值
+不为 0 表示下方有易碎品。这些窗口数组用分离的滑动窗口 max/min 一次算出，按底面尺寸缓存，
+放置物品后只更新受影响的区域。
+
+候选位置只取轮廓的角点：x、z 坐标各为 0 或某个已放置物品的边界。任意位置沿 -x 平移，
+直到再移一格落点会变高为止，停下时左侧相邻的网格比落点高，该网格上的物品在此处结束；
+沿 -z 同理，交替平移最终停在角点上，落点不更高，次序也更靠前。
+角点保存为显式的列表，由 _place 维护：新放置的块内各物品的边界与附近（不超过最大物品
+边长）已有的边界组合为新的角点，左、前方网格与之同高的角点（平移不会停在那里）删除。
+每个物品只在这些角点上读取窗口数组，代价与角点数和放置后更新的区域成正比，而不是
+每次都处理整个网格；需要精确检查支撑的位置也只在角点中选取。
+"""
+import math
+import time
+from collections import OrderedDict
+
+try:
+    import numpy as np
+except ImportError:  # 没有 numpy 时不能使用该引擎
+    np = None
+
+from .engine import MIN_SUPPORT, build_batch, build_output
+from .records import height_order, item_orientations, normalize_items
+from .sku import group_by_sku
+from .spatial import EPS
+
+# 自动选择分辨率时底面每个轴最多的网格数
+MAX_GRID_CELLS = 256
+
+# 尺寸没有公约数时，最小的物品水平尺寸最多占的网格数；更细的网格只是让每个物品的计算变慢
+MAX_ITEM_CELLS = 8
+
+# 底面网格总数的上限，防止过细的分辨率耗尽内存
+MAX_TOTAL_CELLS = 1 << 22
+
+# 最多缓存的底面尺寸数，每个尺寸最多保存四个与高度图大小相近的数组
+MAX_CACHED_SHAPES = 64
+
+# 部分支撑的位置每批精确检查的个数，之后每批加倍
+PARTIAL_CANDIDATES = 64
+
+# 部分支撑的位置最多精确检查的个数
+MAX_PARTIAL_CANDIDATES = 4096
+
+# 把长度换算为网格数时的容差，避免浮点误差多算或少算一格
+CELL_EPS = 1e-9
+
+# default_resolution 寻找尺寸公约数时最多考虑的小数位数
+UNIT_DIGITS = 6
+
+
+def default_resolution(space, records):
+    """
+    容器底面和物品可能的水平尺寸有不小于 max(X, Z) / MAX_GRID_CELLS 的公约数时取该公约数，
+    物品正好占整数个网格；否则底面较长的一边分为 MAX_GRID_CELLS 格，但不细于最小的水平尺寸
+    的 1 / MAX_ITEM_CELLS，容器和物品尺寸都是整数时取不小于它的整数
+    """
+    resolution = max(space[0], space[2]) / MAX_GRID_CELLS
+    horizontal = [space[0], space[2]]
+    for r in records:
+        horizontal.extend((r['w'], r['d']) if r['face_up'] else (r['w'], r['h'], r['d']))
+    unit = _common_unit(horizontal)
+    if unit is not None and unit >= resolution - CELL_EPS:
+        return unit
+    # 物品只是向上取整到网格，网格比物品细得多时浪费的空间已经很少
+    resolution = max(resolution, min(horizontal[2:], default=0.0) / MAX_ITEM_CELLS)
+    values = list(space) + [r[axis] for r in records for axis in ('w', 'h', 'd')]
+    if all(float(value).is_integer() for value in values):
+        resolution = max(1.0, float(math.ceil(resolution)))
+    return resolution
+
+
+def _common_unit(values):
+    """values 的最大公约数（最多 UNIT_DIGITS 位小数），不存在时返回 None"""
+    for digits in range(UNIT_DIGITS + 1):
+        scale = 10 ** digits
+        scaled = []
+        for value in values:
+            n = round(value * scale)
+            if n <= 0 or abs(n - value * scale) > CELL_EPS * n:
+                break
+            scaled.append(n)
+        else:
+            return math.gcd(*scaled) / scale
+    return None
+
+
+def _cells(length, resolution):
+    """物品在一个轴上占用的网格数（向上取整）"""
+    return max(1, math.ceil(length / resolution - CELL_EPS))
+
+
+def _coverage(length, cells, resolution):
+    """物品在一个轴上对各个网格的覆盖比例"""
+    return np.clip(length / resolution - np.arange(cells), 0.0, 1.0)
+
+
+def _running(a, k, axis, op):
+    """沿 axis 长度为 k 的滑动窗口上的 op（np.maximum 或 np.minimum），结果长度为 n - k + 1"""
+    a = np.swapaxes(a, 0, axis)
+    n = a.shape[0] - k + 1
+    out = a
+    span = 1
+    # 倍增：out[i] 依次覆盖 a[i:i + 2], a[i:i + 4], ...
+    while span * 2 <= k:
+        out = op(out[:-span], out[span:])
+        span *= 2
+    out = op(out[:n], out[k - span:k - span + n])
+    return np.swapaxes(out, 0, axis)
+
+
+def _window(a, kw, kd, op):
+    return _running(_running(a, kw, 0, op), kd, 1, op)
+
+
+class HeightmapPacker:
+    """
+    高度图装箱引擎
+
+    每个物品选择落点最低的位置，同样高度时优先靠里 (z)、靠左 (x)；底面完全被支撑的
+    位置直接可用，其余位置要求下方物品实际支撑的底面积比例不低于 min_support。
+    物品不能放在易碎品上方。
+    """
+
+    def __init__(self, space_dimensions, resolution=None, min_support=MIN_SUPPORT, deadline=None):
+        if np is None:
+            raise RuntimeError("The heightmap engine requires numpy")
+        self.space = (
+            float(space_dimensions['x']),
+            float(space_dimensions['y']),
+            float(space_dimensions['z']),
+        )
+        self.resolution = resolution
+        self.min_support = min_support
+        # time.perf_counter() 截止时间，到期后剩余的物品直接放入 overflow
+        self.deadline = deadline
+        self.height = None
+        self.support = None
+        self.cover_x = None
+        self.cover_z = None
+        self.fragile = None
+        # 是否已经放置过易碎品，之前不需要易碎品的窗口
+        self.has_fragile = False
+        # 各网格坐标是否为容器边界或已放置物品的边界
+        self.edge_x = None
+        self.edge_z = None
+        # 候选角点的网格坐标，is_corner 用于去重
+        self.corner_i = None
+        self.corner_j = None
+        self.is_corner = None
+        # (cw, cd) -> [窗口最大高度, 窗口最小承重高度, 窗口最小高度, 窗口内是否有易碎品, 待更新的区域]
+        self._windows = OrderedDict()
+
+    def _expired(self):
+        return self.deadline is not None and time.perf_counter() > self.deadline
+
+    def _prepare(self, records):
+        if self.resolution is None:
+            self.resolution = default_resolution(self.space, records)
+        r = self.resolution
+        self.shape = tuple(math.floor(length / r + CELL_EPS) for length in self.space)
+        nx, _, nz = self.shape
+        if nx * nz > MAX_TOTAL_CELLS:
+            raise ValueError(f"Heightmap resolution {r:g} is too fine for the container")
+        self.height = np.zeros((nx, nz))
+        self.support = np.zeros((nx, nz))
+        # 容器底面整体可以承重
+        self.cover_x = np.ones((nx, nz))
+        self.cover_z = np.ones((nx, nz))
+        self.fragile = np.zeros((nx, nz), dtype=np.int8)
+        self.has_fragile = False
+        self.corner_i = np.zeros(1, dtype=np.int64)
+        self.corner_j = np.zeros(1, dtype=np.int64)
+        self.is_corner = np.zeros((nx, nz), dtype=bool)
+        self.is_corner[0, 0] = True
+        self.edge_x = np.zeros(nx, dtype=bool)
+        self.edge_z = np.zeros(nz, dtype=bool)
+        self.edge_x[0] = self.edge_z[0] = True
+        sides = [length for record in records
+                 for length in ((record['w'], record['d']) if record['face_up']
+                                else (record['w'], record['h'], record['d']))]
+        # 候选角点只与附近 reach 个网格内的边界组合，窗口不会更宽
+        self.reach = _cells(max(sides, default=r), r)
+        # 物品都正好占整数个网格时没有部分覆盖的网格，承重高度即高度
+        self.exact = all(abs(length / r - round(length / r)) <= CELL_EPS * length / r for length in sides)
+        self._windows.clear()
+
+    def _window_arrays(self, cw, cd):
+        """底面 cw × cd 的窗口数组，先把缓存中过期的区域重新计算"""
+        entry = self._windows.get((cw, cd))
+        if entry is None:
+            bottom = _window(self.support, cw, cd, np.minimum)
+            level = bottom if self.exact else _window(self.height, cw, cd, np.minimum)
+            # 还没有放置易碎品时不需要易碎品的窗口
+            fragile = _window(self.fragile, cw, cd, np.maximum) if self.has_fragile else None
+            entry = [_window(self.height, cw, cd, np.maximum), bottom, level, fragile, None]
+            self._windows[(cw, cd)] = entry
+            while len(self._windows) > MAX_CACHED_SHAPES:
+                self._windows.popitem(last=False)
+        else:
+            self._windows.move_to_end((cw, cd))
+            if entry[4] is not None:
+                self._refresh(cw, cd, entry)
+        return entry
+
+    def _refresh(self, kw, kd, entry):
+        """重新计算窗口与上次使用后放置的区域相交的位置"""
+        top, bottom, level, fragile, (i0, i1, j0, j1) = entry
+        nx, _, nz = self.shape
+        a0, a1 = max(0, i0 - kw + 1), min(nx - kw, i1 - 1)
+        b0, b1 = max(0, j0 - kd + 1), min(nz - kd, j1 - 1)
+        entry[4] = None
+        if a0 > a1 or b0 > b1:
+            return
+        region = (slice(a0, a1 + 1), slice(b0, b1 + 1))
+        top[region] = _window(self.height[a0:a1 + kw, b0:b1 + kd], kw, kd, np.maximum)
+        bottom[region] = _window(self.support[a0:a1 + kw, b0:b1 + kd], kw, kd, np.minimum)
+        if level is not bottom:
+            level[region] = _window(self.height[a0:a1 + kw, b0:b1 + kd], kw, kd, np.minimum)
+        if fragile is not None:
+            fragile[region] = _window(self.fragile[a0:a1 + kw, b0:b1 + kd], kw, kd, np.maximum)
+
+    def _find(self, record):
+        """
+        返回 (排序键, i, j, 落点高度, 物品尺寸, 网格尺寸, 是否完全被支撑) 或 None
+
+        排序键为 (落点高度, j, i)，越小越好。
+        """
+        r = self.resolution
+        nx, _, nz = self.shape
+        limit = self.space[1] + EPS
+        best = None
+        for w, h, d in item_orientations(record['w'], record['h'], record['d'], record['face_up']):
+            cw, cd = _cells(w, r), _cells(d, r)
+            if cw > nx or cd > nz or h > limit:
+                continue
+            top, bottom, level, fragile, _ = self._window_arrays(cw, cd)
+            inside = (self.corner_i <= nx - cw) & (self.corner_j <= nz - cd)
+            i, j = self.corner_i[inside], self.corner_j[inside]
+            heights = top[i, j]
+            feasible = heights + h <= limit
+            if fragile is not None:
+                feasible &= fragile[i, j] == 0
+            if not feasible.any():
+                continue
+            i, j, heights = i[feasible], j[feasible], heights[feasible]
+            # 同样落点高度时优先 z、x
+            order = j * nx + i
+            flat = bottom[i, j] >= heights - EPS
+            found = None
+            if flat.any():
+                low = heights[flat].min()
+                n = int(np.where(flat & (heights <= low + EPS), order, np.iinfo(np.int64).max).argmin())
+                found = ((float(low), int(j[n]), int(i[n])), int(i[n]), int(j[n]), True)
+            # 窗口内的网格都与落点同高、只是有部分覆盖的网格时，支撑面积通常足够，最多检查
+            # MAX_PARTIAL_CANDIDATES 个；窗口内有更低网格的位置很少满足，只检查 PARTIAL_CANDIDATES 个
+            rest = ~flat
+            even = rest & (level[i, j] >= heights - EPS)
+            candidates = (i[even], j[even], heights[even], order[even])
+            partial = self._partial(candidates, w, d, cw, cd, found, MAX_PARTIAL_CANDIDATES)
+            if partial is not None:
+                found = partial
+            if self.min_support < 1:
+                uneven = rest & ~even
+                candidates = (i[uneven], j[uneven], heights[uneven], order[uneven])
+                partial = self._partial(candidates, w, d, cw, cd, found, PARTIAL_CANDIDATES)
+                if partial is not None:
+                    found = partial
+            if found is not None and (best is None or found[0] < best[0]):
+                key, i, j, supported = found
+                best = (key, i, j, float(top[i, j]), (w, h, d), (cw, cd), supported)
+        return best
+
+    def _partial(self, candidates, w, d, cw, cd, found, limit):
+        """
+        在候选位置 (i, j, 落点高度, 次序) 中找比 found 更好且支撑比例足够的位置，
+        返回 (排序键, i, j, 是否完全被支撑)
+
+        按落点高度、z、x 的次序最多精确检查 limit 个位置，每批 PARTIAL_CANDIDATES 个，之后每批加倍。
+        """
+        i, j, heights, order = candidates
+        if found is not None:
+            # 同样高度（在容差内）的位置按 z、x 比较，与 found 的规则相同
+            low = found[0][0]
+            keep = (heights < low - EPS) | ((heights <= low + EPS) & (order < found[2] * self.shape[0] + found[1]))
+            i, j, heights, order = i[keep], j[keep], heights[keep], order[keep]
+        if len(i) == 0:
+            return None
+        if len(i) > limit:
+            nearest = np.argpartition(heights, limit)[:limit]
+            i, j, heights, order = i[nearest], j[nearest], heights[nearest], order[nearest]
+        ranked = np.lexsort((order, heights))
+        i, j, heights = i[ranked], j[ranked], heights[ranked]
+        start, size = 0, PARTIAL_CANDIDATES
+        while start < len(i):
+            batch = slice(start, start + size)
+            found = self._supported(i[batch], j[batch], heights[batch], w, d, cw, cd)
+            if found is not None:
+                return found
+            start, size = start + size, size * 2
+        return None
+
+    def _supported(self, i, j, heights, w, d, cw, cd):
+        """按给定次序返回第一个支撑比例足够的位置 (排序键, i, j, 是否完全被支撑)，没有时返回 None"""
+        # 高度等于落点高度的网格中，上下两个物品都覆盖的部分计入支撑面积（两者都覆盖网格的前缀）
+        cells = (i[:, None, None] + np.arange(cw)[:, None], j[:, None, None] + np.arange(cd))
+        resting = np.abs(self.height[cells] - heights[:, None, None]) <= EPS
+        if not self.exact:
+            cover_x = np.minimum(self.cover_x[cells], _coverage(w, cw, self.resolution)[:, None])
+            cover_z = np.minimum(self.cover_z[cells], _coverage(d, cd, self.resolution))
+            resting = resting * cover_x * cover_z
+        support = resting.sum(axis=(1, 2)) * self.resolution ** 2
+        passed = np.flatnonzero(support >= self.min_support * w * d - CELL_EPS)
+        if len(passed) == 0:
+            return None
+        n = passed[0]
+        return (float(heights[n]), int(j[n]), int(i[n])), int(i[n]), int(j[n]), bool(support[n] >= w * d - EPS)
+
+    def _grow_layer(self, i, j, w, d, cw, cd, base, count):
+        """
+        从完全被支撑的落点开始，把同一 SKU 的 count 个底面为 w × d 的物品尽量铺成 nx × nz 的一层
+
+        整块底面的网格高度必须都是 base，且下方物品在各网格的覆盖比例不小于新物品的覆盖比例
+        （新物品被完全支撑），下方没有易碎品；放不下时把较多的一边减半。返回 (nx, nz)。
+        """
+        r = self.resolution
+        nx_cells, _, nz_cells = self.shape
+        nx = max(1, min((nx_cells - i) // cw, count))
+        nz = max(1, min((nz_cells - j) // cd, count // nx))
+        while (nx, nz) != (1, 1):
+            block = (slice(i, i + nx * cw), slice(j, j + nz * cd))
+            if ((np.abs(self.height[block] - base) <= EPS).all() and not self.fragile[block].any()
+                    and (self.exact
+                         or (self.cover_x[block] >= np.tile(_coverage(w, cw, r), nx)[:, None] - CELL_EPS).all()
+                         and (self.cover_z[block] >= np.tile(_coverage(d, cd, r), nz) - CELL_EPS).all())):
+                break
+            if nx >= nz:
+                nx = (nx + 1) // 2
+            else:
+                nz = (nz + 1) // 2
+        return nx, nz
+
+    def _place(self, i, j, w, d, cw, cd, nx, nz, top, fragile):
+        """放置从网格 (i, j) 开始、nx × nz 个底面为 w × d 的物品，顶面高度为 top"""
+        block = (slice(i, i + nx * cw), slice(j, j + nz * cd))
+        self.height[block] = top
+        r = self.resolution
+        cover_x, cover_z = np.tile(_coverage(w, cw, r), nx), np.tile(_coverage(d, cd, r), nz)
+        self.cover_x[block] = cover_x[:, None]
+        self.cover_z[block] = cover_z
+        # 只有被物品完整覆盖的网格完整承重
+        self.support[block] = np.where(np.outer(cover_x >= 1 - CELL_EPS, cover_z >= 1 - CELL_EPS), top, -1.0)
+        if fragile:
+            self.fragile[block] = 1
+            if not self.has_fragile:
+                # 之前缓存的窗口没有易碎品的窗口，重新计算
+                self.has_fragile = True
+                self._windows.clear()
+        i1, j1 = i + nx * cw, j + nz * cd
+        self._update_corners(i, i1, j, j1, cw, cd)
+        # 各缓存只记录变化的区域（合并为外接矩形），下次使用时再更新
+        for entry in self._windows.values():
+            dirty = entry[4]
+            if dirty is None:
+                entry[4] = (i, i1, j, j1)
+            else:
+                entry[4] = (min(dirty[0], i), max(dirty[1], i1), min(dirty[2], j), max(dirty[3], j1))
+
+    def _flat(self, a, b):
+        """角点 (a, b)（都大于 0）的左、前、左前三个网格是否与它同高，同高时平移不会停在这里"""
+        h = self.height[a, b]
+        return (self.height[a - 1, b] == h) & (self.height[a, b - 1] == h) & (self.height[a - 1, b - 1] == h)
+
+    def _update_corners(self, i, i1, j, j1, cw, cd):
+        """
+        放置覆盖网格 [i, i1) × [j, j1)、每个物品 cw × cd 的块后更新角点列表
+
+        块内（含边界）变得平整的角点删除；块内各物品的边界与 reach 个网格以内已有的边界组合为新的角点。
+        """
+        ci, cj = self.corner_i, self.corner_j
+        inner = (ci >= i) & (ci <= i1) & (cj >= j) & (cj <= j1) & (ci > 0) & (cj > 0)
+        inner[inner] = self._flat(ci[inner], cj[inner])
+        if inner.any():
+            self.is_corner[ci[inner], cj[inner]] = False
+            ci, cj = ci[~inner], cj[~inner]
+        nx, _, nz = self.shape
+        xs = np.arange(i, min(i1, nx - 1) + 1, cw)
+        zs = np.arange(j, min(j1, nz - 1) + 1, cd)
+        self.edge_x[xs] = True
+        self.edge_z[zs] = True
+        near_x = np.flatnonzero(self.edge_x[max(0, i - self.reach):min(i1, nx - 1) + 1]) + max(0, i - self.reach)
+        near_z = np.flatnonzero(self.edge_z[max(0, j - self.reach):min(j1, nz - 1) + 1]) + max(0, j - self.reach)
+        a = np.concatenate([np.repeat(xs, len(near_z)), np.tile(near_x, len(zs))])
+        b = np.concatenate([np.tile(near_z, len(xs)), np.repeat(zs, len(near_x))])
+        keep = ~self.is_corner[a, b]
+        inner = (a > 0) & (b > 0)
+        keep[inner] &= ~self._flat(a[inner], b[inner])
+        a, b = np.divmod(np.unique(a[keep] * nz + b[keep]), nz)
+        if len(a):
+            self.is_corner[a, b] = True
+            ci, cj = np.append(ci, a), np.append(cj, b)
+        self.corner_i, self.corner_j = ci, cj
+
+    def pack(self, records):
+        """
+        按给定顺序放置物品
+
+        返回 (placements, overflow)，格式与 ExtremePointPacker.pack 相同。
+        """
+        self._prepare(records)
+        r = self.resolution
+        placements = []
+        overflow = []
+        for n, record in enumerate(records):
+            if self._expired():
+                overflow.extend(records[n:])
+                break
+            found = self._find(record)
+            if found is None:
+                overflow.append(record)
+                continue
+            _, i, j, base, (w, h, d), (cw, cd), _ = found
+            self._place(i, j, w, d, cw, cd, 1, 1, base + h, record['fragile'])
+            placements.append((record, (i * r, base, j * r), (w, h, d)))
+        return placements, overflow
+
+    def pack_groups(self, groups):
+        """
+        按 SKU 组放置物品，组内相同的物品在平整的落点上一次铺成一层
+
+        托盘式的大批量相同物品只需要按层（块）搜索落点，代价与块数而不是物品数成正比。
+        返回值与 pack 相同。
+        """
+        self._prepare([r for group in groups for r in group[:1]])
+        r = self.resolution
+        placements = []
+        overflow = []
+        for group in groups:
+            remaining = group
+            while remaining:
+                if self._expired():
+                    overflow.extend(remaining)
+                    break
+                found = self._find(remaining[0])
+                if found is None:
+                    # 同组物品完全相同，一个放不下则其余也放不下
+                    overflow.extend(remaining)
+                    break
+                _, i, j, base, (w, h, d), (cw, cd), supported = found
+                nx, nz = 1, 1
+                if supported and len(remaining) > 1:
+                    nx, nz = self._grow_layer(i, j, w, d, cw, cd, base, len(remaining))
+                self._place(i, j, w, d, cw, cd, nx, nz, base + h, remaining[0]['fragile'])
+                n = 0
+                for k in range(nz):
+                    for m in range(nx):
+                        placements.append((remaining[n], ((i + m * cw) * r, base, (j + k * cd) * r), (w, h, d)))
+                        n += 1
+                remaining = remaining[n:]
+        return placements, overflow
+
+
+def pack_heightmap(items_data, space_dimensions, resolution=None, min_support=MIN_SUPPORT, group_skus=True,
+                   order=height_order, deadline=None):
+    """
+    使用高度图引擎计算物品位置，输入输出与 place_items 相同
+
+    resolution 为网格边长（与尺寸同单位），默认见 default_resolution。默认按高度
+    从高到低放置，相近高度的物品形成较平整的层；group_skus 和 deadline 的含义与
+    engine.pack_items 相同。
+    """
+    placements, overflow = _pack_records(normalize_items(items_data), space_dimensions, resolution, min_support,
+                                         group_skus, order, deadline)
+    return build_output(placements, overflow, space_dimensions)
+
+
+def pack_heightmap_batch(items, space_dimensions, resolution=None, min_support=MIN_SUPPORT, group_skus=True,
+                         order=height_order, deadline=None):
+    """与 pack_heightmap 相同，输入输出为 ItemBatch"""
+    placements, overflow = _pack_records(items.records(), space_dimensions, resolution, min_support,
+                                         group_skus, order, deadline)
+    return build_batch(placements, overflow, space_dimensions)
+
+
+def _pack_records(records, space_dimensions, resolution, min_support, group_skus, order, deadline=None):
+    packer = HeightmapPacker(space_dimensions, resolution=resolution, min_support=min_support, deadline=deadline)
+    if group_skus:
+        return packer.pack_groups(group_by_sku(records, order))
+    return packer.pack(order(records))
@@ -0,0 +1,136 @@
+# box_back/box_back/app/packing/incremental.py
+"""
+在已有的摆放上追加物品
+
+已放置的物品保持不动。追加所需的已有摆放保存在 AppendState 中：容器内物品的空间
+索引（含网格）、每个物品的 order_id、容器外物品摆到的 X 坐标，以及引擎上次追加后
+的极点和容量。状态随任务保存（Task.packing_state），下次追加时直接恢复，不读取已有
+的物品行，也不重新计算极点，搜索和校验的代价取决于新物品的数量。没有可用的状态时
+（第一次追加、任务由上传的算法计算等）由已有物品行重建索引，并按装载顺序重放占用
+过程生成极点。追加总是使用内置的极点引擎。
+
+索引由 web 进程维护：子进程只返回新物品的位置和极点，新物品经过校验后才登记到
+web 进程的索引中，校验不依赖子进程返回的索引。
+"""
+import marshal
+import statistics
+import struct
+import zlib
+
+from .columns import decode_items, decode_placements, encode_items, encode_placements
+from .engine import MAX_CELLS_PER_AXIS, ExtremePointPacker, build_output
+from .records import normalize_items
+from .sku import group_by_sku
+from .spatial import EPS, SpatialIndex
+
+STATE_FORMAT = 2
+
+
+class AppendState:
+    """
+    追加物品需要的已有摆放
+
+    index 为容器内物品按装载顺序登记的 SpatialIndex，order_ids[i] 为 index 中第 i 个
+    物品的 order_id；overflow_x 为容器外物品摆到的 X 坐标，next_order_id 为下一个
+    物品的 order_id；points 为 ExtremePointPacker.extreme_points 的结果，未知时为 None。
+    """
+
+    __slots__ = ('index', 'order_ids', 'overflow_x', 'next_order_id', 'points')
+
+    def __init__(self, index, order_ids, overflow_x, next_order_id, points=None):
+        self.index = index
+        self.order_ids = order_ids
+        self.overflow_x = overflow_x
+        self.next_order_id = next_order_id
+        self.points = points
+
+    @classmethod
+    def from_rows(cls, space_dimensions, rows):
+        """由已有物品的行（ROW_FIELDS 顺序）重建，极点未知"""
+        X, Y, Z = (float(space_dimensions[axis]) for axis in 'xyz')
+        rows = sorted(rows, key=lambda row: row[0])
+        inside = []
+        overflow_x = X
+        for order_id, _, x, y, z, w, h, d, _, fragile in rows:
+            if x + w <= EPS or y + h <= EPS or z + d <= EPS or x >= X - EPS or y >= Y - EPS or z >= Z - EPS:
+                overflow_x = max(overflow_x, x + w)
+                continue
+            inside.append((order_id, (x, y, z, x + w, y + h, z + d), fragile))
+        sizes = [max(box[3] - box[0], box[4] - box[1], box[5] - box[2]) for _, box, _ in inside]
+        index = SpatialIndex(max(statistics.median(sizes) if sizes else 1.0, max(X, Y, Z) / MAX_CELLS_PER_AXIS))
+        for _, box, fragile in inside:
+            index.insert(box, fragile)
+        next_order_id = rows[-1][0] + 1 if rows else 1
+        return cls(index, [order_id for order_id, _, _ in inside], overflow_x, next_order_id)
+
+    def dumps(self):
+        return marshal.dumps((self.index.snapshot(), self.order_ids, self.overflow_x, self.next_order_id,
+                              self.points))
+
+    @classmethod
+    def loads(cls, data):
+        snapshot, order_ids, overflow_x, next_order_id, points = marshal.loads(data)
+        return cls(SpatialIndex.from_snapshot(snapshot), order_ids, overflow_x, next_order_id, points)
+
+    def add(self, space_dimensions, placed_items, points):
+        """登记追加的摆放结果（已经校验过）和引擎返回的极点"""
+        X, Y, Z = (float(space_dimensions[axis]) for axis in 'xyz')
+        for item in placed_items:
+            x, y, z = (float(item['position'][axis]) for axis in 'xyz')
+            w, h, d = (float(item['dimensions'][axis]) for axis in 'xyz')
+            if x + w <= EPS or y + h <= EPS or z + d <= EPS or x >= X - EPS or y >= Y - EPS or z >= Z - EPS:
+                self.overflow_x = max(self.overflow_x, x + w)
+            else:
+                self.index.insert((x, y, z, x + w, y + h, z + d), item.get('fragile', False))
+                self.order_ids.append(item['order_id'])
+            self.next_order_id = max(self.next_order_id, item['order_id'] + 1)
+        self.points = points
+
+
+def encode_state(state, revision):
+    """把 AppendState 压缩为 bytes；revision 为状态对应的任务修订号"""
+    return zlib.compress(struct.pack('<II', STATE_FORMAT, revision) + state.dumps(), 1)
+
+
+def decode_state(data, revision):
+    """encode_state 的逆过程；状态与 revision 不对应或格式不同时返回 None"""
+    if not data:
+        return None
+    data = zlib.decompress(data)
+    if len(data) < 8 or struct.unpack_from('<II', data) != (STATE_FORMAT, revision):
+        return None
+    return AppendState.loads(data[8:])
+
+
+def extend_placement(space_dimensions, state, items_data):
+    """
+    把 items_data 放进 state 描述的容器，返回 (新物品的摆放结果, 新的极点)
+
+    新物品的 order_id 接在已有物品之后，放不下的物品摆在已有的容器外物品后面。
+    引擎直接在 state.index 上登记新物品，调用方需要保留原来的状态时应传入副本。
+    """
+    packer = ExtremePointPacker(space_dimensions, keep_points=True)
+    packer.restore(state.index, state.points)
+    placements, overflow = packer.pack_groups(group_by_sku(normalize_items(items_data)))
+    placed_items = build_output(placements, overflow, space_dimensions, state.next_order_id, state.overflow_x)
+    return placed_items, packer.extreme_points()
+
+
+def extend_placement_compact(space_dimensions, state_payload, items_payload):
+    """在 sandbox 子进程中运行的 extend_placement：状态、新物品和结果都以二进制传递"""
+    placed_items, points = extend_placement(space_dimensions, AppendState.loads(state_payload),
+                                            decode_items(items_payload))
+    return encode_placements(placed_items), points
+
+
+def run_extend(pool, space_dimensions, state, items_data):
+    """
+    在 pool（sandbox 子进程池，None 时为当前进程）中运行 extend_placement，返回值相同
+
+    引擎总是在状态的副本上运行，state 本身不变，由调用方校验结果后用 AppendState.add 登记。
+    """
+    if pool is None:
+        return extend_placement(space_dimensions, AppendState.loads(state.dumps()), items_data)
+    payload, points = pool.submit(extend_placement_compact, dict(space_dimensions), state.dumps(),
+                                  encode_items(items_data)).result()
+    return decode_placements(payload), points
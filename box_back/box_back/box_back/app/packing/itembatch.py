@@ -0,0 +1,179 @@
+# box_back/box_back/app/packing/itembatch.py
+"""
+一批物品的列式内存表示
+
+ItemBatch 用几个 array 列保存物品，名称去重后按下标引用，布局与 columns 的列式编码
+相同，编码和解码只是整块复制内存，不为每个物品构造嵌套的字典。待装箱的物品和摆放结果
+使用同一种表示：待装箱物品的 order_id 为输入中的下标，位置为 0。
+
+请求的物品在服务层入口转换一次（as_batch），之后的计算、子进程传输、校验、缓存和保存
+都直接使用各列；原有的字典接口（place_items、build_output 的输出）通过 to_items、
+from_placements 和 batch_adapter 适配。
+"""
+from array import array
+
+from .columns import FLAG_FACE_UP, FLAG_FRAGILE, decode_columns, encode_columns
+from .spatial import EPS
+
+
+def _flag(face_up, fragile):
+    return (FLAG_FACE_UP if face_up else 0) | (FLAG_FRAGILE if fragile else 0)
+
+
+def _triples(values):
+    return list(zip(values[0::3], values[1::3], values[2::3]))
+
+
+class ItemBatch:
+    """
+    按列存放的一批物品
+
+    names 为去重后的名称列表；name_index、order_id、flags 每个物品一项，
+    position、dimensions 每个物品依次三项 (x, y, z)。
+    """
+
+    __slots__ = ('names', 'name_index', 'order_id', 'position', 'dimensions', 'flags')
+
+    def __init__(self, names=None, name_index=None, order_id=None, position=None, dimensions=None, flags=None):
+        self.names = names if names is not None else []
+        self.name_index = name_index if name_index is not None else array('I')
+        self.order_id = order_id if order_id is not None else array('i')
+        self.position = position if position is not None else array('d')
+        self.dimensions = dimensions if dimensions is not None else array('d')
+        self.flags = flags if flags is not None else array('B')
+
+    def __len__(self):
+        return len(self.order_id)
+
+    @classmethod
+    def from_items(cls, items_data):
+        """由待装箱的物品字典（name、dimensions、face_up、fragile）构造，位置为 0"""
+        names = {}
+        name_index = array('I')
+        dimensions = array('d')
+        flags = array('B')
+        for item in items_data:
+            dims = item['dimensions']
+            name_index.append(names.setdefault(item['name'], len(names)))
+            dimensions.extend((float(dims['x']), float(dims['y']), float(dims['z'])))
+            flags.append(_flag(item.get('face_up', False), item.get('fragile', False)))
+        count = len(flags)
+        return cls(list(names), name_index, array('i', range(count)), array('d', bytes(24 * count)),
+                   dimensions, flags)
+
+    @classmethod
+    def from_placements(cls, placed_items):
+        """由 place_items 约定的摆放结果字典构造"""
+        names = {}
+        batch = cls()
+        for item in placed_items:
+            position = item['position']
+            dims = item['dimensions']
+            batch.order_id.append(item['order_id'])
+            batch.name_index.append(names.setdefault(item['name'], len(names)))
+            batch.position.extend((float(position['x']), float(position['y']), float(position['z'])))
+            batch.dimensions.extend((float(dims['x']), float(dims['y']), float(dims['z'])))
+            batch.flags.append(_flag(item.get('face_up', False), item.get('fragile', False)))
+        batch.names = list(names)
+        return batch
+
+    @classmethod
+    def decode(cls, data):
+        """columns 的列式二进制（encode_rows、encode_items 或 encode 的输出）转换为 ItemBatch"""
+        header, columns = decode_columns(data)
+        position, dimensions = columns['position'], columns['dimensions']
+        if position.typecode != 'd':
+            position, dimensions = array('d', position), array('d', dimensions)
+        return cls(header['names'], columns['name_index'], columns['order_id'], position, dimensions,
+                   columns['flags'])
+
+    def encode(self, header=None):
+        """编码为 float64 的列式二进制，与 columns.encode_placements 的格式相同"""
+        return encode_columns(self.names, self.order_id, self.name_index, self.position, self.dimensions,
+                              self.flags, header)
+
+    def rows(self):
+        """按 columns.ROW_FIELDS 顺序逐个生成物品行"""
+        names = self.names
+        position = self.position
+        dimensions = self.dimensions
+        return (
+            (order_id, names[name_index],
+             position[3 * i], position[3 * i + 1], position[3 * i + 2],
+             dimensions[3 * i], dimensions[3 * i + 1], dimensions[3 * i + 2],
+             bool(flag & FLAG_FACE_UP), bool(flag & FLAG_FRAGILE))
+            for i, (order_id, name_index, flag) in enumerate(zip(self.order_id, self.name_index, self.flags))
+        )
+
+    def to_items(self):
+        """转换为待装箱物品的字典列表，交给按字典约定编写的 place_items"""
+        return [
+            {'name': name, 'dimensions': {'x': width, 'y': height, 'z': depth},
+             'face_up': face_up, 'fragile': fragile}
+            for _, name, _, _, _, width, height, depth, face_up, fragile in self.rows()
+        ]
+
+    def to_placements(self):
+        """转换为 place_items 约定的摆放结果字典列表"""
+        return [
+            {'order_id': order_id, 'name': name,
+             'position': {'x': x, 'y': y, 'z': z},
+             'dimensions': {'x': width, 'y': height, 'z': depth},
+             'face_up': face_up, 'fragile': fragile}
+            for order_id, name, x, y, z, width, height, depth, face_up, fragile in self.rows()
+        ]
+
+    def records(self):
+        """引擎内部使用的记录，与 records.normalize_items 的结果相同"""
+        names = self.names
+        dimensions = self.dimensions
+        return [
+            {'index': i, 'name': names[name_index],
+             'w': dimensions[3 * i], 'h': dimensions[3 * i + 1], 'd': dimensions[3 * i + 2],
+             'face_up': bool(flag & FLAG_FACE_UP), 'fragile': bool(flag & FLAG_FRAGILE)}
+            for i, (name_index, flag) in enumerate(zip(self.name_index, self.flags))
+        ]
+
+    def positions(self):
+        """每个物品的 (x, y, z) 位置列表"""
+        return _triples(self.position)
+
+    def sizes(self):
+        """每个物品的 (x, y, z) 尺寸列表"""
+        return _triples(self.dimensions)
+
+    def dimension_rows(self):
+        """每个物品的 (face_up, x, y, z)，用于按尺寸比较两批物品"""
+        dims = self.dimensions
+        return list(zip((bool(flag & FLAG_FACE_UP) for flag in self.flags), dims[0::3], dims[1::3], dims[2::3]))
+
+    def volume(self, space_dimensions=None):
+        """物品的总体积；给定 space_dimensions 时只计入完整地位于容器内的物品"""
+        dims = self.dimensions
+        if space_dimensions is None:
+            return sum(w * h * d for w, h, d in zip(dims[0::3], dims[1::3], dims[2::3]))
+        limit = [float(space_dimensions[axis]) for axis in 'xyz']
+        position = self.position
+        used = 0.0
+        for i in range(len(self)):
+            k = 3 * i
+            if all(position[k + a] >= -EPS and position[k + a] + dims[k + a] <= limit[a] + EPS for a in range(3)):
+                used += dims[k] * dims[k + 1] * dims[k + 2]
+        return used
+
+
+def as_batch(items_data):
+    """待装箱的物品：已经是 ItemBatch 时原样返回，否则由物品字典构造"""
+    return items_data if isinstance(items_data, ItemBatch) else ItemBatch.from_items(items_data)
+
+
+def as_placements(placed_items):
+    """摆放结果：已经是 ItemBatch 时原样返回，否则由摆放结果字典构造"""
+    return placed_items if isinstance(placed_items, ItemBatch) else ItemBatch.from_placements(placed_items)
+
+
+def batch_adapter(place_items):
+    """把按字典约定编写的 place_items(items_data, space_dimensions) 包装为输入输出都是 ItemBatch 的函数"""
+    def place_batch(items, space_dimensions):
+        return ItemBatch.from_placements(place_items(items.to_items(), space_dimensions))
+    return place_batch
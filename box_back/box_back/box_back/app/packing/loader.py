@@ -0,0 +1,108 @@
+# box_back/box_back/app/packing/loader.py
+import functools
+import threading
+import types
+from collections import OrderedDict
+
+# 每个进程最多保留的已编译算法版本数
+MAX_MODULES = 8
+
+# 可以按请求选择的内置引擎
+ENGINES = ('extreme_point', 'heightmap')
+
+_lock = threading.Lock()
+_modules = OrderedDict()
+
+
+def compile_algorithm(key, source):
+    """把算法源码编译为独立的模块对象，不写入 sys.modules"""
+    module = types.ModuleType(f'box_back_algorithm_{key[:12]}')
+    module.__file__ = f'<algorithm {key}>'
+    exec(compile(source, module.__file__, 'exec'), module.__dict__)
+    return module
+
+
+def engine_ref(engine, resolution=None):
+    """内置引擎的 algorithm 参数，如 'heightmap' 或带网格分辨率的 'heightmap:0.5'"""
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown packing engine: {engine}")
+    return f"{engine}:{resolution:g}" if resolution else engine
+
+
+def _engine_place_items(ref, batch=False, deadline=None):
+    engine, _, option = ref.partition(':')
+    if engine == 'extreme_point':
+        from .engine import pack_batch, pack_items
+        return functools.partial(pack_batch if batch else pack_items, deadline=deadline)
+    if engine == 'heightmap':
+        from .heightmap import pack_heightmap, pack_heightmap_batch
+        resolution = float(option) if option else None
+        pack = pack_heightmap_batch if batch else pack_heightmap
+        return functools.partial(pack, resolution=resolution, deadline=deadline)
+    raise ValueError(f"Unknown packing engine: {engine}")
+
+
+def _load_module(algorithm):
+    if algorithm is None:
+        from box_back.app import packing_algorithm
+        return packing_algorithm
+    key, source = algorithm
+    with _lock:
+        module = _modules.get(key)
+        if module is not None:
+            _modules.move_to_end(key)
+            return module
+    module = compile_algorithm(key, source)
+    with _lock:
+        _modules[key] = module
+        while len(_modules) > MAX_MODULES:
+            _modules.popitem(last=False)
+    return module
+
+
+def load_place_items(algorithm=None):
+    """
+    返回指定算法版本的 place_items
+
+    algorithm 为 (key, source)，同一 key 在每个进程中只编译一次；为字符串时是
+    engine_ref 给出的内置引擎；为 None 时使用部署的 packing_algorithm.py。
+    不访问数据库，可以在子进程中调用。
+    """
+    if isinstance(algorithm, str):
+        return _engine_place_items(algorithm)
+    return _load_module(algorithm).place_items
+
+
+def load_place_batch(algorithm=None, deadline=None):
+    """
+    返回指定算法版本的 place_batch(items, space_dimensions)，输入输出为 ItemBatch
+
+    algorithm 的含义与 load_place_items 相同。内置引擎和部署的 packing_algorithm.place_batch
+    直接处理 ItemBatch；上传的算法版本只约定了 place_items（上传的源码可能复制了部署模块的
+    place_batch 却只修改了 place_items），用 itembatch.batch_adapter 包装。
+
+    deadline（time.perf_counter() 时间）交给内置引擎和部署的 place_batch，到期后返回已经
+    放置的部分；上传的算法无法中途停止，只受子进程池超时的限制。
+    """
+    if isinstance(algorithm, str):
+        return _engine_place_items(algorithm, batch=True, deadline=deadline)
+    if algorithm is None:
+        from box_back.app.packing_algorithm import place_batch
+        return functools.partial(place_batch, deadline=deadline)
+    from .itembatch import batch_adapter
+    return batch_adapter(_load_module(algorithm).place_items)
+
+
+def check_algorithm(source):
+    """
+    编译算法源码并检查 place_items，返回错误信息，没有问题时返回 None
+
+    会执行上传的代码，应在 sandbox 子进程中调用。
+    """
+    try:
+        module = compile_algorithm('upload', source)
+    except Exception as e:
+        return f"The algorithm file contains errors: {e}"
+    if not callable(getattr(module, 'place_items', None)):
+        return "The algorithm file must contain a callable 'place_items' function"
+    return None
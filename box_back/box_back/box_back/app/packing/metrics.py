@@ -0,0 +1,28 @@
+# box_back/box_back/app/packing/metrics.py
+from .itembatch import ItemBatch
+from .spatial import EPS
+
+
+def is_inside(item, space_dimensions):
+    """物品是否完整地位于容器内"""
+    position = item['position']
+    dims = item['dimensions']
+    return all(
+        float(position[axis]) >= -EPS and float(position[axis]) + float(dims[axis]) <= float(space_dimensions[axis]) + EPS
+        for axis in ('x', 'y', 'z')
+    )
+
+
+def volume_utilization(placed_items, space_dimensions):
+    """容器内物品的总体积占容器容积的比例，容器外的物品不计入；placed_items 可以是 ItemBatch"""
+    capacity = float(space_dimensions['x']) * float(space_dimensions['y']) * float(space_dimensions['z'])
+    if capacity <= 0:
+        return 0.0
+    if isinstance(placed_items, ItemBatch):
+        return placed_items.volume(space_dimensions) / capacity
+    used = 0.0
+    for item in placed_items:
+        if is_inside(item, space_dimensions):
+            dims = item['dimensions']
+            used += float(dims['x']) * float(dims['y']) * float(dims['z'])
+    return used / capacity
@@ -0,0 +1,194 @@
+# box_back/box_back/app/packing/multi.py
+"""
+多容器装箱
+
+一个容器装不下时按需打开新的容器。第一轮把所有物品交给第一个容器，由算法尽量装满，
+物品都装得下时只用一个容器。第一个容器的装载率（装入的体积占容积的比例）作为之后
+各容器的目标：按剩余物品的体积估计还需要的容器数，把物品分配给这些容器，作为相互
+独立的任务交给 pack_many 在子进程池中并行计算；各容器放不下的物品进入下一轮，直到
+全部装入、容器数达到上限或者一轮中没有任何物品装入。某个尺寸的容器放不下任何剩余物品时
+跳过该尺寸，改用 sizes 中的下一个尺寸。各轮共用一个时间预算，每轮最多使用剩余时间的一半，
+为之后的轮次留出时间（放不下物品时局部搜索会一直运行到截止时间，见 anytime）。
+"""
+import time
+
+from .batch import pack_many
+from .metrics import is_inside
+from .records import item_orientations
+from .spatial import EPS
+
+
+def container_size(sizes, index):
+    """第 index 个容器的尺寸：依次使用 sizes，用完后重复最后一个"""
+    return sizes[min(index, len(sizes) - 1)]
+
+
+def _volume(item):
+    dims = item['dimensions']
+    return float(dims['x']) * float(dims['y']) * float(dims['z'])
+
+
+def _capacity(space):
+    return float(space['x']) * float(space['y']) * float(space['z'])
+
+
+def fits_empty(item, space):
+    """物品能否以某个允许的方向放进空容器"""
+    dims = item['dimensions']
+    limit = (float(space['x']), float(space['y']), float(space['z']))
+    return any(all(size <= bound + EPS for size, bound in zip(orientation, limit))
+               for orientation in item_orientations(float(dims['x']), float(dims['y']), float(dims['z']),
+                                                    bool(item.get('face_up', False))))
+
+
+def distribute(items_data, sizes, first_index, max_new, fill_ratio):
+    """
+    把物品分配给编号从 first_index 开始的新容器，最多打开 max_new 个
+
+    每个容器的目标体积为容积的 fill_ratio：先按总体积估计能装满的容器数（向下取整，至少
+    一个），再把物品按体积从大到小放进剩余目标体积最大且尺寸放得下的容器，使每个容器
+    都混有大小不同的物品。每个容器分到的物品略多于目标，由算法挑选装满，放不下的物品
+    留到下一轮，不足一个容器的剩余物品不单独打开容器。
+    返回 ([(容器在 sizes 中的位置, 容器尺寸, 物品列表), ...], 本轮没有分配的物品)，
+    没有分到物品的容器不返回。
+    """
+    total = sum(_volume(item) for item in items_data)
+    bins = []
+    target = 0.0
+    while len(bins) < max_new:
+        space = container_size(sizes, first_index + len(bins))
+        if bins and target + fill_ratio * _capacity(space) > total + EPS:
+            break
+        bins.append([space, fill_ratio * _capacity(space), [], first_index + len(bins)])
+        target += fill_ratio * _capacity(space)
+    deferred = []
+    for item in sorted(items_data, key=_volume, reverse=True):
+        candidates = [b for b in bins if fits_empty(item, b[0])]
+        if not candidates:
+            deferred.append(item)
+            continue
+        chosen = max(candidates, key=lambda b: b[1])
+        chosen[1] -= _volume(item)
+        chosen[2].append(item)
+    return [(position, space, items) for space, _, items, position in bins if items], deferred
+
+
+def _as_input(placed_item):
+    return {
+        'name': placed_item['name'],
+        'dimensions': dict(placed_item['dimensions']),
+        'face_up': placed_item.get('face_up', False),
+        'fragile': placed_item.get('fragile', False),
+    }
+
+
+def _renumber(placed_items, first_order_id=1):
+    """按原来的装载顺序把 order_id 重新编为连续的序号"""
+    result = []
+    for order_id, item in enumerate(sorted(placed_items, key=lambda item: item['order_id']), first_order_id):
+        item = dict(item)
+        item['order_id'] = order_id
+        result.append(item)
+    return result
+
+
+def _outside(items_data, space, first_order_id):
+    """没有装入任何容器的物品，与单容器模式一样从容器的 X 边界开始沿 X 轴摆在容器外"""
+    current_x = float(space['x'])
+    result = []
+    for order_id, item in enumerate(items_data, first_order_id):
+        dims = item['dimensions']
+        result.append({
+            'order_id': order_id,
+            'name': item['name'],
+            'position': {'x': current_x, 'y': 0.0, 'z': 0.0},
+            'dimensions': {'x': float(dims['x']), 'y': float(dims['y']), 'z': float(dims['z'])},
+            'face_up': item.get('face_up', False),
+            'fragile': item.get('fragile', False),
+        })
+        current_x += float(dims['x'])
+    return result
+
+
+def pack_containers(items_data, sizes, pool=None, algorithm=None, time_budget_ms=None, max_containers=20,
+                    check=None):
+    """
+    把物品装进按需打开的多个容器，返回 [(容器尺寸, 摆放结果), ...]，至少包含一个容器
+
+    sizes 为容器尺寸的列表，第一个为任务本身的容器（见 container_size）。每个容器的
+    摆放结果都在容器内，order_id 从 1 开始；最终没有装入的物品附加在第一个容器的
+    结果末尾，摆在该容器外。第一个尺寸放不下任何物品时，第一个容器为空，之后的容器从
+    能放下物品的尺寸开始。pool 和 algorithm 的含义与 pack_many 相同；time_budget_ms 为
+    所有轮次共用的时间预算，每轮交给 pack_many 的是剩余时间的一半。
+    第一个容器单独计算，之后每一轮的容器并行计算（见 distribute）。
+    check(items_data, placed_items, space) 用于校验每个容器的结果，计算出错时抛出对应的异常。
+    """
+    start = time.perf_counter()
+    pending = []
+    overflow = []
+    for item in items_data:
+        # 任何尺寸的容器都放不下的物品不参与分配
+        (pending if any(fits_empty(item, space) for space in sizes) else overflow).append(item)
+
+    containers = []
+    # 下一个容器在 sizes 中的位置，跳过的尺寸也计入，见 container_size
+    index = 0
+    # 装满的容器（有物品放不下）的装载率，第一轮之前未知
+    fill_ratio = None
+    while pending and len(containers) < max_containers:
+        if fill_ratio is None:
+            space = container_size(sizes, index)
+            # 这个尺寸放不下的物品留给之后其他尺寸的容器
+            fitting = [item for item in pending if fits_empty(item, space)]
+            jobs = [(index, space, fitting)] if fitting else []
+            deferred = [item for item in pending if not fits_empty(item, space)]
+        else:
+            jobs, deferred = distribute(pending, sizes, index, max_containers - len(containers), fill_ratio)
+        if not jobs:
+            # 这一轮的尺寸放不下任何剩余物品，改用下一个尺寸；最后一个尺寸会一直重复，不再有新的尺寸
+            if index >= len(sizes) - 1:
+                break
+            if not containers:
+                # 第一个容器是任务本身的容器，放不下任何物品时保留为空
+                containers.append((sizes[0], []))
+            index += 1
+            continue
+        budget = None
+        if time_budget_ms:
+            # 预算用完后每轮只给最少的时间，算法到期后返回已经放置的部分
+            budget = max((time_budget_ms - (time.perf_counter() - start) * 1000) / 2, 1)
+        outcomes = pack_many([(items, space, budget) for _, space, items in jobs], pool=pool, algorithm=algorithm)
+        pending = deferred
+        # 本轮的容器都已按尺寸的位置计算，没有装入物品的容器也占用其位置
+        index = max(position for position, _, _ in jobs) + 1
+        placed_any = False
+        full_volume = full_capacity = 0.0
+        for (_, space, items), outcome in zip(jobs, outcomes):
+            if isinstance(outcome, Exception):
+                raise outcome
+            placed_items = outcome[0].to_placements()
+            if check is not None:
+                check(items, placed_items, space)
+            inside = [item for item in placed_items if is_inside(item, space)]
+            rejected = [_as_input(item) for item in placed_items if not is_inside(item, space)]
+            pending.extend(rejected)
+            if not inside:
+                continue
+            containers.append((space, _renumber(inside)))
+            placed_any = True
+            if rejected:
+                full_volume += sum(_volume(item) for item in inside)
+                full_capacity += _capacity(space)
+        if not placed_any:
+            break
+        if full_capacity > 0:
+            fill_ratio = full_volume / full_capacity
+        elif fill_ratio is None:
+            fill_ratio = 1.0
+    overflow.extend(pending)
+
+    if not containers:
+        containers.append((sizes[0], []))
+    space, placed_items = containers[0]
+    containers[0] = (space, placed_items + _outside(overflow, space, len(placed_items) + 1))
+    return containers
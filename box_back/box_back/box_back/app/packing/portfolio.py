@@ -0,0 +1,160 @@
+# box_back/box_back/app/packing/portfolio.py
+import time
+from concurrent.futures import FIRST_COMPLETED, wait
+
+from .columns import decode_items, decode_placements, encode_placements
+from .engine import pack_items
+from .heightmap import pack_heightmap
+from .itembatch import ItemBatch, as_batch
+from .loader import load_place_batch
+from .metrics import volume_utilization
+from .records import footprint_order, height_order
+from .verify import PlacementError, verify_placement
+
+
+def _active_place_items(items_data, space_dimensions, deadline=None, algorithm=None):
+    # 在子进程中加载，使用当前激活的算法版本；上传的算法无法中途停止，只受子进程池超时的限制
+    return load_place_batch(algorithm, deadline)(as_batch(items_data), space_dimensions).to_placements()
+
+
+def _sku_blocks(items_data, space_dimensions, deadline=None):
+    return pack_items(items_data, space_dimensions, deadline=deadline)
+
+
+def _volume_desc(items_data, space_dimensions, deadline=None):
+    return pack_items(items_data, space_dimensions, group_skus=False, deadline=deadline)
+
+
+def _height_desc(items_data, space_dimensions, deadline=None):
+    return pack_items(items_data, space_dimensions, group_skus=False, order=height_order, deadline=deadline)
+
+
+def _footprint_desc(items_data, space_dimensions, deadline=None):
+    return pack_items(items_data, space_dimensions, group_skus=False, order=footprint_order, deadline=deadline)
+
+
+def _first_fit(items_data, space_dimensions, deadline=None):
+    return pack_items(items_data, space_dimensions, group_skus=False, candidate_batch=1, deadline=deadline)
+
+
+def _heightmap(items_data, space_dimensions, deadline=None):
+    return pack_heightmap(items_data, space_dimensions, deadline=deadline)
+
+
+# 组合模式中参与比较的策略，名称会记录到任务上
+STRATEGIES = {
+    'place_items': _active_place_items,
+    'sku_blocks': _sku_blocks,
+    'volume_desc': _volume_desc,
+    'height_desc': _height_desc,
+    'footprint_desc': _footprint_desc,
+    'first_fit': _first_fit,
+    'heightmap': _heightmap,
+}
+
+def run_strategy(name, items_data, space_dimensions, algorithm=None, deadline=None):
+    """
+    运行单个策略，返回 (名称, 放置结果, 耗时毫秒, 容积利用率)；algorithm 只用于 place_items
+
+    给定 deadline（time.perf_counter() 时间）时，到期后策略返回已经放置的部分。
+    """
+    start = time.perf_counter()
+    strategy = STRATEGIES[name]
+    if strategy is _active_place_items:
+        placed_items = strategy(items_data, space_dimensions, deadline, algorithm)
+    else:
+        placed_items = strategy(items_data, space_dimensions, deadline)
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    return name, placed_items, elapsed_ms, volume_utilization(placed_items, space_dimensions)
+
+
+def run_strategy_compact(name, items_payload, space_dimensions, algorithm=None, expires_at=None):
+    """
+    在子进程中运行的 run_strategy：物品和摆放结果都以 columns 的列式二进制传递
+
+    expires_at 为 time.time() 表示的截止时间（各进程的 perf_counter 不能直接比较），
+    排队等到空闲子进程才开始的策略也在同一时刻停止。
+    """
+    deadline = None if expires_at is None else time.perf_counter() + (expires_at - time.time())
+    name, placed_items, elapsed_ms, utilization = run_strategy(name, decode_items(items_payload),
+                                                               space_dimensions, algorithm, deadline)
+    return name, encode_placements(placed_items), elapsed_ms, utilization
+
+
+def run_portfolio(items_data, space_dimensions, strategies=None, pool=None, timeout_ms=None,
+                  algorithm=None):
+    """
+    在 sandbox 子进程池中并行运行多个策略，返回容积利用率最高的结果
+
+    利用率相同时取 strategies 中靠前的策略。单个策略出错（包括超时、子进程崩溃）
+    时忽略；每个策略的结果在比较前都在当前进程中经过 verify_placement 校验，违反约束的
+    结果不参与比较。没有合法结果时抛出第一个错误。pool 为 None 时在当前进程中依次运行。
+    给定 timeout_ms 时截止时间同时交给每个策略，已经开始的策略到期后返回已经放置的
+    部分并释放子进程；只比较在时限内完成的策略，时限内一个都没有完成时等待最先完成的那个。
+
+    返回字典：items、strategy、time_ms、utilization、truncated，以及所有完成的策略的
+    概要 results（不含放置结果），违反约束的策略另有 violations（各项违反的次数）。truncated 表示到了截止时间：有策略被取消或返回的是
+    已经放置的部分，结果取决于机器负载。algorithm 为 place_items 策略使用的算法版本。
+    items_data 可以是 ItemBatch；各策略按 place_items 的字典约定调用。
+    """
+    names = list(strategies or STRATEGIES)
+    outcomes = []
+    errors = []
+    if pool is None:
+        if isinstance(items_data, ItemBatch):
+            items_data = items_data.to_items()
+        deadline = None if timeout_ms is None else time.perf_counter() + timeout_ms / 1000
+        for name in names:
+            try:
+                outcomes.append(run_strategy(name, items_data, space_dimensions, algorithm, deadline))
+            except Exception as e:
+                errors.append(e)
+        truncated = deadline is not None and time.perf_counter() >= deadline
+    else:
+        payload = as_batch(items_data).encode()
+        space_dimensions = dict(space_dimensions)
+        expires_at = None if timeout_ms is None else time.time() + timeout_ms / 1000
+        futures = [pool.submit(run_strategy_compact, name, payload, space_dimensions, algorithm, expires_at)
+                   for name in names]
+        truncated = False
+        if timeout_ms is not None:
+            done, pending = wait(futures, timeout=timeout_ms / 1000)
+            if not done:
+                done, pending = wait(futures, return_when=FIRST_COMPLETED)
+            for future in pending:
+                future.cancel()
+            futures = [future for future in futures if future in done]
+            truncated = bool(pending) or time.time() >= expires_at
+        for future in futures:
+            try:
+                outcomes.append(future.result())
+            except Exception as e:
+                errors.append(e)
+
+    # 校验在当前进程中进行，不信任运行过上传代码的子进程返回的结果
+    valid = []
+    results = []
+    for name, placed_items, elapsed_ms, utilization in outcomes:
+        if pool is not None:
+            placed_items = decode_placements(placed_items)
+        summary = {'strategy': name, 'time_ms': elapsed_ms, 'utilization': utilization}
+        try:
+            verify_placement(items_data, placed_items, space_dimensions)
+        except PlacementError as e:
+            summary['violations'] = e.violations
+            errors.append(e)
+        else:
+            valid.append((name, placed_items, elapsed_ms, utilization))
+        results.append(summary)
+    if not valid:
+        raise errors[0]
+
+    best = max(valid, key=lambda o: (o[3], -names.index(o[0])))
+    return {
+        'items': best[1],
+        'strategy': best[0],
+        'time_ms': best[2],
+        'utilization': best[3],
+        'truncated': truncated,
+        'results': results,
+    }
@@ -0,0 +1,66 @@
+# box_back/box_back/app/packing/records.py
+from .spatial import EPS
+
+
+def item_orientations(w, h, d, face_up):
+    """
+    物品可用的摆放方向 (x, y, z)，y 为竖直方向
+
+    face_up 的物品只能绕竖直轴旋转，其余物品允许 6 种方向。
+    """
+    if face_up:
+        candidates = [(w, h, d), (d, h, w)]
+    else:
+        candidates = [(w, h, d), (d, h, w), (w, d, h), (h, d, w), (d, w, h), (h, w, d)]
+    result = []
+    for o in candidates:
+        if o not in result:
+            result.append(o)
+    return result
+
+
+def size_key(w, h, d, face_up):
+    """
+    用于比较尺寸的键：face_up 物品固定高度，其余物品与方向无关
+
+    若 a 的键在每一维都不小于 b 的键，则 b 放不下的位置 a 也放不下。
+    """
+    if face_up:
+        return (True, h, min(w, d), max(w, d))
+    return (False,) + tuple(sorted((w, h, d)))
+
+
+def dominates(key, other):
+    return key[0] == other[0] and all(a >= b - EPS for a, b in zip(key[1:], other[1:]))
+
+
+def packing_order(records):
+    """默认装载顺序：易碎品最后，其余按体积、高度从大到小"""
+    return sorted(records, key=lambda r: (r['fragile'], -r['w'] * r['h'] * r['d'], -r['h'], r['index']))
+
+
+def height_order(records):
+    """易碎品最后，其余按高度、体积从大到小"""
+    return sorted(records, key=lambda r: (r['fragile'], -r['h'], -r['w'] * r['h'] * r['d'], r['index']))
+
+
+def footprint_order(records):
+    """易碎品最后，其余按底面积、高度从大到小"""
+    return sorted(records, key=lambda r: (r['fragile'], -r['w'] * r['d'], -r['h'], r['index']))
+
+
+def normalize_items(items_data):
+    """把输入的物品字典转换为引擎内部使用的记录"""
+    records = []
+    for index, item in enumerate(items_data):
+        dims = item['dimensions']
+        records.append({
+            'index': index,
+            'name': item['name'],
+            'w': float(dims['x']),
+            'h': float(dims['y']),
+            'd': float(dims['z']),
+            'face_up': bool(item.get('face_up', False)),
+            'fragile': bool(item.get('fragile', False)),
+        })
+    return records
@@ -0,0 +1,243 @@
+# box_back/box_back/app/packing/sandbox.py
+"""
+在隔离的子进程池中运行装箱算法
+
+上传的算法可能死循环或耗尽内存，不能在 web 进程中直接执行。池中的每个子进程
+由 forkserver 预先启动，不继承 web 进程的线程和数据库连接；子进程设置
+RLIMIT_AS 内存上限，每次调用前把 RLIMIT_CPU 设为已用 CPU 时间加上单次调用的额度。
+父进程为每个子进程保留一个线程，通过管道发送调用并按墙钟时间等待结果：
+
+- 超时的子进程被杀死，调用抛出 PackingTimeout；
+- 子进程退出（超出 CPU 限制时收到 SIGXCPU、崩溃等）时调用抛出 WorkerCrashed；
+- 出现以上情况、调用抛出 MemoryError 或调用次数达到 max_calls 时，子进程被替换。
+
+调用的函数和参数按引用 pickle，函数必须是模块级的；物品和摆放结果应先用
+packing.columns 编码为列式二进制再传递。
+"""
+import logging
+import math
+import multiprocessing
+import os
+import queue
+import threading
+from concurrent.futures import Future
+
+try:
+    import resource
+except ImportError:  # Windows 没有 resource，不设置资源限制
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+# 子进程的模块预先导入到 forkserver 中，新进程启动时不必再导入
+PRELOAD = ['box_back.app.packing.sandbox', 'box_back.app.packing.batch', 'box_back.app.packing.portfolio']
+
+
+class PackingTimeout(Exception):
+    """调用超过了墙钟时限，子进程已被杀死"""
+
+
+class WorkerCrashed(Exception):
+    """子进程在调用过程中退出"""
+
+
+class PackingError(Exception):
+    """子进程中抛出的异常无法传回父进程时，以此代替并保留原来的类型和信息"""
+
+
+def _set_limits(memory_mb):
+    if resource is None or not memory_mb:
+        return
+    limit = memory_mb * 1024 * 1024
+    _, hard = resource.getrlimit(resource.RLIMIT_AS)
+    if hard != resource.RLIM_INFINITY:
+        limit = min(limit, hard)
+    resource.setrlimit(resource.RLIMIT_AS, (limit, hard))
+
+
+def _limit_cpu(cpu_seconds):
+    """把 CPU 时间的软限制设为已用时间加上 cpu_seconds，超出时进程收到 SIGXCPU 退出"""
+    if resource is None or not cpu_seconds:
+        return
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    soft = math.ceil(usage.ru_utime + usage.ru_stime + cpu_seconds)
+    _, hard = resource.getrlimit(resource.RLIMIT_CPU)
+    if hard != resource.RLIM_INFINITY:
+        soft = min(soft, hard)
+    resource.setrlimit(resource.RLIMIT_CPU, (soft, hard))
+
+
+def _worker_main(conn, memory_mb, cpu_seconds):
+    """子进程的主循环：接收 (fn, args, kwargs)，返回 (True, 结果) 或 (False, 异常)"""
+    _set_limits(memory_mb)
+    while True:
+        try:
+            message = conn.recv()
+        except EOFError:
+            return
+        if message is None:
+            return
+        fn, args, kwargs = message
+        _limit_cpu(cpu_seconds)
+        try:
+            reply = (True, fn(*args, **kwargs))
+        except BaseException as e:
+            reply = (False, e)
+        try:
+            conn.send(reply)
+        except Exception as e:
+            error = e if reply[0] else reply[1]
+            conn.send((False, PackingError(f"{type(error).__name__}: {error}")))
+
+
+class _Worker:
+    """一个子进程及与之通信的管道"""
+
+    def __init__(self, context, memory_mb, cpu_seconds):
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(target=_worker_main, args=(child_conn, memory_mb, cpu_seconds),
+                                       name='packing-sandbox', daemon=True)
+        self.process.start()
+        child_conn.close()
+        self.calls = 0
+
+    def call(self, message, timeout):
+        """发送一次调用并等待结果，返回 (ok, value)"""
+        self.calls += 1
+        try:
+            self.conn.send(message)
+            if not self.conn.poll(timeout):
+                self.kill()
+                raise PackingTimeout(f"Packing did not finish within {timeout:g} s")
+            return self.conn.recv()
+        except (EOFError, OSError):
+            self.process.join(1)
+            self.conn.close()
+            raise WorkerCrashed(f"Packing worker exited with code {self.process.exitcode}")
+
+    def stop(self):
+        try:
+            self.conn.send(None)
+        except OSError:
+            pass
+        self.process.join(1)
+        self.kill()
+
+    def kill(self):
+        if self.process.is_alive():
+            self.process.kill()
+        self.process.join()
+        self.conn.close()
+
+
+class SandboxPool:
+    """
+    预先启动 workers 个子进程的池，接口与 concurrent.futures 的 Executor 类似
+
+    timeout 为每次调用的墙钟时限（秒），memory_mb 为子进程的地址空间上限，
+    cpu_seconds 为每次调用的 CPU 时间额度，max_calls 为子进程被替换前最多处理的调用数；
+    为 0 或 None 表示不限制。
+    """
+
+    def __init__(self, workers, timeout=None, memory_mb=None, cpu_seconds=None, max_calls=None):
+        methods = multiprocessing.get_all_start_methods()
+        self._context = multiprocessing.get_context('forkserver' if 'forkserver' in methods else 'spawn')
+        if 'forkserver' in methods:
+            self._context.set_forkserver_preload(PRELOAD)
+        self.workers = max(1, workers)
+        self.timeout = timeout or None
+        self.memory_mb = memory_mb
+        self.cpu_seconds = cpu_seconds
+        self.max_calls = max_calls
+        self._queue = queue.SimpleQueue()
+        self._threads = []
+        for index in range(self.workers):
+            thread = threading.Thread(target=self._run_slot, name=f'packing-sandbox-{index}', daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def _spawn(self):
+        return _Worker(self._context, self.memory_mb, self.cpu_seconds)
+
+    def _run_slot(self):
+        worker = None
+        try:
+            worker = self._spawn()
+        except Exception:
+            logger.exception("Could not start packing worker")
+        while True:
+            job = self._queue.get()
+            if job is None:
+                break
+            future, message, timeout = job
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                if worker is None:
+                    worker = self._spawn()
+                ok, value = worker.call(message, timeout)
+            except (PackingTimeout, WorkerCrashed) as e:
+                logger.warning("Packing worker replaced: %s", e)
+                worker = None
+                future.set_exception(e)
+                continue
+            except BaseException as e:
+                if worker is not None:
+                    worker.kill()
+                worker = None
+                future.set_exception(e)
+                continue
+            if ok:
+                future.set_result(value)
+            else:
+                future.set_exception(value)
+            # 内存耗尽后子进程的状态不可靠，与达到调用次数的子进程一样替换掉
+            if (not ok and isinstance(value, MemoryError)) or (self.max_calls and worker.calls >= self.max_calls):
+                worker.stop()
+                worker = self._spawn()
+        if worker is not None:
+            worker.stop()
+
+    def submit(self, fn, *args, timeout=None, **kwargs):
+        """在子进程中调用 fn(*args, **kwargs)，返回 Future；timeout 覆盖池的默认时限"""
+        future = Future()
+        self._queue.put((future, (fn, args, kwargs), timeout or self.timeout))
+        return future
+
+    def shutdown(self):
+        """停止全部子进程；尚未开始的调用被取消"""
+        while True:
+            try:
+                job = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if job is not None:
+                job[0].cancel()
+        for _ in self._threads:
+            self._queue.put(None)
+        for thread in self._threads:
+            thread.join()
+
+
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+
+
+def get_pool(workers, timeout=None, memory_mb=None, cpu_seconds=None, max_calls=None):
+    """返回本进程共享的子进程池，首次使用时创建（gunicorn 每个 worker 各自一个）"""
+    global _pool, _pool_pid
+    with _pool_lock:
+        if _pool is None or _pool_pid != os.getpid():
+            _pool = SandboxPool(workers, timeout, memory_mb, cpu_seconds, max_calls)
+            _pool_pid = os.getpid()
+        return _pool
+
+
+def reset_pool():
+    """停止并丢弃共享的子进程池"""
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None and _pool_pid == os.getpid():
+        pool.shutdown()
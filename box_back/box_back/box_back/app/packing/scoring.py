@@ -0,0 +1,146 @@
+# box_back/box_back/app/packing/scoring.py
+try:
+    import numpy as np
+except ImportError:  # numpy 不可用时使用纯 Python 实现
+    np = None
+
+from .spatial import EPS
+
+# 面积和比例统一保留的小数位数，消除两种实现求和顺序不同带来的误差
+SCORE_DECIMALS = 9
+
+
+def score_candidates(rows, space, boxes, fragile, min_support, fragile_item=False, use_numpy=None):
+    """
+    对一批候选放置 (x, y, z, w, h, d) 统一打分，返回最佳候选的下标，全部不可行时返回 None
+
+    可行条件：完全在容器内、不与 boxes 中的物品相交、离地时底面支撑比例不低于
+    min_support 且不压在易碎品上；fragile_item 为 True 时顶面不能有物品。可行候选中接触面积占表面积比例最大者胜出，
+    相同时依次取 y、z、x 较小者，再取下标较小者。
+
+    boxes 为附近已放置物品 (x0, y0, z0, x1, y1, z1) 的列表，fragile 为对应的易碎标记。
+    use_numpy 为 None 时在 numpy 可用时使用向量化实现，两种实现结果相同。
+    """
+    if not rows:
+        return None
+    if use_numpy is None:
+        use_numpy = np is not None
+    if use_numpy:
+        return _score_numpy(rows, space, boxes, fragile, min_support, fragile_item)
+    return _score_python(rows, space, boxes, fragile, min_support, fragile_item)
+
+
+def _score_numpy(rows, space, boxes, fragile, min_support, fragile_item):
+    c = np.asarray(rows, dtype=float)
+    limit = np.asarray(space, dtype=float)
+    # 先排除超出容器的候选，后续只处理剩余的行
+    keep = np.flatnonzero(np.all(c[:, :3] + c[:, 3:] <= limit + EPS, axis=1))
+    if keep.size == 0:
+        return None
+    lo = c[keep, :3]
+    size = c[keep, 3:]
+    hi = lo + size
+
+    if boxes:
+        b = np.asarray(boxes, dtype=float)
+        blo = b[:, :3]
+        bhi = b[:, 3:]
+        # (候选数, 物品数, 3)：每个轴上的重叠长度
+        overlap = np.minimum(hi[:, None, :], bhi[None, :, :]) - np.maximum(lo[:, None, :], blo[None, :, :])
+        positive = overlap > EPS
+        free = ~np.any(np.all(positive, axis=2), axis=1)
+        if not free.any():
+            return None
+        keep, lo, size, hi = keep[free], lo[free], size[free], hi[free]
+        overlap = np.where(positive[free], overlap[free], 0.0)
+        # 垂直于每个轴的接触面在另外两个轴上的重叠面积
+        pair_area = np.stack([
+            overlap[:, :, 1] * overlap[:, :, 2],
+            overlap[:, :, 0] * overlap[:, :, 2],
+            overlap[:, :, 0] * overlap[:, :, 1],
+        ], axis=2)
+        below = np.abs(lo[:, None, :] - bhi[None, :, :]) <= EPS
+        above = np.abs(hi[:, None, :] - blo[None, :, :]) <= EPS
+        box_contact = np.where(below | above, pair_area, 0.0).sum(axis=(1, 2))
+        resting = below[:, :, 1] & (pair_area[:, :, 1] > 0.0)
+        box_support = np.where(resting, pair_area[:, :, 1], 0.0).sum(axis=1)
+        on_fragile = np.any(resting & np.asarray(fragile, dtype=bool)[None, :], axis=1)
+        if fragile_item:
+            # 易碎品顶面被压住同样视为不可行
+            on_fragile |= np.any(above[:, :, 1] & (pair_area[:, :, 1] > 0.0), axis=1)
+    else:
+        box_contact = np.zeros(len(keep))
+        box_support = np.zeros(len(keep))
+        on_fragile = np.zeros(len(keep), dtype=bool)
+
+    w, h, d = size[:, 0], size[:, 1], size[:, 2]
+    face_areas = np.stack([h * d, w * d, w * h], axis=1)
+    # 容器壁的接触面积
+    wall_contact = (np.where(lo <= EPS, face_areas, 0.0) + np.where(hi >= limit - EPS, face_areas, 0.0)).sum(axis=1)
+    grounded = lo[:, 1] <= EPS
+    support = np.round(np.where(grounded, face_areas[:, 1], box_support), SCORE_DECIMALS)
+    feasible = ~on_fragile & (grounded | (support >= min_support * face_areas[:, 1] - EPS))
+    if not feasible.any():
+        return None
+    ratio = np.round((wall_contact + box_contact) / (2.0 * face_areas.sum(axis=1)), SCORE_DECIMALS)
+    keep, lo, ratio = keep[feasible], lo[feasible], ratio[feasible]
+    order = np.lexsort((keep, lo[:, 0], lo[:, 2], lo[:, 1], -ratio))
+    return int(keep[order[0]])
+
+
+def _score_python(rows, space, boxes, fragile, min_support, fragile_item):
+    best = None
+    best_key = None
+    for n, (x, y, z, w, h, d) in enumerate(rows):
+        lo = (x, y, z)
+        hi = (x + w, y + h, z + d)
+        if any(hi[axis] > space[axis] + EPS for axis in range(3)):
+            continue
+        face_areas = (h * d, w * d, w * h)
+        contact = 0.0
+        for axis in range(3):
+            if lo[axis] <= EPS:
+                contact = contact + face_areas[axis]
+            if hi[axis] >= space[axis] - EPS:
+                contact = contact + face_areas[axis]
+        support = face_areas[1] if y <= EPS else 0.0
+        on_fragile = False
+        blocked = False
+        overlaps = []
+        for box in boxes:
+            overlap = [min(hi[axis], box[axis + 3]) - max(lo[axis], box[axis]) for axis in range(3)]
+            if all(v > EPS for v in overlap):
+                blocked = True
+                break
+            overlaps.append(overlap)
+        if blocked:
+            continue
+        for axis in range(3):
+            a, b2 = [i for i in range(3) if i != axis]
+            face_contact = 0.0
+            resting_area = 0.0
+            for box, overlap, flag in zip(boxes, overlaps, fragile):
+                if not (overlap[a] > EPS and overlap[b2] > EPS):
+                    continue
+                area = overlap[a] * overlap[b2]
+                below = abs(lo[axis] - box[axis + 3]) <= EPS
+                above = abs(hi[axis] - box[axis]) <= EPS
+                if below or above:
+                    face_contact += area
+                if axis == 1 and below:
+                    resting_area += area
+                    if flag:
+                        on_fragile = True
+                if axis == 1 and above and fragile_item:
+                    on_fragile = True
+            contact = contact + face_contact
+            if axis == 1:
+                support = support + resting_area
+        support = round(support, SCORE_DECIMALS)
+        if on_fragile or (y > EPS and support < min_support * face_areas[1] - EPS):
+            continue
+        ratio = round(contact / (2.0 * sum(face_areas)), SCORE_DECIMALS)
+        key = (-ratio, y, z, x, n)
+        if best_key is None or key < best_key:
+            best, best_key = n, key
+    return best
@@ -0,0 +1,21 @@
+# box_back/box_back/app/packing/sku.py
+from .records import packing_order
+
+
+def sku_key(record):
+    """尺寸、face_up、fragile 都相同的物品视为同一 SKU，名称不参与比较"""
+    return (record['w'], record['h'], record['d'], record['face_up'], record['fragile'])
+
+
+def group_by_sku(records, order=packing_order):
+    """
+    把物品记录按 SKU 分组
+
+    组内保持输入顺序，组之间按 order 给出的顺序排列，默认与逐个放置时相同
+    （易碎品最后，其余按体积、高度从大到小）。
+    """
+    groups = {}
+    for record in records:
+        groups.setdefault(sku_key(record), []).append(record)
+    leaders = order([group[0] for group in groups.values()])
+    return [groups[sku_key(leader)] for leader in leaders]
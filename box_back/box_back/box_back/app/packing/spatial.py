@@ -0,0 +1,628 @@
+# box_back/box_back/app/packing/spatial.py
+try:
+    import numpy as np
+except ImportError:  # numpy 不可用时使用纯 Python 实现
+    np = None
+
+import bisect
+import heapq
+import math
+
+# 浮点比较容差
+EPS = 1e-7
+
+# free_boxes 最多考虑的障碍物数，更多时只返回射线给出的上界
+MAX_FREE_BOX_OBSTACLES = 32
+
+# PointIndex 每块的目标大小，块内点数超过两倍时拆分
+POINT_CHUNK = 8
+
+# PointIndex 每页的目标块数，页内块数超过两倍时拆分
+POINT_PAGE = 8
+
+# PointIndex 每块保存的容量上界数
+CHUNK_BOUNDS = 4
+
+# PointIndex 按容量上界的最短边和底面积的平方根分级，相邻两级的比例
+POINT_CLASS_RATIO = 1.5
+
+# 容量未知的点，任何物品都可能放得下
+UNKNOWN_CAPACITY = [(math.inf,) * 7]
+
+
+class SpatialIndex:
+    """
+    已放置物品的均匀网格空间索引
+
+    每个物品以 (x0, y0, z0, x1, y1, z1) 的形式保存，并登记到其覆盖的所有网格中
+    （区间按 [min, max) 计算，恰好贴在网格边界上的面不占用下一个网格）。
+    碰撞、包含和支撑查询只检查相关网格中的物品，代价与物品总数无关。
+    """
+
+    def __init__(self, cell_size):
+        self.cell_size = float(cell_size) if cell_size and cell_size > 0 else 1.0
+        self.boxes = []
+        self.fragile = []
+        self._cells = {}
+
+    def __len__(self):
+        return len(self.boxes)
+
+    def snapshot(self):
+        """(网格边长, 物品, 易碎标记, 网格)，只由基本类型组成，可以用 marshal 保存"""
+        return self.cell_size, self.boxes, self.fragile, self._cells
+
+    @classmethod
+    def from_snapshot(cls, snapshot):
+        """snapshot 的逆过程，不重新计算物品覆盖的网格"""
+        cell_size, boxes, fragile, cells = snapshot
+        index = cls(cell_size)
+        index.boxes = list(boxes)
+        index.fragile = list(fragile)
+        index._cells = cells
+        return index
+
+    def _span(self, lo, hi):
+        c = self.cell_size
+        return range(math.floor(lo / c), math.floor(max(lo, hi - EPS) / c) + 1)
+
+    def _keys(self, x0, y0, z0, x1, y1, z1):
+        ys = self._span(y0, y1)
+        zs = self._span(z0, z1)
+        for i in self._span(x0, x1):
+            for j in ys:
+                for k in zs:
+                    yield (i, j, k)
+
+    def insert(self, box, fragile=False):
+        """登记一个物品，返回其编号"""
+        idx = len(self.boxes)
+        self.boxes.append(tuple(box))
+        self.fragile.append(bool(fragile))
+        cells = self._cells
+        for key in self._keys(*box):
+            bucket = cells.get(key)
+            if bucket is None:
+                cells[key] = [idx]
+            else:
+                bucket.append(idx)
+        return idx
+
+    def nearby(self, x0, y0, z0, x1, y1, z1):
+        """返回与给定区域共享网格的物品编号（粗筛）"""
+        ids = set()
+        cells = self._cells
+        for key in self._keys(x0, y0, z0, x1, y1, z1):
+            bucket = cells.get(key)
+            if bucket:
+                ids.update(bucket)
+        return ids
+
+    def overlapping(self, x0, y0, z0, x1, y1, z1):
+        """与区域内部相交的物品编号（仅接触不算相交），按编号排序"""
+        boxes = self.boxes
+        return sorted(i for i in self.nearby(x0, y0, z0, x1, y1, z1)
+                      if x0 < boxes[i][3] - EPS and boxes[i][0] < x1 - EPS and
+                      y0 < boxes[i][4] - EPS and boxes[i][1] < y1 - EPS and
+                      z0 < boxes[i][5] - EPS and boxes[i][2] < z1 - EPS)
+
+    def overlaps(self, x0, y0, z0, x1, y1, z1):
+        """区域内部是否与任何已放置物品相交（仅接触不算相交）"""
+        boxes = self.boxes
+        cells = self._cells
+        # 同一物品可能在多个网格中被重复检查，但比构造集合更快
+        for key in self._keys(x0, y0, z0, x1, y1, z1):
+            bucket = cells.get(key)
+            if not bucket:
+                continue
+            for i in bucket:
+                bx0, by0, bz0, bx1, by1, bz1 = boxes[i]
+                if (x0 < bx1 - EPS and bx0 < x1 - EPS and
+                        y0 < by1 - EPS and by0 < y1 - EPS and
+                        z0 < bz1 - EPS and bz0 < z1 - EPS):
+                    return True
+        return False
+
+    def fitting(self, x, y, z, sizes):
+        """
+        sizes 中以 (x, y, z) 为最小角放置时不与已放置物品相交的尺寸 (w, h, d)
+
+        同一点的多个尺寸只查询一次网格：先取出与各尺寸的并集区域相交的物品，再逐个尺寸检查。
+        """
+        x1 = x + max(size[0] for size in sizes)
+        y1 = y + max(size[1] for size in sizes)
+        z1 = z + max(size[2] for size in sizes)
+        boxes = self.boxes
+        blocking = [boxes[i] for i in self.nearby(x, y, z, x1, y1, z1)]
+        blocking = [box for box in blocking
+                    if x < box[3] - EPS and box[0] < x1 - EPS and
+                    y < box[4] - EPS and box[1] < y1 - EPS and
+                    z < box[5] - EPS and box[2] < z1 - EPS]
+        if not blocking:
+            return list(sizes)
+        return [(w, h, d) for w, h, d in sizes
+                if not any(bx0 < x + w - EPS and by0 < y + h - EPS and bz0 < z + d - EPS
+                           for bx0, by0, bz0, _, _, _ in blocking)]
+
+    def contains_point(self, x, y, z):
+        """点是否落在某个物品内部（按半开区间 [min, max) 计算）"""
+        c = self.cell_size
+        bucket = self._cells.get((math.floor(x / c), math.floor(y / c), math.floor(z / c)))
+        if not bucket:
+            return False
+        boxes = self.boxes
+        for i in bucket:
+            bx0, by0, bz0, bx1, by1, bz1 = boxes[i]
+            if (bx0 - EPS <= x < bx1 - EPS and
+                    by0 - EPS <= y < by1 - EPS and
+                    bz0 - EPS <= z < bz1 - EPS):
+                return True
+        return False
+
+    def support(self, x0, z0, x1, z1, y):
+        """
+        计算底面位于高度 y、投影为 [x0, x1] x [z0, z1] 的物品所受的支撑
+
+        返回 (支撑面积, 是否压在易碎品上)，地面支撑整个底面。
+        """
+        if y <= EPS:
+            return (x1 - x0) * (z1 - z0), False
+        area = 0.0
+        on_fragile = False
+        boxes = self.boxes
+        for i in self.nearby(x0, y - 2 * EPS, z0, x1, y + EPS, z1):
+            bx0, by0, bz0, bx1, by1, bz1 = boxes[i]
+            if abs(by1 - y) > EPS:
+                continue
+            dx = min(x1, bx1) - max(x0, bx0)
+            dz = min(z1, bz1) - max(z0, bz0)
+            if dx > EPS and dz > EPS:
+                area += dx * dz
+                if self.fragile[i]:
+                    on_fragile = True
+        return area, on_fragile
+
+    def solid_support(self, x0, z0, x1, z1, y):
+        """
+        高度 y、投影 [x0, x1] x [z0, z1] 内可以承重（非易碎）的顶面
+
+        返回 (面积, x 方向的范围, z 方向的范围)：支撑都落在 [x0, x0 + x 范围] x [z0, z0 + z 范围] 内。
+        地面均为无穷大。
+        """
+        if y <= EPS:
+            return math.inf, math.inf, math.inf
+        area = 0.0
+        reach_x = reach_z = 0.0
+        boxes = self.boxes
+        fragile = self.fragile
+        for i in self.nearby(x0, y - 2 * EPS, z0, x1, y + EPS, z1):
+            bx0, by0, bz0, bx1, by1, bz1 = boxes[i]
+            if abs(by1 - y) > EPS or fragile[i]:
+                continue
+            dx = min(x1, bx1) - max(x0, bx0)
+            dz = min(z1, bz1) - max(z0, bz0)
+            if dx > EPS and dz > EPS:
+                area += dx * dz
+                reach_x = max(reach_x, min(x1, bx1) - x0)
+                reach_z = max(reach_z, min(z1, bz1) - z0)
+        return area, reach_x, reach_z
+
+    def covered(self, x0, z0, x1, z1, y):
+        """是否有物品压在高度 y、投影为 [x0, x1] x [z0, z1] 的顶面上"""
+        boxes = self.boxes
+        for i in self.nearby(x0, y - EPS, z0, x1, y + 2 * EPS, z1):
+            bx0, by0, bz0, bx1, by1, bz1 = boxes[i]
+            if (abs(by0 - y) <= EPS and
+                    min(x1, bx1) - max(x0, bx0) > EPS and
+                    min(z1, bz1) - max(z0, bz0) > EPS):
+                return True
+        return False
+
+    def _column(self, point, axis, layers):
+        """依次返回点所在网格列（沿 axis 轴）中各层的物品，以及另外两个轴"""
+        c = self.cell_size
+        key = [math.floor(point[0] / c), math.floor(point[1] / c), math.floor(point[2] / c)]
+        a, b = [i for i in range(3) if i != axis]
+        cells = self._cells
+        for layer in layers:
+            key[axis] = layer
+            bucket = cells.get(tuple(key))
+            if bucket:
+                yield bucket, a, b
+
+    def project(self, point, axis):
+        """
+        把点沿 axis 轴负方向投影到最近的物品表面，没有遮挡时投影到容器壁 (0)
+
+        逐层向下扫描该点所在的一列网格，第一层命中即为最近表面。
+        """
+        c = self.cell_size
+        coord = point[axis]
+        boxes = self.boxes
+        top = axis + 3
+        for bucket, a, b in self._column(point, axis, range(math.floor(coord / c), -1, -1)):
+            pa, pb = point[a], point[b]
+            best = None
+            for i in bucket:
+                box = boxes[i]
+                hi = box[top]
+                if (hi <= coord + EPS and (best is None or hi > best) and
+                        box[a] - EPS <= pa < box[a + 3] - EPS and
+                        box[b] - EPS <= pb < box[b + 3] - EPS):
+                    best = hi
+            if best is not None:
+                return best
+        return 0.0
+
+    def reach(self, point, axis, limit):
+        """
+        从点出发沿 axis 轴正方向可以延伸的最远坐标，不超过 limit
+
+        只检查射线本身，因此结果是该方向可用空间的上界。
+        """
+        c = self.cell_size
+        coord = point[axis]
+        boxes = self.boxes
+        layers = range(math.floor((coord - EPS) / c), math.floor(limit / c) + 1)
+        for bucket, a, b in self._column(point, axis, layers):
+            pa, pb = point[a], point[b]
+            best = None
+            for i in bucket:
+                box = boxes[i]
+                lo = box[axis]
+                if (lo >= coord - EPS and (best is None or lo < best) and
+                        box[a] - EPS <= pa < box[a + 3] - EPS and
+                        box[b] - EPS <= pb < box[b + 3] - EPS):
+                    best = lo
+            if best is not None:
+                return min(best, limit)
+        return limit
+
+    def free_boxes(self, point, extent):
+        """
+        以 point 为最小角、不与任何物品相交的极大长方体的尺寸 (x, y, z) 列表
+
+        extent 为三个方向射线给出的可用长度（见 reach），结果都在其范围内。
+        范围内的障碍物过多时只返回 [extent]，仍然是可用空间的上界。
+        """
+        px, py, pz = point
+        ex, ey, ez = extent
+        obstacles = []
+        for i in self.nearby(px, py, pz, px + ex, py + ey, pz + ez):
+            bx0, by0, bz0, bx1, by1, bz1 = self.boxes[i]
+            if (bx0 < px + ex - EPS and bx1 > px + EPS and by0 < py + ey - EPS and by1 > py + EPS and
+                    bz0 < pz + ez - EPS and bz1 > pz + EPS):
+                obstacles.append((max(bx0 - px, 0.0), max(by0 - py, 0.0), max(bz0 - pz, 0.0)))
+                if len(obstacles) > MAX_FREE_BOX_OBSTACLES:
+                    return [tuple(extent)]
+        # 极大长方体的 x、z 边长只可能是射线长度或某个障碍物的起点
+        xs = sorted({ex} | {o[0] for o in obstacles if o[0] > EPS})
+        zs = sorted({ez} | {o[2] for o in obstacles if o[2] > EPS})
+        result = []
+        for sx in xs:
+            for sz in zs:
+                sy = ey
+                for ox, oy, oz in obstacles:
+                    if ox < sx - EPS and oz < sz - EPS and oy < sy:
+                        sy = oy
+                if sy > EPS and not any(bx >= sx - EPS and by >= sy - EPS and bz >= sz - EPS
+                                        for bx, by, bz in result):
+                    result = [b for b in result if not (sx >= b[0] - EPS and sy >= b[1] - EPS and sz >= b[2] - EPS)]
+                    result.append((sx, sy, sz))
+        return result
+
+
+def capacity(boxes, footprints=None):
+    """
+    一组可用长方体 (x, y, z) 各自能容纳的尺寸上界
+
+    每个长方体给出 (排序后的三边, 高度, 排序后的两条水平边, 最大底面积)。物品能放进
+    该长方体时，排序后的尺寸不超过前三项；face_up 的物品高度不超过第四项，排序后的
+    水平尺寸不超过第五、六项。footprints 为每个长方体内支撑条件允许的最大底面积，默认不限。
+    """
+    result = []
+    if footprints is None:
+        footprints = [math.inf] * len(boxes)
+    for (x, y, z), footprint in zip(boxes, footprints):
+        lo, hi = (x, z) if x <= z else (z, x)
+        result.append(tuple(sorted((x, y, z))) + (y, lo, hi, footprint))
+    return result
+
+
+def admits(bound, key):
+    """容量上界 bound 是否可能容纳尺寸键为 key（见 records.size_key）的物品"""
+    if key[0]:
+        return (key[1] <= bound[3] + EPS and key[2] <= bound[4] + EPS and key[3] <= bound[5] + EPS and
+                key[2] * key[3] <= bound[6])
+    # 底面积最小的方向以两条最短边为底
+    return (key[1] <= bound[0] + EPS and key[2] <= bound[1] + EPS and key[3] <= bound[2] + EPS and
+            key[1] * key[2] <= bound[6])
+
+
+class _PointChunks:
+    """
+    按 (y, z, x) 排序的点，分块保存
+
+    每块记录覆盖块内所有容量的少数几个上界（见 _cover）。查找时整块跳过放不下的块，
+    只访问可能放得下的点；numpy 可用时把所有容量排成一个数组一次比较，不再逐块检查。
+    放置只会增加障碍，点的容量只会变小，因此删除点后块的上界仍然有效；增加点或更新容量时
+    把该块标记为待重新计算。
+    """
+
+    def __init__(self, capacity):
+        self._chunks = []
+        self._heads = []
+        self._bounds = []
+        # 所有容量的逐项最大值，None 表示待重新计算
+        self._cover = None
+        # numpy 可用时为 (所有点, 每行所属点的序号, 所有容量排成的数组)，None 表示待重新构造
+        self._matrix = None
+        # 所有点的容量上界，与 PointIndex 共用
+        self.capacity = capacity
+
+    def __bool__(self):
+        return bool(self._chunks)
+
+    def __len__(self):
+        return len(self._chunks)
+
+    @property
+    def head(self):
+        return self._heads[0]
+
+    def __iter__(self):
+        for chunk in self._chunks:
+            yield from chunk
+
+    def _chunk_of(self, point):
+        return max(bisect.bisect_right(self._heads, point) - 1, 0)
+
+    def add(self, point):
+        chunks = self._chunks
+        self._cover = self._matrix = None
+        if not chunks:
+            chunks.append([point])
+            self._heads.append(point)
+            self._bounds.append(None)
+            return
+        n = self._chunk_of(point)
+        chunk = chunks[n]
+        bisect.insort(chunk, point)
+        self._heads[n] = chunk[0]
+        self._bounds[n] = None
+        if len(chunk) > 2 * POINT_CHUNK:
+            tail = chunk[POINT_CHUNK:]
+            del chunk[POINT_CHUNK:]
+            chunks.insert(n + 1, tail)
+            self._heads.insert(n + 1, tail[0])
+            self._bounds.insert(n + 1, None)
+
+    def touch(self, point):
+        """点的容量变小了，重新计算所在块的上界"""
+        self._bounds[self._chunk_of(point)] = None
+        self._cover = self._matrix = None
+
+    def remove(self, point):
+        n = self._chunk_of(point)
+        chunk = self._chunks[n]
+        self._matrix = None
+        del chunk[bisect.bisect_left(chunk, point)]
+        if chunk:
+            self._heads[n] = chunk[0]
+        else:
+            del self._chunks[n], self._heads[n], self._bounds[n]
+
+    def split(self, count):
+        """把第 count 块之后的块移到新的 _PointChunks 并返回"""
+        tail = _PointChunks(self.capacity)
+        tail._chunks, tail._heads, tail._bounds = self._chunks[count:], self._heads[count:], self._bounds[count:]
+        del self._chunks[count:], self._heads[count:], self._bounds[count:]
+        self._cover = self._matrix = None
+        return tail
+
+    def _chunk_bounds(self, n):
+        bounds = self._bounds[n]
+        if bounds is None:
+            bounds = self._bounds[n] = _cover(bound for point in self._chunks[n] for bound in self.capacity[point])
+        return bounds
+
+    def cover(self):
+        """所有点的容量的逐项最大值"""
+        if self._cover is None:
+            if np is not None:
+                self._cover = tuple(self._rows()[2].max(axis=0).tolist())
+            else:
+                capacity = self.capacity
+                self._cover = tuple(map(max, zip(*(bound for point in self for bound in capacity[point]))))
+        return self._cover
+
+    def _rows(self):
+        if self._matrix is None:
+            capacity = self.capacity
+            points = list(self)
+            owners = [n for n, point in enumerate(points) for _ in capacity[point]]
+            bounds = np.array([bound for point in points for bound in capacity[point]], dtype=float)
+            self._matrix = points, np.array(owners), bounds
+        return self._matrix
+
+    def candidates(self, key):
+        if np is not None:
+            # 一次比较所有容量，只在 Python 中访问放得下的点
+            points, owners, bounds = self._rows()
+            if key[0]:
+                fits = ((bounds[:, 3] >= key[1] - EPS) & (bounds[:, 4] >= key[2] - EPS) &
+                        (bounds[:, 5] >= key[3] - EPS) & (bounds[:, 6] >= key[2] * key[3]))
+            else:
+                fits = ((bounds[:, 0] >= key[1] - EPS) & (bounds[:, 1] >= key[2] - EPS) &
+                        (bounds[:, 2] >= key[3] - EPS) & (bounds[:, 6] >= key[1] * key[2]))
+            for n in np.unique(owners[fits]).tolist():
+                yield points[n]
+            return
+        capacity = self.capacity
+        for n, chunk in enumerate(self._chunks):
+            if not any(admits(bound, key) for bound in self._chunk_bounds(n)):
+                continue
+            for point in chunk:
+                if any(admits(bound, key) for bound in capacity[point]):
+                    yield point
+
+
+class _PointPages:
+    """
+    按 (y, z, x) 排序的点，分页保存，每页是若干块（见 _PointChunks）
+
+    每页记录页内所有容量的逐项最大值，查找时整页跳过放不下的页；numpy 可用时每页的
+    容量一次比较（见 _PointChunks）。增删点只影响所在的页，页内块数过多时拆分。
+    """
+
+    def __init__(self, capacity):
+        self._pages = []
+        self._heads = []
+        self.capacity = capacity
+
+    def __bool__(self):
+        return bool(self._pages)
+
+    def __iter__(self):
+        for page in self._pages:
+            yield from page
+
+    def _page_of(self, point):
+        return max(bisect.bisect_right(self._heads, point) - 1, 0)
+
+    def add(self, point):
+        pages = self._pages
+        if not pages:
+            pages.append(_PointChunks(self.capacity))
+            self._heads.append(point)
+        n = self._page_of(point)
+        page = pages[n]
+        page.add(point)
+        self._heads[n] = page.head
+        if len(page) > 2 * POINT_PAGE:
+            tail = page.split(POINT_PAGE)
+            pages.insert(n + 1, tail)
+            self._heads.insert(n + 1, tail.head)
+
+    def touch(self, point):
+        self._pages[self._page_of(point)].touch(point)
+
+    def remove(self, point):
+        n = self._page_of(point)
+        page = self._pages[n]
+        page.remove(point)
+        if page:
+            self._heads[n] = page.head
+        else:
+            del self._pages[n], self._heads[n]
+
+    def candidates(self, key):
+        for page in self._pages:
+            if admits(page.cover(), key):
+                yield from page.candidates(key)
+
+
+def _size_class(length):
+    """长度所在的等级，等级 c 包含 [POINT_CLASS_RATIO ** c, POINT_CLASS_RATIO ** (c + 1))"""
+    if length <= 0:
+        return -math.inf
+    if length == math.inf:
+        return math.inf
+    return math.floor(math.log(length, POINT_CLASS_RATIO))
+
+
+class PointIndex:
+    """
+    按 (y, z, x) 排序的候选点
+
+    每个点记录各个可用长方体的容量上界（见 capacity，未知时为 UNKNOWN_CAPACITY）。
+    点按容量上界中最长的最短边和最大的底面积分级（见 _size_class），每级的点分页、
+    分块保存（见 _PointPages）。物品的最短边（face_up 时为高度和较短水平边中的较小者）不能超过
+    可用长方体的最短边，底面积不能超过支撑允许的底面积，查找时只合并这两项都足够的
+    几级，容纳不了当前物品的窄缝和支撑太少的顶面不会被逐个访问。
+    """
+
+    def __init__(self):
+        self.capacity = {}
+        self._classes = {}
+        self._class_of = {}
+        # 容量变小后需要降级的点；查找过程中可能更新容量，降级推迟到下一次查找之前
+        self._demoted = set()
+
+    def __len__(self):
+        return len(self.capacity)
+
+    def __contains__(self, point):
+        return point in self.capacity
+
+    def __iter__(self):
+        return heapq.merge(*self._classes.values())
+
+    def _level(self, bounds):
+        return (_size_class(max(bound[0] for bound in bounds)),
+                _size_class(math.sqrt(max(bound[6] for bound in bounds))))
+
+    def _insert(self, point, level):
+        self._class_of[point] = level
+        chunks = self._classes.get(level)
+        if chunks is None:
+            chunks = self._classes[level] = _PointPages(self.capacity)
+        chunks.add(point)
+
+    def _discard(self, point):
+        level = self._class_of.pop(point)
+        chunks = self._classes[level]
+        chunks.remove(point)
+        if not chunks:
+            del self._classes[level]
+
+    def add(self, point, bounds=UNKNOWN_CAPACITY):
+        self.capacity[point] = bounds
+        self._insert(point, self._level(bounds))
+
+    def update(self, point, bounds):
+        """更新点的容量上界（只能变小）"""
+        self.capacity[point] = bounds
+        self._classes[self._class_of[point]].touch(point)
+        if self._level(bounds) != self._class_of[point]:
+            self._demoted.add(point)
+
+    def remove(self, point):
+        self._discard(point)
+        self._demoted.discard(point)
+        del self.capacity[point]
+
+    def candidates(self, key):
+        """按顺序返回容量上界可能容纳尺寸键 key 的点；调用方在迭代结束后才能增删点"""
+        for point in self._demoted:
+            self._discard(point)
+            self._insert(point, self._level(self.capacity[point]))
+        self._demoted.clear()
+        if key[0]:
+            shortest, footprint = min(key[1], key[2]), key[2] * key[3]
+        else:
+            shortest, footprint = key[1], key[1] * key[2]
+        lowest = _size_class(shortest - EPS)
+        smallest = _size_class(math.sqrt(footprint))
+        iterators = [chunks.candidates(key) for (side, area), chunks in self._classes.items()
+                     if side >= lowest and area >= smallest]
+        if len(iterators) == 1:
+            return iterators[0]
+        return heapq.merge(*iterators)
+
+
+def _cover(bounds):
+    """
+    覆盖一组容量上界的至多 CHUNK_BOUNDS 个上界
+
+    去掉被其他上界逐项支配的上界；剩余的仍然太多时，把多出的部分合并为逐项最大值。
+    """
+    front = []
+    for bound in bounds:
+        if any(all(a >= b for a, b in zip(other, bound)) for other in front):
+            continue
+        front = [other for other in front if not all(a >= b for a, b in zip(bound, other))]
+        front.append(bound)
+    if len(front) > CHUNK_BOUNDS:
+        front[CHUNK_BOUNDS - 1:] = [tuple(map(max, *front[CHUNK_BOUNDS - 1:]))]
+    return front
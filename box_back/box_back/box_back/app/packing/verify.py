@@ -0,0 +1,316 @@
+# box_back/box_back/app/packing/verify.py
+"""
+摆放结果的校验
+
+保存前检查算法（包括上传的第三方算法）返回的结果：物品齐全、尺寸与输入一致、
+face_up 物品没有被翻转、与容器相交的物品完整地位于容器内、容器内的物品互不重叠。
+完全在容器外的物品视为未装入，不算违反约束。
+
+重叠检查先用均匀网格（空间哈希）找出落在同一网格中的物品对，再逐对精确比较，
+代价随物品数近似线性增长。重叠的物品对只计数，只保留前几对作为示例，大量物品堆在
+一起时也不会占用过多内存；只需要结论时可以在发现重叠后提前结束。
+需要在 web 进程中运行，不能交给运行过上传代码的子进程。
+"""
+try:
+    import numpy as np
+except ImportError:  # numpy 不可用时使用纯 Python 实现
+    np = None
+
+import math
+import statistics
+
+from .engine import MIN_SUPPORT
+from .itembatch import ItemBatch
+from .spatial import EPS, SpatialIndex
+
+# 每批精确比较的物品对数，限制临时数组的大小
+PAIR_CHUNK = 1 << 20
+
+# 单个物品在每个轴上最多覆盖的网格数，避免少数特别大的物品展开出过多记录
+MAX_CELLS_PER_BOX_AXIS = 64
+
+
+class PlacementError(Exception):
+    """摆放结果违反约束；violations 为各项违反的次数（重叠数可能只统计到发现违反为止）"""
+
+    def __init__(self, violations, examples=None):
+        self.violations = violations
+        self.examples = examples or []
+        details = ', '.join(f"{kind}={count}" for kind, count in violations.items() if count)
+        super().__init__(f"Invalid placement: {details}")
+
+
+def _size_key(face_up, w, h, d):
+    # face_up 的物品只能绕竖直轴旋转，高度必须保持不变
+    if face_up:
+        return (True, h, min(w, d), max(w, d))
+    return (False,) + tuple(sorted((w, h, d)))
+
+
+def _dimension_rows(items):
+    if isinstance(items, ItemBatch):
+        return items.dimension_rows()
+    return [(bool(item.get('face_up', False)),
+             float(item['dimensions']['x']), float(item['dimensions']['y']), float(item['dimensions']['z']))
+            for item in items]
+
+
+def _mismatched(expected, actual):
+    """actual 中与 expected 不对应的物品数（按尺寸键比较多重集合）"""
+    if np is None:
+        counts = {}
+        for row in expected:
+            key = _size_key(*row)
+            counts[key] = counts.get(key, 0) + 1
+        extra = 0
+        for row in actual:
+            key = _size_key(*row)
+            if counts.get(key, 0) > 0:
+                counts[key] -= 1
+            else:
+                extra += 1
+        return extra
+
+    def keys(rows):
+        a = np.asarray(rows, dtype=float).reshape(-1, 4)
+        face_up = a[:, 0] > 0
+        dims = a[:, 1:]
+        flat = np.sort(dims, axis=1)
+        upright = np.stack([dims[:, 1], np.minimum(dims[:, 0], dims[:, 2]), np.maximum(dims[:, 0], dims[:, 2])],
+                           axis=1)
+        return np.column_stack([face_up, np.where(face_up[:, None], upright, flat)])
+
+    both = np.concatenate([keys(expected), keys(actual)])
+    if len(both) == 0:
+        return 0
+    _, inverse = np.unique(both, axis=0, return_inverse=True)
+    weights = np.concatenate([-np.ones(len(expected)), np.ones(len(actual))])
+    balance = np.bincount(inverse.ravel(), weights=weights)
+    return int(balance[balance > 0].sum())
+
+
+def check_boxes(lo, size, space, max_examples=5, max_overlaps=None):
+    """
+    检查物品的位置关系，返回 ({'bounds': ..., 'overlap': ..., 'outside': ...}, 重叠物品对的示例)
+
+    lo、size 为 (n, 3) 的数组（或行的列表），space 为容器的 (x, y, z)。
+    bounds 为部分伸出容器的物品数，outside 为完全在容器外（未装入）的物品数，
+    overlap 为容器内相互重叠的物品对数；示例为最先发现的至多 max_examples 个重叠物品对
+    在输入中的下标。给定 max_overlaps 时，重叠数达到该值后停止检查，overlap 只是下限。
+    """
+    if np is None:
+        return _check_boxes_python(lo, size, space, max_examples, max_overlaps)
+    lo = np.asarray(lo, dtype=float).reshape(-1, 3)
+    hi = lo + np.asarray(size, dtype=float).reshape(-1, 3)
+    limit = np.asarray(space, dtype=float)
+
+    outside = np.any((hi <= EPS) | (lo >= limit - EPS), axis=1)
+    partial = ~outside & np.any((lo < -EPS) | (hi > limit + EPS), axis=1)
+    index = np.flatnonzero(~outside)
+    overlaps, pairs = _overlapping_pairs(lo[index], hi[index], max_examples, max_overlaps)
+    examples = [(int(index[a]), int(index[b])) for a, b in pairs]
+    return {'bounds': int(partial.sum()), 'overlap': overlaps, 'outside': int(outside.sum())}, examples
+
+
+def _overlapping_pairs(lo, hi, max_examples, max_overlaps=None):
+    """
+    统计相互重叠的物品对，返回 (对数, 至多 max_examples 个示例对 (i, j)，i < j)
+
+    只按批计数，不保存全部物品对；对数达到 max_overlaps 后不再检查剩余的批。
+    """
+    n = len(lo)
+    if n < 2:
+        return 0, []
+    extent = hi - lo
+    # 网格边长取物品最大边长的 90 分位数，绝大多数物品只覆盖相邻的几个网格
+    cell = max(float(np.quantile(extent.max(axis=1), 0.9)), float(extent.max()) / MAX_CELLS_PER_BOX_AXIS)
+    if cell <= EPS:
+        cell = 1.0
+    origin = lo.min(axis=0)
+    first = np.floor((lo - origin) / cell).astype(np.int64)
+    last = np.maximum(first, np.floor((np.maximum(lo, hi - EPS) - origin) / cell).astype(np.int64))
+    span = last - first + 1
+    dims = last.max(axis=0) + 1
+
+    # 把每个物品展开为它覆盖的每个网格的一条记录
+    count = span.prod(axis=1)
+    box = np.repeat(np.arange(n), count)
+    local = np.arange(count.sum()) - np.repeat(np.cumsum(count) - count, count)
+    sx, sy = span[box, 0], span[box, 1]
+    cx = first[box, 0] + local % sx
+    cy = first[box, 1] + (local // sx) % sy
+    cz = first[box, 2] + local // (sx * sy)
+    key = (cx * dims[1] + cy) * dims[2] + cz
+
+    order = np.argsort(key, kind='stable')
+    key, box = key[order], box[order]
+    # 每条记录与同一网格中排在它后面的记录组成候选对
+    group_end = np.searchsorted(key, key, side='right')
+    partners = group_end - np.arange(len(key)) - 1
+
+    total = 0
+    examples = []
+    cumulative = np.cumsum(partners)
+    start = 0
+    done = 0
+    while start < len(key):
+        # 按候选对数分批，避免一次生成过大的数组
+        stop = max(start + 1, int(np.searchsorted(cumulative, done + PAIR_CHUNK, side='right')))
+        done = cumulative[stop - 1]
+        chunk = partners[start:stop]
+        left = np.repeat(np.arange(start, stop), chunk)
+        right = left + 1 + np.arange(chunk.sum()) - np.repeat(np.cumsum(chunk) - chunk, chunk)
+        a, b = box[left], box[right]
+        overlap = np.all((lo[a] < hi[b] - EPS) & (lo[b] < hi[a] - EPS), axis=1)
+        a, b, cell_key = a[overlap], b[overlap], key[left][overlap]
+        # 同一对物品可能共享多个网格，只在相交区域最小角所在的网格计数一次
+        corner = np.floor((np.maximum(lo[a], lo[b]) - origin) / cell).astype(np.int64)
+        own = (corner[:, 0] * dims[1] + corner[:, 1]) * dims[2] + corner[:, 2] == cell_key
+        total += int(own.sum())
+        if len(examples) < max_examples:
+            a, b = a[own][:max_examples], b[own][:max_examples]
+            examples.extend(zip(np.minimum(a, b).tolist(), np.maximum(a, b).tolist()))
+            del examples[max_examples:]
+        if max_overlaps is not None and total >= max_overlaps:
+            break
+        start = stop
+    return total, sorted(examples)
+
+
+def _check_boxes_python(lo, size, space, max_examples, max_overlaps=None):
+    # 与 _overlapping_pairs 相同的均匀网格：每个物品登记到它覆盖的网格，只比较同一网格中的物品
+    boxes = []
+    counts = {'bounds': 0, 'overlap': 0, 'outside': 0}
+    for index, (low, extent) in enumerate(zip(lo, size)):
+        low = [float(v) for v in low]
+        high = [low[k] + float(extent[k]) for k in range(3)]
+        if any(high[k] <= EPS or low[k] >= space[k] - EPS for k in range(3)):
+            counts['outside'] += 1
+            continue
+        if any(low[k] < -EPS or high[k] > space[k] + EPS for k in range(3)):
+            counts['bounds'] += 1
+        boxes.append((low, high, index))
+    if len(boxes) < 2:
+        return counts, []
+
+    longest = sorted(max(high[k] - low[k] for k in range(3)) for low, high, _ in boxes)
+    cell = max(longest[int(0.9 * (len(longest) - 1))], longest[-1] / MAX_CELLS_PER_BOX_AXIS)
+    if cell <= EPS:
+        cell = 1.0
+    origin = [min(low[k] for low, _, _ in boxes) for k in range(3)]
+
+    def cell_of(point):
+        return tuple(math.floor((point[k] - origin[k]) / cell) for k in range(3))
+
+    cells = {}
+    for n, (low, high, _) in enumerate(boxes):
+        first = cell_of(low)
+        last = cell_of([max(low[k], high[k] - EPS) for k in range(3)])
+        for i in range(first[0], max(first[0], last[0]) + 1):
+            for j in range(first[1], max(first[1], last[1]) + 1):
+                for k in range(first[2], max(first[2], last[2]) + 1):
+                    cells.setdefault((i, j, k), []).append(n)
+
+    examples = []
+    for key, members in cells.items():
+        for position, a in enumerate(members):
+            low, high, index = boxes[a]
+            for b in members[position + 1:]:
+                other_low, other_high, other_index = boxes[b]
+                if not all(low[k] < other_high[k] - EPS and other_low[k] < high[k] - EPS for k in range(3)):
+                    continue
+                # 同一对物品可能共享多个网格，只在相交区域最小角所在的网格计数一次
+                if cell_of([max(low[k], other_low[k]) for k in range(3)]) != key:
+                    continue
+                counts['overlap'] += 1
+                if len(examples) < max_examples:
+                    examples.append((min(index, other_index), max(index, other_index)))
+                if max_overlaps is not None and counts['overlap'] >= max_overlaps:
+                    return counts, sorted(examples)
+    return counts, sorted(examples)
+
+
+def count_violations(items_data, placed_items, space_dimensions, max_examples=5, max_overlaps=None):
+    """
+    校验一组摆放结果，返回 ({种类: 次数}, 重叠物品的 order_id 对示例)
+
+    items：物品缺失、多出或 order_id 重复；rotation：尺寸与输入不符或 face_up 物品被翻转；
+    bounds：部分伸出容器的物品；overlap：容器内相互重叠的物品对，max_overlaps 见 check_boxes。
+    items_data 和 placed_items 都可以是 ItemBatch，此时直接使用其中的列。
+    """
+    if isinstance(placed_items, ItemBatch):
+        order_ids = placed_items.order_id.tolist()
+    else:
+        order_ids = [item.get('order_id') for item in placed_items]
+    violations = {
+        'items': abs(len(placed_items) - len(items_data)) + len(order_ids) - len(set(order_ids)),
+        'rotation': _mismatched(_dimension_rows(items_data), _dimension_rows(placed_items)),
+    }
+    if isinstance(placed_items, ItemBatch):
+        # numpy 可以直接读取 array 的缓冲区
+        lo, size = ((placed_items.position, placed_items.dimensions) if np is not None
+                    else (placed_items.positions(), placed_items.sizes()))
+    else:
+        lo = [[float(item['position'][axis]) for axis in 'xyz'] for item in placed_items]
+        size = [[float(item['dimensions'][axis]) for axis in 'xyz'] for item in placed_items]
+    space = [float(space_dimensions[axis]) for axis in 'xyz']
+    boxes, pairs = check_boxes(lo, size, space, max_examples, max_overlaps)
+    violations['bounds'] = boxes['bounds']
+    violations['overlap'] = boxes['overlap']
+    return violations, [(order_ids[a], order_ids[b]) for a, b in pairs]
+
+
+def count_unsupported(placed_items, space_dimensions, min_support=MIN_SUPPORT):
+    """
+    容器内离地但底面被支撑的比例低于 min_support 的物品数（悬空的物品）
+
+    支撑面积为顶面恰好位于物品底面高度的物品与其底面的重叠面积之和。不属于
+    verify_placement 的检查（上传的算法不要求支撑），用于基准测试报告各引擎的结果。
+    """
+    placed_items = placed_items if isinstance(placed_items, ItemBatch) else ItemBatch.from_placements(placed_items)
+    space = [float(space_dimensions[axis]) for axis in 'xyz']
+    boxes = [(x, y, z, x + w, y + h, z + d)
+             for (x, y, z), (w, h, d) in zip(placed_items.positions(), placed_items.sizes())
+             if all(lo >= -EPS and hi <= limit + EPS for lo, hi, limit in zip((x, y, z), (x + w, y + h, z + d), space))]
+    if not boxes:
+        return 0
+    index = SpatialIndex(statistics.median(max(b[3] - b[0], b[4] - b[1], b[5] - b[2]) for b in boxes))
+    for box in boxes:
+        index.insert(box)
+    unsupported = 0
+    for x0, y0, z0, x1, y1, z1 in boxes:
+        if y0 > EPS and index.support(x0, z0, x1, z1, y0)[0] < min_support * (x1 - x0) * (z1 - z0) - EPS:
+            unsupported += 1
+    return unsupported
+
+
+def verify_placement(items_data, placed_items, space_dimensions):
+    """校验摆放结果，违反任何约束时抛出 PlacementError；发现重叠后不再统计剩余的重叠"""
+    violations, examples = count_violations(items_data, placed_items, space_dimensions, max_overlaps=1)
+    if any(violations.values()):
+        raise PlacementError(violations, examples)
+
+
+def verify_extension(items_data, placed_items, space_dimensions, index, order_ids):
+    """
+    校验追加到已有摆放上的结果，违反任何约束时抛出 PlacementError
+
+    新物品之间按 verify_placement 校验；已有物品此前已经校验过，只检查每个新物品与
+    index（已有物品的 SpatialIndex，order_ids[i] 为其中第 i 个物品的 order_id）中
+    相邻物品是否重叠，代价与已有物品的数量无关。
+    """
+    violations, examples = count_violations(items_data, placed_items, space_dimensions, max_overlaps=1)
+    if not violations['overlap']:
+        space = [float(space_dimensions[axis]) for axis in 'xyz']
+        for item in placed_items:
+            lo = [float(item['position'][axis]) for axis in 'xyz']
+            hi = [lo[k] + float(item['dimensions'][axis]) for k, axis in enumerate('xyz')]
+            if any(hi[k] <= EPS or lo[k] >= space[k] - EPS for k in range(3)):
+                continue
+            hits = index.overlapping(*lo, *hi)
+            if hits:
+                violations['overlap'] = 1
+                examples = [(order_ids[hits[0]], item['order_id'])]
+                break
+    if any(violations.values()):
+        raise PlacementError(violations, examples)
@@ -1,31 +1,23 @@
-# box_back/box_back/app/packing_algorithm.py
-
-def place_items(items_data, space_dimensions):
-    placed_items = []
-    current_x = 0
-    
-    for index, item in enumerate(items_data):
-        order_id = index + 1
-        
-        dimensions = item['dimensions']
-        
-        position = {
-            'x': current_x,
-            'y': 2,
-            'z': 2
-        }
-        
-        current_x += dimensions['x']
-        
-        placed_item = {
-            'order_id': order_id,
-            'name': item['name'],
-            'position': position,
-            'dimensions': dimensions,
-            'face_up': item.get('face_up', False),
-            'fragile': item.get('fragile', False)
-        }
-        
-        placed_items.append(placed_item)
-    
-    return placed_items
\ No newline at end of file
+# box_back/box_back/app/packing_algorithm.py
+from box_back.app.packing.engine import pack_batch, pack_items
+
+
+def place_items(items_data, space_dimensions):
+    """
+    计算每个物品的摆放位置和装载顺序
+
+    使用极点启发式在 space_dimensions 内放置物品，物品之间不重叠，
+    非地面物品需有足够支撑且不压在易碎品上；放不下的物品摆在容器外。
+    """
+    return pack_items(items_data, space_dimensions)
+
+
+def place_batch(items, space_dimensions, deadline=None):
+    """
+    与 place_items 相同，输入输出为 packing.itembatch.ItemBatch
+
+    服务层优先调用 place_batch，物品不必转换为字典；没有 place_batch 的算法版本
+    仍按 place_items 的字典约定调用。给定 deadline（time.perf_counter() 时间）时，
+    到期后返回已经放置的部分，其余物品摆在容器外。
+    """
+    return pack_batch(items, space_dimensions, deadline=deadline)
@@ -0,0 +1,11 @@
+# box_back/box_back/app/pagination.py
+from django.conf import settings
+from rest_framework.pagination import CursorPagination
+
+
+class TaskCursorPagination(CursorPagination):
+    """任务列表的游标分页，按创建时间从新到旧，创建时间相同时按 id"""
+    ordering = ('-created_at', '-id')
+    page_size = settings.TASK_LIST_PAGE_SIZE
+    page_size_query_param = 'page_size'
+    max_page_size = settings.TASK_LIST_MAX_PAGE_SIZE
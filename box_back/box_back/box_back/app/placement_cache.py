@@ -0,0 +1,142 @@
+# box_back/box_back/app/placement_cache.py
+import base64
+import hashlib
+import json
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import F, Q, Sum
+from django.utils import timezone
+
+from .algorithms import algorithm_version
+from .models import PlacementCache
+from .packing.itembatch import ItemBatch, as_batch, as_placements
+from .packing.loader import ENGINES
+
+# 引擎的输出格式或行为变化时递增，使旧的缓存失效
+CACHE_FORMAT = 7
+
+_lock = threading.Lock()
+_entries = OrderedDict()
+_stats = {'memory_hits': 0, 'db_hits': 0, 'misses': 0}
+
+
+def placement_key(items_data, space_data, portfolio=False, time_budget_ms=None, version=None):
+    """
+    由规范化后的输入计算缓存键
+
+    物品按内容排序，只是顺序不同的订单共用一个键：摆放结果不含输入下标，校验也按
+    多重集合比较物品，缓存的结果对任一顺序都是合法的摆放。尺寸统一为浮点数，
+    缺省的 face_up/fragile 视为 False。version 为算法版本哈希，默认为当前激活的版本。
+    items_data 可以是 ItemBatch，与相同内容的物品字典得到相同的键。
+    """
+    canonical = {
+        'format': CACHE_FORMAT,
+        'algorithm': version or algorithm_version(),
+        'space': [float(space_data['x']), float(space_data['y']), float(space_data['z'])],
+        'items': sorted(
+            [str(name), width, height, depth, face_up, fragile]
+            for _, name, _, _, _, width, height, depth, face_up, fragile in as_batch(items_data).rows()
+        ),
+        'portfolio': bool(portfolio),
+        'time_budget_ms': time_budget_ms,
+    }
+    payload = json.dumps(canonical, separators=(',', ':'), ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def encode_result(placed_items, strategy, time_ms):
+    """把一次计算的结果转换为缓存条目，摆放结果以压缩的列式二进制（base64）保存"""
+    data = zlib.compress(as_placements(placed_items).encode())
+    return {'placements': base64.b64encode(data).decode('ascii'), 'strategy': strategy, 'time_ms': time_ms}
+
+
+def decode_result(entry):
+    """encode_result 的逆过程，返回 (ItemBatch, 策略名称, 耗时毫秒)"""
+    placed_items = ItemBatch.decode(zlib.decompress(base64.b64decode(entry['placements'])))
+    return placed_items, entry['strategy'], entry['time_ms']
+
+
+def _remember(key, result):
+    with _lock:
+        _entries[key] = (time.monotonic() + settings.PLACEMENT_CACHE_TTL, result)
+        _entries.move_to_end(key)
+        while len(_entries) > settings.PLACEMENT_CACHE_SIZE:
+            _entries.popitem(last=False)
+
+
+def get(key):
+    """
+    查找缓存的结果，未命中时返回 None
+
+    先查本进程的 LRU，再查数据库；数据库命中的结果放入 LRU。
+    """
+    if not settings.PLACEMENT_CACHE_ENABLED:
+        return None
+    now = time.monotonic()
+    with _lock:
+        entry = _entries.get(key)
+        if entry is not None:
+            if entry[0] > now:
+                _entries.move_to_end(key)
+                _stats['memory_hits'] += 1
+                return entry[1]
+            del _entries[key]
+
+    oldest = timezone.now() - timedelta(seconds=settings.PLACEMENT_CACHE_TTL)
+    row = PlacementCache.objects.filter(key=key, created_at__gte=oldest).values_list('result', flat=True).first()
+    if row is None:
+        with _lock:
+            _stats['misses'] += 1
+        return None
+    PlacementCache.objects.filter(key=key).update(hits=F('hits') + 1)
+    _remember(key, row)
+    with _lock:
+        _stats['db_hits'] += 1
+    return row
+
+
+def put(key, result, version=None):
+    """保存计算结果到 LRU 和数据库；version 与计算缓存键时使用的算法版本相同"""
+    if not settings.PLACEMENT_CACHE_ENABLED:
+        return
+    _remember(key, result)
+    PlacementCache.objects.update_or_create(
+        key=key, defaults={'algorithm_version': version or algorithm_version(), 'result': result,
+                           'hits': 0, 'created_at': timezone.now()})
+
+
+def invalidate():
+    """
+    清空本进程的 LRU，并删除数据库中其他算法版本及过期的缓存
+
+    指定内置引擎计算的结果以引擎参数（见 loader.engine_ref）作为版本保存，与激活的
+    算法无关，切换算法时保留，只在过期后删除。
+    """
+    with _lock:
+        _entries.clear()
+    oldest = timezone.now() - timedelta(seconds=settings.PLACEMENT_CACHE_TTL)
+    engine_rows = Q()
+    for engine in ENGINES:
+        engine_rows |= Q(algorithm_version=engine) | Q(algorithm_version__startswith=f'{engine}:')
+    PlacementCache.objects.exclude(engine_rows).exclude(algorithm_version=algorithm_version()).delete()
+    PlacementCache.objects.filter(created_at__lt=oldest).delete()
+
+
+def stats():
+    """本进程的命中/未命中计数，以及数据库中的缓存条数和累计命中次数"""
+    with _lock:
+        counters = dict(_stats)
+        counters['memory_entries'] = len(_entries)
+    lookups = counters['memory_hits'] + counters['db_hits'] + counters['misses']
+    counters['hit_rate'] = (counters['memory_hits'] + counters['db_hits']) / lookups if lookups else None
+    version = algorithm_version()
+    rows = PlacementCache.objects.filter(algorithm_version=version)
+    counters['algorithm_version'] = version
+    counters['db_entries'] = rows.count()
+    counters['db_total_hits'] = rows.aggregate(total=Sum('hits'))['total'] or 0
+    return counters
@@ -0,0 +1,126 @@
+# box_back/box_back/app/placements.py
+import itertools
+import zlib
+
+from django.conf import settings
+
+from .columnar import ROW_FIELDS, decode_rows, encode_rows, iter_decoded_rows
+from .packing.itembatch import as_placements
+from .models import Item
+
+STORAGE_ROWS = 'rows'
+STORAGE_BLOB = 'blob'
+
+# 保存摆放结果时会写入的任务字段
+PLACEMENT_FIELDS = ['placement_blob', 'placement_count', 'placement_volume']
+
+
+def pack_rows(rows):
+    """把物品行压缩为 blob；位置和尺寸用 float64 保存，读出的值与 Item 表完全相同"""
+    return zlib.compress(encode_rows(rows, float_type='d'), settings.PLACEMENT_BLOB_COMPRESSION)
+
+
+def blob_segments(blob):
+    """
+    逐段解压 placement_blob，每段是一份完整的列式二进制
+
+    追加物品时新的行单独压缩为一段接在已有的 blob 后面，已有的行不需要解码和重新压缩。
+    """
+    data = bytes(blob)
+    while data:
+        decompressor = zlib.decompressobj()
+        yield decompressor.decompress(data) + decompressor.flush()
+        data = decompressor.unused_data
+
+
+def unpack_rows(blob):
+    return [row for segment in blob_segments(blob) for row in decode_rows(segment)[1]]
+
+
+def attach_placements(task, placed_items):
+    """
+    按 PLACEMENT_STORAGE 把摆放结果挂到（可能尚未保存的）任务上
+
+    任务的物品数量和总体积总是写入 placement_count/placement_volume。
+    blob 存储时全部物品压缩写入 task.placement_blob，返回空列表；
+    rows 存储时返回待 bulk_create 的 Item 列表。由调用方保存任务。
+    placed_items 为 ItemBatch 或摆放结果字典的列表，blob 直接由 ItemBatch 的各列编码。
+    """
+    batch = as_placements(placed_items)
+    task.placement_count = len(batch)
+    task.placement_volume = batch.volume()
+    if settings.PLACEMENT_STORAGE == STORAGE_BLOB:
+        task.placement_blob = zlib.compress(batch.encode(), settings.PLACEMENT_BLOB_COMPRESSION)
+        return []
+    task.placement_blob = None
+    return [Item(task=task, **dict(zip(ROW_FIELDS, row))) for row in batch.rows()]
+
+
+def append_placements(task, placed_items):
+    """
+    把追加的摆放结果挂到任务上，保持任务原来的存储方式
+
+    更新 placement_count/placement_volume；blob 任务把新的行压缩为一段接在 placement_blob
+    后面（见 blob_segments），返回空列表，否则返回新物品待 bulk_create 的 Item 列表。
+    由调用方保存任务。
+    """
+    batch = as_placements(placed_items)
+    if task.placement_count is None or task.placement_volume is None:
+        # 较早的任务没有记录物品数量和总体积，由已有的行计算一次
+        rows = task_rows(task)
+        task.placement_count = len(rows)
+        task.placement_volume = sum(row[5] * row[6] * row[7] for row in rows)
+    task.placement_count += len(batch)
+    task.placement_volume += batch.volume()
+    if task.placement_blob is not None:
+        task.placement_blob = bytes(task.placement_blob) + zlib.compress(
+            batch.encode(), settings.PLACEMENT_BLOB_COMPRESSION)
+        task._placement_rows = None
+        return []
+    return [Item(task=task, **dict(zip(ROW_FIELDS, row))) for row in batch.rows()]
+
+
+def load_rows(tasks):
+    """
+    取出多个任务的物品行，返回 {task_id: [行, ...]}
+
+    blob 存储的任务在这里解码（每个任务只解码一次），其余任务的物品用一次查询取出。
+    """
+    result = {}
+    row_task_ids = []
+    for task in tasks:
+        cached = getattr(task, '_placement_rows', None)
+        if cached is not None:
+            result[task.id] = cached
+        elif task.placement_blob is not None:
+            task._placement_rows = result[task.id] = unpack_rows(task.placement_blob)
+        else:
+            row_task_ids.append(task.id)
+            result[task.id] = []
+    if row_task_ids:
+        queryset = (Item.objects.filter(task_id__in=row_task_ids)
+                    .order_by('task_id', 'id')
+                    .values_list('task_id', *ROW_FIELDS))
+        for row in queryset.iterator(chunk_size=settings.PACKING_ITEM_BATCH_SIZE * 4):
+            result[row[0]].append(row[1:])
+    return result
+
+
+def task_rows(task):
+    """单个任务的物品行"""
+    return load_rows([task])[task.id]
+
+
+def iter_task_rows(task, chunk_size=None):
+    """
+    逐行读取任务的物品，内存占用与物品数量无关（blob 任务为解压后的列数据）
+
+    Item 行用 .iterator(chunk_size) 分块从数据库读取。
+    """
+    if task.placement_blob is not None:
+        return itertools.chain.from_iterable(iter_decoded_rows(segment)[1]
+                                             for segment in blob_segments(task.placement_blob))
+    return (Item.objects.filter(task_id=task.id)
+            .order_by('id')
+            .values_list(*ROW_FIELDS)
+            .iterator(chunk_size=chunk_size or settings.TASK_STREAM_CHUNK_SIZE))
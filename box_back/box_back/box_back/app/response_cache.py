@@ -0,0 +1,107 @@
+# box_back/box_back/app/response_cache.py
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Item, Task
+
+_lock = threading.Lock()
+# (task_id, variant) -> (过期时间, CachedResponse)
+_entries = OrderedDict()
+_size = 0
+
+
+class CachedResponse:
+    """渲染好的响应：正文字节及需要原样返回的响应头"""
+    __slots__ = ('etag', 'body', 'headers')
+
+    def __init__(self, etag, body, headers):
+        self.etag = etag
+        self.body = body
+        self.headers = headers
+
+
+def task_etag(task, variant):
+    """
+    任务某种表示（variant：格式、视图、字段、压缩）的强 ETag
+
+    由任务 id、修订号和计算摆放的算法版本（packing_version）得出；任务被修改时 revision
+    递增，ETag 随之变化。之后激活其他版本不影响已有任务的 ETag。
+    """
+    return revision_etag(task.id, task.revision, task.packing_version, variant)
+
+
+def revision_etag(task_id, revision, packing_version, variant):
+    """与 task_etag 相同，只需要任务 id、修订号和算法版本"""
+    source = f"{task_id}:{revision}:{packing_version}:{variant!r}"
+    return '"%s"' % hashlib.sha256(source.encode('utf-8')).hexdigest()[:32]
+
+
+def current_etag(task_id, variant):
+    """
+    按数据库中任务当前的修订号计算 ETag，只查询 revision 和 packing_version 两列；任务不存在或未完成时返回 None
+
+    缓存的响应只有 ETag 与之相同时才能使用，其他进程修改任务后不会返回过期的内容。
+    """
+    row = (Task.objects.filter(pk=task_id, status=Task.STATUS_DONE)
+           .values_list('revision', 'packing_version').first())
+    return None if row is None else revision_etag(task_id, *row, variant)
+
+
+def get(task_id, variant):
+    if settings.TASK_RESPONSE_CACHE_BYTES <= 0:
+        return None
+    with _lock:
+        entry = _entries.get((task_id, variant))
+        if entry is None:
+            return None
+        if entry[0] <= time.monotonic():
+            _discard((task_id, variant))
+            return None
+        _entries.move_to_end((task_id, variant))
+        return entry[1]
+
+
+def put(task_id, variant, cached):
+    """保存渲染好的响应；单个响应超过容量的四分之一时不缓存"""
+    global _size
+    limit = settings.TASK_RESPONSE_CACHE_BYTES
+    if len(cached.body) > limit // 4:
+        return
+    with _lock:
+        _discard((task_id, variant))
+        _entries[(task_id, variant)] = (time.monotonic() + settings.TASK_RESPONSE_CACHE_TTL, cached)
+        _size += len(cached.body)
+        while _size > limit:
+            _discard(next(iter(_entries)))
+
+
+def _discard(key):
+    global _size
+    entry = _entries.pop(key, None)
+    if entry is not None:
+        _size -= len(entry[1].body)
+
+
+def invalidate(task_id):
+    """删除任务所有表示的缓存"""
+    with _lock:
+        for key in [key for key in _entries if key[0] == task_id]:
+            _discard(key)
+
+
+# 本进程内修改任务或其物品时立即释放；其他进程修改的任务由 current_etag 发现修订号变化，
+# 不会命中旧的缓存
+@receiver([post_save, post_delete], sender=Task)
+def _task_changed(sender, instance, **kwargs):
+    invalidate(instance.pk)
+
+
+@receiver([post_save, post_delete], sender=Item)
+def _item_changed(sender, instance, **kwargs):
+    invalidate(instance.task_id)
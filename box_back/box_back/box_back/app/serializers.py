@@ -1,5 +1,8 @@
+from django.conf import settings
+from django.db import models
 from rest_framework import serializers
-from .models import User, Task, Item
+from .models import User, Task, Item, AlgorithmVersion
+from .placements import load_rows, task_rows
 
 class UserRegistrationSerializer(serializers.ModelSerializer):
     password = serializers.CharField(write_only=True)
@@ -39,6 +42,40 @@ class ItemSerializer(serializers.ModelSerializer):
     def get_dimensions(self, obj):
         return obj.dimensions
 
+# 快速输出物品：直接从物品行（values_list 元组或解码后的 blob）构造与 ItemSerializer 相同的字典
+def item_row_to_dict(row):
+    order_id, name, x, y, z, width, height, depth, face_up, fragile = row
+    return {
+        'order_id': order_id,
+        'name': name,
+        'position': {'x': x, 'y': y, 'z': z},
+        'dimensions': {'x': width, 'y': height, 'z': depth},
+        'face_up': face_up,
+        'fragile': fragile,
+    }
+
+class ItemRowsField(serializers.ListField):
+    """
+    任务的物品列表，输出与 ItemSerializer(many=True) 相同
+
+    不经过 ItemSerializer 的逐字段处理；TaskListSerializer 会预先为整页
+    任务一次取出物品，单个任务时在这里读取。blob 存储的任务只在这里解码。
+    """
+    def __init__(self, **kwargs):
+        super().__init__(child=ItemSerializer(), source='*', read_only=True, **kwargs)
+
+    def to_representation(self, task):
+        return [item_row_to_dict(row) for row in task_rows(task)]
+
+class TaskListSerializer(serializers.ListSerializer):
+    def to_representation(self, data):
+        tasks = list(data.all() if isinstance(data, models.manager.BaseManager) else data)
+        if 'items' in self.child.fields and tasks:
+            rows = load_rows(tasks)
+            for task in tasks:
+                task._placement_rows = rows[task.id]
+        return super().to_representation(tasks)
+
 # 存储用序列化器
 class ItemCreateSerializer(serializers.ModelSerializer):
     position = serializers.DictField()
@@ -81,17 +118,76 @@ class TaskInputSerializer(serializers.Serializer):
     worker_id = serializers.IntegerField(required=False, allow_null=True)
     space_info = serializers.DictField()
     items = ItemInputSerializer(many=True)
+    # 组合模式：并行运行多种策略，取容积利用率最高的结果
+    portfolio = serializers.BooleanField(default=False)
+    # 计算时间预算（毫秒），有剩余时间时用于继续改进摆放结果
+    time_budget_ms = serializers.IntegerField(required=False, allow_null=True, min_value=1)
+    # 异步模式：立即返回任务 id，由后台进程计算摆放
+    run_async = serializers.BooleanField(default=False)
+    # 多容器模式：放不下的物品装进新打开的容器，而不是摆在容器外
+    multi_container = serializers.BooleanField(default=False)
+    # 新打开容器的尺寸，依次使用，用完后重复最后一个；默认与 space_info 相同
+    container_sizes = serializers.ListField(child=serializers.DictField(), required=False, allow_empty=False)
+    # 摆放引擎：place_items 为当前激活的算法版本，其余为内置引擎
+    engine = serializers.ChoiceField(choices=['place_items', 'extreme_point', 'heightmap'], default='place_items')
+    # heightmap 引擎的网格边长，默认按容器底面自动选择
+    heightmap_resolution = serializers.FloatField(required=False, allow_null=True)
+
+    def validate_container_sizes(self, value):
+        for size in value:
+            try:
+                if any(float(size[axis]) <= 0 for axis in 'xyz'):
+                    raise ValueError
+            except (KeyError, TypeError, ValueError):
+                raise serializers.ValidationError("Each container size needs positive x, y and z.")
+        return value
+
+    def validate_heightmap_resolution(self, value):
+        if value is not None and value <= 0:
+            raise serializers.ValidationError("heightmap_resolution must be positive.")
+        return value
+
+    def validate(self, data):
+        if data['multi_container'] and data['portfolio']:
+            raise serializers.ValidationError("multi_container cannot be combined with portfolio.")
+        if data['engine'] != 'place_items' and data['portfolio']:
+            raise serializers.ValidationError("engine cannot be combined with portfolio.")
+        return data
+
+# 批量创建任务的输入，每一项按 TaskInputSerializer 单独验证
+class TaskBatchInputSerializer(serializers.Serializer):
+    tasks = serializers.ListField(child=serializers.DictField(), allow_empty=False)
+
+    def validate_tasks(self, value):
+        limit = settings.PACKING_BATCH_MAX_TASKS
+        if len(value) > limit:
+            raise serializers.ValidationError(f"Ensure this field has no more than {limit} elements.")
+        return value
+
+# 向已完成的任务追加物品
+class TaskAppendInputSerializer(serializers.Serializer):
+    items = ItemInputSerializer(many=True, allow_empty=False)
+
+# 支持只输出部分字段（?fields=id,creator），未请求的字段不会被计算
+class SparseFieldsMixin:
+    def __init__(self, *args, **kwargs):
+        fields = kwargs.pop('fields', None)
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
 
 # 输出完整任务序列化器
-class TaskSerializer(serializers.ModelSerializer):
+class TaskSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     creator = serializers.SerializerMethodField()
     worker = serializers.SerializerMethodField()
     space_info = serializers.SerializerMethodField()
-    items = ItemSerializer(many=True, read_only=True)
+    items = ItemRowsField()
     
     class Meta:
         model = Task
         fields = ['id', 'creator', 'worker', 'space_info', 'items', 'created_at']
+        list_serializer_class = TaskListSerializer
     
     def get_creator(self, obj):
         return {
@@ -112,4 +208,59 @@ class TaskSerializer(serializers.ModelSerializer):
             'x': obj.space_x,
             'y': obj.space_y,
             'z': obj.space_z
-        }
\ No newline at end of file
+        }
+
+# 任务概要序列化器：不含物品明细，物品数量和总体积由数据库聚合得到
+class TaskSummarySerializer(TaskSerializer):
+    item_count = serializers.IntegerField(read_only=True)
+    total_volume = serializers.FloatField(read_only=True)
+    
+    class Meta:
+        model = Task
+        fields = ['id', 'creator', 'worker', 'space_info', 'created_at', 'item_count', 'total_volume']
+
+# 多容器任务的容器概要
+def container_summary(task):
+    return {
+        'id': task.id,
+        'index': task.container_index,
+        'space_info': task.space_info,
+        'item_count': task.placement_count,
+        'utilization': task.utilization,
+    }
+
+def task_containers(task):
+    """多容器任务全部容器的概要（任务本身为第 0 个），单容器任务返回 None"""
+    children = list(Task.objects.filter(parent_id=task.id).order_by('container_index')
+                    .only('id', 'container_index', 'space_x', 'space_y', 'space_z', 'placement_count', 'utilization'))
+    if not children and task.utilization is None:
+        return None
+    return [container_summary(task)] + [container_summary(child) for child in children]
+
+# 异步任务状态序列化器
+class TaskStatusSerializer(serializers.ModelSerializer):
+    item_count = serializers.SerializerMethodField()
+    containers = serializers.SerializerMethodField()
+    
+    class Meta:
+        model = Task
+        fields = ['id', 'status', 'error', 'packing_strategy', 'packing_time_ms', 'packing_truncated', 'item_count',
+                  'containers', 'created_at', 'started_at', 'finished_at']
+    
+    def get_containers(self, obj):
+        if obj.status != Task.STATUS_DONE:
+            return None
+        return task_containers(obj)
+    
+    def get_item_count(self, obj):
+        if obj.status != Task.STATUS_DONE:
+            return None
+        if obj.placement_count is not None:
+            return obj.placement_count
+        return obj.items.count()
+
+# 算法版本序列化器（不含源码）
+class AlgorithmVersionSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = AlgorithmVersion
+        fields = ['id', 'name', 'sha256', 'created_at']
\ No newline at end of file
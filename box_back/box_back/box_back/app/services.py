@@ -0,0 +1,518 @@
+# box_back/box_back/app/services.py
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from . import placement_cache, shadow
+from .algorithms import active_version, algorithm_ref, source_sha256
+from .placements import PLACEMENT_FIELDS, append_placements, attach_placements, task_rows
+from .packing.batch import pack_many
+from .packing.benchmark import QUICK_SIZES, compare, run_suite, suite_cases
+from .packing.incremental import AppendState, decode_state, encode_state, run_extend
+from .packing.itembatch import as_batch, as_placements
+from .packing.loader import check_algorithm, engine_ref
+from .packing.metrics import volume_utilization
+from .packing.multi import pack_containers
+from .packing.portfolio import run_portfolio
+from .packing.sandbox import get_pool
+from .packing.verify import PlacementError, verify_extension, verify_placement
+from .models import Item, Task, User
+
+logger = logging.getLogger(__name__)
+
+# 多容器任务的 packing_strategy
+MULTI_CONTAINER_STRATEGY = 'multi_container'
+
+_job_executor = None
+_job_executor_lock = threading.Lock()
+
+
+def packing_pool():
+    """
+    本进程运行装箱算法的 sandbox 子进程池，PACKING_PORTFOLIO_WORKERS 为 0 时返回 None
+
+    返回 None 时算法在当前进程中运行，只应在开发和调试时使用。
+    """
+    if settings.PACKING_PORTFOLIO_WORKERS <= 0:
+        return None
+    return get_pool(settings.PACKING_PORTFOLIO_WORKERS,
+                    timeout=settings.PACKING_TIMEOUT_S,
+                    memory_mb=settings.PACKING_MEMORY_LIMIT_MB,
+                    cpu_seconds=settings.PACKING_CPU_LIMIT_S,
+                    max_calls=settings.PACKING_WORKER_MAX_CALLS)
+
+
+def check_placement(items_data, placed_items, space_data):
+    """PLACEMENT_VERIFY 打开时校验算法返回的摆放结果，违反约束时抛出 PlacementError"""
+    if settings.PLACEMENT_VERIFY:
+        verify_placement(items_data, placed_items, space_data)
+
+
+def request_algorithm(engine=None, resolution=None):
+    """
+    请求选择的引擎，返回 (ActiveVersion, algorithm 参数, 缓存键使用的版本)
+
+    engine 为空或 place_items 时使用当前激活的版本；否则为 packing.loader.ENGINES
+    中的内置引擎，resolution 只用于 heightmap。
+    """
+    version = active_version()
+    if not engine or engine == 'place_items':
+        return version, algorithm_ref(version), version.sha256
+    ref = engine_ref(engine, resolution if engine == 'heightmap' else None)
+    return version, ref, ref
+
+
+def compute_placement(items_data, space_data, portfolio=False, time_budget_ms=None, engine=None,
+                      resolution=None):
+    """
+    计算物品摆放，返回 (placed_items, 策略名称, 耗时毫秒, 是否到期截断, 算法版本)
+
+    算法在 sandbox 子进程池中运行，超时或子进程崩溃时抛出 PackingTimeout/WorkerCrashed。
+    portfolio 为 True 时并行运行多种策略，取容积利用率最高者；否则调用当前激活版本的
+    place_items，或 engine 指定的内置引擎（见 request_algorithm）。给定 time_budget_ms 时，
+    组合模式只比较时限内完成的策略，普通模式则用剩余的时间做局部搜索改进结果；计算到了
+    截止时间时返回的是已经放置的部分或尚未收敛的结果，第四项为 True（见 pack_single）。
+
+    新计算的结果先经过 check_placement 校验（组合模式由 run_portfolio 校验每个策略），
+    违反约束时抛出 PlacementError，不会被缓存或保存。
+    相同的输入和算法版本直接返回缓存的结果，耗时为查找缓存所用的时间；只缓存没有被截断的
+    结果，被截断的结果取决于当时的机器负载，再次计算可能更好。
+    激活版本在普通模式下新计算的结果按抽样比例交给影子运行的候选版本比较（见 shadow）。
+    算法版本为缓存键使用的版本（见 request_algorithm），保存到任务的 packing_version 上。
+
+    物品在这里转换为 ItemBatch，之后的计算、校验、缓存都直接使用各列；返回的 placed_items
+    也是 ItemBatch，可以直接交给 create_items 等函数保存。
+    """
+    items = as_batch(items_data)
+    version, algorithm, cache_version = request_algorithm(None if portfolio else engine, resolution)
+    key, cached = lookup_placement(items, space_data, portfolio, time_budget_ms, cache_version)
+    if cached is not None:
+        return cached
+    if portfolio:
+        result = run_portfolio(items, space_data, pool=packing_pool(),
+                               timeout_ms=time_budget_ms, algorithm=algorithm)
+        outcome = (as_placements(result['items']), result['strategy'], result['time_ms'], result['truncated'])
+    else:
+        outcome, = pack_many([(items, space_data, time_budget_ms)], pool=packing_pool(), algorithm=algorithm)
+        if isinstance(outcome, Exception):
+            raise outcome
+    return finish_placement(key, items, space_data, time_budget_ms, version, cache_version, outcome, portfolio)
+
+
+def lookup_placement(items, space_data, portfolio, time_budget_ms, cache_version):
+    """
+    查摆放缓存，返回 (缓存键, 命中时与 compute_placement 相同的结果，未命中时为 None)
+
+    命中时的耗时为查找缓存所用的时间；缓存键之后交给 finish_placement 保存新计算的结果。
+    """
+    start = time.perf_counter()
+    key = placement_cache.placement_key(items, space_data, portfolio, time_budget_ms, cache_version)
+    cached = placement_cache.get(key)
+    if cached is None:
+        return key, None
+    placed_items, strategy, _ = placement_cache.decode_result(cached)
+    return key, (placed_items, strategy, (time.perf_counter() - start) * 1000, False, cache_version)
+
+
+def finish_placement(key, items, space_data, time_budget_ms, version, cache_version, outcome, portfolio=False):
+    """
+    处理新计算的摆放 outcome（pack_single 的结果），返回与 compute_placement 相同的结果
+
+    结果先经过 check_placement 校验（组合模式已由 run_portfolio 校验每个策略），违反约束时
+    抛出 PlacementError；激活版本在普通模式下的结果按抽样比例交给影子运行，没有被截断的
+    结果写入摆放缓存。version 和 cache_version 为 request_algorithm 返回的版本。
+    """
+    placed_items, strategy, time_ms, truncated = outcome
+    if not portfolio:
+        check_placement(items, placed_items, space_data)
+        if cache_version == version.sha256:
+            shadow.maybe_shadow(items, space_data, time_budget_ms, version, placed_items, time_ms)
+    if not truncated:
+        placement_cache.put(key, placement_cache.encode_result(placed_items, strategy, time_ms), cache_version)
+    return placed_items, strategy, time_ms, truncated, cache_version
+
+
+def compute_containers(items_data, space_data, container_sizes=None, time_budget_ms=None, engine=None,
+                       resolution=None):
+    """
+    多容器模式的摆放计算，返回 ([(容器尺寸, 摆放结果), ...], 耗时毫秒, 算法版本)
+
+    第一个容器为 space_data，之后的容器依次使用 container_sizes（默认与 space_data 相同），
+    最多 PACKING_MAX_CONTAINERS 个，分配方式见 packing.multi。每个容器在 sandbox 子进程池中
+    计算，用当前激活版本的 place_items 或 engine 指定的内置引擎；每个容器的结果都经过
+    check_placement 校验。结果不缓存，也不做影子运行。
+    """
+    start = time.perf_counter()
+    sizes = [{axis: float(size[axis]) for axis in 'xyz'} for size in [space_data] + list(container_sizes or [])]
+    _, algorithm, cache_version = request_algorithm(engine, resolution)
+    containers = pack_containers(items_data, sizes, pool=packing_pool(), algorithm=algorithm,
+                                 time_budget_ms=time_budget_ms,
+                                 max_containers=settings.PACKING_MAX_CONTAINERS,
+                                 check=check_placement)
+    return containers, (time.perf_counter() - start) * 1000, cache_version
+
+
+def check_uploaded_algorithm(source):
+    """在 sandbox 子进程中编译上传的算法并检查 place_items，返回错误信息或 None"""
+    pool = packing_pool()
+    if pool is None:
+        return check_algorithm(source)
+    return pool.submit(check_algorithm, source).result()
+
+
+def benchmark_uploaded_algorithm(source):
+    """
+    在小规模基准套件上比较上传的算法与当前激活的版本，返回 (退化原因列表, 结果)
+
+    两个版本都在 sandbox 子进程池中运行；退化的判断标准见 packing.benchmark.compare，
+    阈值为 ALGORITHM_BENCH_MAX_SLOWDOWN 和 ALGORITHM_BENCH_MAX_UTILIZATION_DROP。
+    """
+    pool = packing_pool()
+    cases = suite_cases(sizes=QUICK_SIZES)
+    baseline = run_suite(cases, pool, algorithm_ref(active_version()))
+    candidate = run_suite(cases, pool, (source_sha256(source), source))
+    reasons = compare(candidate, baseline, settings.ALGORITHM_BENCH_MAX_SLOWDOWN,
+                      settings.ALGORITHM_BENCH_MAX_UTILIZATION_DROP)
+    return reasons, {'candidate': candidate, 'active': baseline}
+
+
+def build_item(task, item_data):
+    """由一条摆放结果构造（未保存的）Item"""
+    return Item(
+        task=task,
+        order_id=item_data['order_id'],
+        name=item_data['name'],
+        position_x=item_data['position']['x'],
+        position_y=item_data['position']['y'],
+        position_z=item_data['position']['z'],
+        width=item_data['dimensions']['x'],
+        height=item_data['dimensions']['y'],
+        depth=item_data['dimensions']['z'],
+        face_up=item_data.get('face_up', False),
+        fragile=item_data.get('fragile', False)
+    )
+
+
+def create_items(task, placed_items, batch_size=None):
+    """
+    把算法返回的摆放结果保存到已存在的任务上
+
+    按 PLACEMENT_STORAGE 写入任务的 placement_blob，或按 PACKING_ITEM_BATCH_SIZE
+    分批 bulk_create 物品；调用方负责把它和任务的创建放进同一个事务。
+    """
+    items = attach_placements(task, placed_items)
+    task.save(update_fields=PLACEMENT_FIELDS)
+    Item.objects.bulk_create(items, batch_size=batch_size or settings.PACKING_ITEM_BATCH_SIZE)
+
+
+def save_containers(task, containers):
+    """
+    把 compute_containers 的结果保存到任务及其子任务上，调用方负责事务
+
+    第一个容器的摆放结果写入 task（可以尚未保存）；其余容器各保存为一个 parent 为 task 的
+    子任务，创建者、工人、策略、耗时和算法版本与 task 相同。每个容器记录自己的容积利用率。
+    """
+    space, placed_items = containers[0]
+    items = attach_placements(task, placed_items)
+    task.utilization = volume_utilization(placed_items, space)
+    if task.pk is None:
+        task.save()
+    else:
+        task.save(update_fields=PLACEMENT_FIELDS + ['utilization'])
+    children = []
+    for index, (space, placed_items) in enumerate(containers[1:], 1):
+        child = Task(creator_id=task.creator_id, worker_id=task.worker_id, parent=task, container_index=index,
+                     space_x=space['x'], space_y=space['y'], space_z=space['z'],
+                     packing_strategy=task.packing_strategy, packing_time_ms=task.packing_time_ms,
+                     packing_version=task.packing_version, utilization=volume_utilization(placed_items, space))
+        items.extend(attach_placements(child, placed_items))
+        children.append(child)
+    Task.objects.bulk_create(children, batch_size=settings.PACKING_ITEM_BATCH_SIZE)
+    Item.objects.bulk_create(items, batch_size=settings.PACKING_ITEM_BATCH_SIZE)
+
+
+def create_task_with_containers(containers, **task_fields):
+    """在一个事务中创建多容器任务及其子任务"""
+    with transaction.atomic():
+        task = Task(**task_fields)
+        save_containers(task, containers)
+    return task
+
+
+def create_task_with_items(placed_items, **task_fields):
+    """在一个事务中创建任务并保存全部物品，任何一步失败都不会留下任务"""
+    with transaction.atomic():
+        task = Task(**task_fields)
+        items = attach_placements(task, placed_items)
+        task.save()
+        Item.objects.bulk_create(items, batch_size=settings.PACKING_ITEM_BATCH_SIZE)
+    return task
+
+
+def create_tasks(entries):
+    """
+    批量创建任务，返回与 entries 顺序一致的结果列表
+
+    entries 中每一项是 TaskInputSerializer 验证后的数据，或验证失败时的
+    {'errors': ...}。所有用户用一次查询取出；普通任务（激活版本或内置引擎）先查摆放缓存，未命中的按算法分组，
+    每组在 sandbox 子进程池中并行计算，
+    组合模式的任务自身已经并行，多容器模式的容器需要逐个装满，这两类任务依次计算。计算成功的任务和全部物品在
+    一个事务中批量写入。每项结果包含 index、status（created、accepted、
+    error）以及 id 或 code/error。
+    """
+    results = [None] * len(entries)
+    user_ids = set()
+    for data in entries:
+        if 'errors' not in data:
+            user_ids.add(data['creator_id'])
+            if data.get('worker_id'):
+                user_ids.add(data['worker_id'])
+    users = User.objects.in_bulk(user_ids)
+
+    def fail(index, code, error):
+        results[index] = {'index': index, 'status': 'error', 'code': code, 'error': error}
+
+    ready = []
+    for index, data in enumerate(entries):
+        if 'errors' in data:
+            fail(index, 400, data['errors'])
+            continue
+        creator = users.get(data['creator_id'])
+        if creator is None:
+            fail(index, 404, "Creator not found")
+            continue
+        worker = None
+        if data.get('worker_id'):
+            worker = users.get(data['worker_id'])
+            if worker is None:
+                fail(index, 404, "Worker not found")
+                continue
+        ready.append((index, data, creator, worker))
+
+    # 计算摆放，缓存中已有的结果不再计算；未命中的按算法（激活版本或内置引擎）分组并行计算
+    packed = {}
+    groups = {}
+    for index, data, _, _ in ready:
+        if data['run_async'] or data['portfolio'] or data['multi_container']:
+            continue
+        items = as_batch(data['items'])
+        version, algorithm, cache_version = request_algorithm(data['engine'], data.get('heightmap_resolution'))
+        key, packed[index] = lookup_placement(items, data['space_info'], False, data.get('time_budget_ms'),
+                                              cache_version)
+        if packed[index] is None:
+            groups.setdefault(algorithm, []).append((index, key, items, data, version, cache_version))
+    for algorithm, group in groups.items():
+        outcomes = pack_many(
+            [(items, data['space_info'], data.get('time_budget_ms')) for _, _, items, data, _, _ in group],
+            pool=packing_pool(), algorithm=algorithm)
+        for (index, key, items, data, version, cache_version), outcome in zip(group, outcomes):
+            if not isinstance(outcome, Exception):
+                try:
+                    outcome = finish_placement(key, items, data['space_info'], data.get('time_budget_ms'),
+                                               version, cache_version, outcome)
+                except PlacementError as e:
+                    outcome = e
+            packed[index] = outcome
+    for index, data, _, _ in ready:
+        if data['run_async'] or index in packed:
+            continue
+        try:
+            if data['multi_container']:
+                # 各容器依次在子进程池中计算
+                containers, time_ms, ref = compute_containers(
+                    data['items'], data['space_info'], data.get('container_sizes'), data.get('time_budget_ms'),
+                    engine=data['engine'], resolution=data.get('heightmap_resolution'))
+                packed[index] = (containers, MULTI_CONTAINER_STRATEGY, time_ms, False, ref)
+            else:
+                packed[index] = compute_placement(
+                    data['items'], data['space_info'], portfolio=data['portfolio'],
+                    time_budget_ms=data.get('time_budget_ms'),
+                    engine=data['engine'], resolution=data.get('heightmap_resolution'))
+        except Exception as e:
+            packed[index] = e
+
+    # 批量写入任务和物品
+    tasks = []
+    placements = []
+    items = []
+    for index, data, creator, worker in ready:
+        space_data = data['space_info']
+        task = Task(creator=creator, worker=worker,
+                    space_x=space_data['x'], space_y=space_data['y'], space_z=space_data['z'])
+        if data['run_async']:
+            task.status = Task.STATUS_PENDING
+            task.input_data = build_job_input(data)
+            placed_items = None
+        else:
+            outcome = packed[index]
+            if isinstance(outcome, Exception):
+                logger.error("Packing task %s of batch failed: %s", index, outcome)
+                fail(index, 500, str(outcome))
+                continue
+            (placed_items, task.packing_strategy, task.packing_time_ms, task.packing_truncated,
+             task.packing_version) = outcome
+            if not data['multi_container']:
+                items.extend(attach_placements(task, placed_items))
+        tasks.append((index, task))
+        placements.append(placed_items)
+
+    with transaction.atomic():
+        Task.objects.bulk_create([task for _, task in tasks], batch_size=settings.PACKING_ITEM_BATCH_SIZE)
+        Item.objects.bulk_create(items, batch_size=settings.PACKING_ITEM_BATCH_SIZE)
+        for (index, task), placed_items in zip(tasks, placements):
+            if placed_items is None:
+                transaction.on_commit(lambda task_id=task.id: enqueue_task(task_id))
+                results[index] = {'index': index, 'status': 'accepted', 'id': task.id}
+                continue
+            results[index] = {'index': index, 'status': 'created', 'id': task.id,
+                              'item_count': len(placed_items),
+                              'packing_strategy': task.packing_strategy,
+                              'packing_time_ms': task.packing_time_ms}
+            if task.packing_strategy == MULTI_CONTAINER_STRATEGY:
+                # 此时 placed_items 为各容器的结果，子任务需要已保存的 task
+                save_containers(task, placed_items)
+                results[index]['item_count'] = sum(len(container[1]) for container in placed_items)
+                results[index]['container_count'] = len(placed_items)
+    return results
+
+
+class TaskNotReady(Exception):
+    """任务还没有计算完成（或已失败），不能追加物品"""
+
+
+class TaskConflict(Exception):
+    """追加物品期间任务已被其他请求修改（revision 已变化）"""
+
+
+def append_items(task_id, items_data):
+    """
+    把 items_data 追加到已完成的任务中，已放置的物品保持不动，返回 (任务, 新物品的摆放结果)
+
+    新物品用内置的极点引擎放进剩余空间（见 packing.incremental），放不下的物品摆在容器外。
+    任务上保存的追加状态（空间索引和极点）与当前 revision 对应时直接恢复，不读取已有的
+    物品行，否则由已有物品重建；校验只比较新物品与相邻的已有物品，blob 任务只追加新的行。
+    任务不存在时抛出 Task.DoesNotExist，未完成时抛出 TaskNotReady。
+
+    计算不持有锁（SQLite 上 select_for_update 不起作用），保存时按 revision 做比较并交换：
+    只有 revision 仍是读取时的值才递增并写入，否则说明同一任务的另一个追加先完成了，
+    抛出 TaskConflict，本次结果丢弃，由调用方重试。
+    """
+    task = Task.objects.get(pk=task_id)
+    if task.status != Task.STATUS_DONE:
+        raise TaskNotReady(f"Task {task_id} is {task.status}")
+    revision = task.revision
+    space_data = task.space_info
+    state = decode_state(task.packing_state, revision)
+    if state is None:
+        state = AppendState.from_rows(space_data, task_rows(task))
+    placed_items, points = run_extend(packing_pool(), space_data, state, items_data)
+    if settings.PLACEMENT_VERIFY:
+        verify_extension(items_data, placed_items, space_data, state.index, state.order_ids)
+    items = append_placements(task, placed_items)
+    state.add(space_data, placed_items, points)
+    task.revision = revision + 1
+    task.packing_state = encode_state(state, task.revision)
+    if task.utilization is not None:
+        task.utilization += volume_utilization(placed_items, space_data)
+    with transaction.atomic():
+        # 这条 UPDATE 同时取得写锁，之后的保存不会与其他追加交错
+        if not Task.objects.filter(pk=task_id, revision=revision, status=Task.STATUS_DONE).update(
+                revision=task.revision):
+            raise TaskConflict(f"Task {task_id} was modified by another request, retry the append")
+        task.save(update_fields=PLACEMENT_FIELDS + ['packing_state', 'utilization'])
+        Item.objects.bulk_create(items, batch_size=settings.PACKING_ITEM_BATCH_SIZE)
+    return task, placed_items
+
+
+def build_job_input(validated_data):
+    """从 TaskInputSerializer 的数据中取出异步计算需要的输入，转换为可存入 JSON 的形式"""
+    return {
+        'space_info': dict(validated_data['space_info']),
+        'items': [dict(item) for item in validated_data['items']],
+        'portfolio': validated_data.get('portfolio', False),
+        'time_budget_ms': validated_data.get('time_budget_ms'),
+        'multi_container': validated_data.get('multi_container', False),
+        'container_sizes': [dict(size) for size in validated_data.get('container_sizes') or []],
+        'engine': validated_data.get('engine', 'place_items'),
+        'heightmap_resolution': validated_data.get('heightmap_resolution'),
+    }
+
+
+def claim_task(task_id):
+    """把待处理的任务标记为运行中；任务已被其他进程领取时返回 False"""
+    return Task.objects.filter(pk=task_id, status=Task.STATUS_PENDING).update(
+        status=Task.STATUS_RUNNING, started_at=timezone.now()) == 1
+
+
+def run_task_job(task_id):
+    """
+    执行一个异步装箱任务：领取任务、计算摆放、保存物品并更新状态
+
+    任务已被领取时返回 False；计算或保存出错时任务标记为 failed 并记录错误信息。
+    """
+    if not claim_task(task_id):
+        return False
+    try:
+        task = Task.objects.get(pk=task_id)
+        data = task.input_data
+        if data.get('multi_container'):
+            containers, time_ms, ref = compute_containers(
+                data['items'], data['space_info'], data.get('container_sizes'), data.get('time_budget_ms'),
+                engine=data.get('engine'), resolution=data.get('heightmap_resolution'))
+            strategy, truncated = MULTI_CONTAINER_STRATEGY, False
+        else:
+            placed_items, strategy, time_ms, truncated, ref = compute_placement(
+                data['items'], data['space_info'],
+                portfolio=data.get('portfolio', False),
+                time_budget_ms=data.get('time_budget_ms'),
+                engine=data.get('engine'), resolution=data.get('heightmap_resolution'))
+        with transaction.atomic():
+            if data.get('multi_container'):
+                task.packing_strategy, task.packing_time_ms, task.packing_version = strategy, time_ms, ref
+                save_containers(task, containers)
+            else:
+                create_items(task, placed_items)
+            Task.objects.filter(pk=task_id).update(
+                revision=F('revision') + 1,
+                status=Task.STATUS_DONE,
+                packing_strategy=strategy,
+                packing_time_ms=time_ms,
+                packing_truncated=truncated,
+                packing_version=ref,
+                input_data=None,
+                finished_at=timezone.now())
+    except Exception as e:
+        logger.exception("Packing job for task %s failed", task_id)
+        Task.objects.filter(pk=task_id).update(
+            status=Task.STATUS_FAILED, error=str(e), finished_at=timezone.now())
+    return True
+
+
+def _run_job_in_thread(task_id):
+    try:
+        run_task_job(task_id)
+    finally:
+        # 后台线程各自持有数据库连接，用完即关闭
+        connection.close()
+
+
+def enqueue_task(task_id):
+    """
+    把待处理的任务交给本进程的后台线程池
+
+    PACKING_JOB_WORKERS 为 0 时不在 web 进程中计算，由 manage.py packing_worker 处理。
+    """
+    global _job_executor
+    if settings.PACKING_JOB_WORKERS <= 0:
+        return
+    with _job_executor_lock:
+        if _job_executor is None:
+            _job_executor = ThreadPoolExecutor(
+                max_workers=settings.PACKING_JOB_WORKERS, thread_name_prefix='packing-job')
+        _job_executor.submit(_run_job_in_thread, task_id)
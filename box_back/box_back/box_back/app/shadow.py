@@ -0,0 +1,118 @@
+# box_back/box_back/app/shadow.py
+"""
+候选算法的影子运行
+
+请求仍然返回激活版本的结果；按抽样比例把真实的 items_data/space_info 交给
+后台线程，在独立的 sandbox 子进程池中用候选版本再计算一次，把两者的耗时和
+容积利用率写入 ShadowComparison。后台积压超过 SHADOW_MAX_PENDING 时丢弃新的样本。
+"""
+import logging
+import math
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connection
+
+from .algorithms import shadow_version
+from .models import ShadowComparison
+from .packing.batch import pack_many
+from .packing.itembatch import as_batch
+from .packing.metrics import volume_utilization
+from .packing.sandbox import SandboxPool
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_state = {'executor': None, 'pool': None, 'pending': 0}
+
+
+def _executor():
+    with _lock:
+        if _state['executor'] is None:
+            _state['executor'] = ThreadPoolExecutor(max_workers=settings.SHADOW_WORKERS,
+                                                    thread_name_prefix='packing-shadow')
+            # 与处理请求的子进程池分开，影子运行不占用请求的计算能力
+            _state['pool'] = SandboxPool(settings.SHADOW_WORKERS,
+                                         timeout=settings.PACKING_TIMEOUT_S,
+                                         memory_mb=settings.PACKING_MEMORY_LIMIT_MB,
+                                         cpu_seconds=settings.PACKING_CPU_LIMIT_S,
+                                         max_calls=settings.PACKING_WORKER_MAX_CALLS)
+        return _state['executor']
+
+
+def maybe_shadow(items_data, space_data, time_budget_ms, version, placed_items, time_ms):
+    """
+    按抽样比例提交一次影子运行，提交时返回 True
+
+    version 为计算 placed_items 的激活版本（ActiveVersion），time_ms 为其耗时；
+    候选版本与激活版本相同时不比较。
+    """
+    candidate = shadow_version()
+    if candidate is None or candidate.sha256 == version.sha256 or random.random() >= candidate.sample_rate:
+        return False
+    with _lock:
+        if _state['pending'] >= settings.SHADOW_MAX_PENDING:
+            return False
+        _state['pending'] += 1
+    job = (as_batch(items_data), dict(space_data), time_budget_ms)
+    active = {'active_sha256': version.sha256, 'item_count': len(items_data), 'active_time_ms': time_ms,
+              'active_utilization': volume_utilization(placed_items, space_data)}
+    _executor().submit(_run, candidate, job, active)
+    return True
+
+
+def _run(candidate, job, active):
+    try:
+        outcome, = pack_many([job], pool=_state['pool'], algorithm=(candidate.sha256, candidate.source))
+        if isinstance(outcome, Exception):
+            result = {'error': f"{type(outcome).__name__}: {outcome}"}
+        else:
+            placed_items, _, time_ms, _ = outcome
+            result = {'candidate_time_ms': time_ms,
+                      'candidate_utilization': volume_utilization(placed_items, job[1])}
+        ShadowComparison.objects.create(candidate_id=candidate.version_id, **active, **result)
+    except Exception:
+        logger.exception("Shadow run of algorithm %s failed", candidate.version_id)
+    finally:
+        with _lock:
+            _state['pending'] -= 1
+        # 后台线程各自持有数据库连接，用完即关闭
+        connection.close()
+
+
+def _percentile(values, fraction):
+    """最近秩法的百分位数，values 已排序"""
+    if not values:
+        return None
+    return values[max(0, math.ceil(fraction * len(values)) - 1)]
+
+
+def summary(candidate_id):
+    """
+    候选版本全部比较结果的汇总
+
+    差值均为候选版本减去激活版本：runtime_delta_ms 为负表示更快，
+    utilization_delta 为正表示装得更满。
+    """
+    rows = list(ShadowComparison.objects.filter(candidate_id=candidate_id)
+                .values_list('active_time_ms', 'candidate_time_ms', 'active_utilization',
+                             'candidate_utilization'))
+    compared = [row for row in rows if row[1] is not None]
+    runtime = sorted(new - old for old, new, _, _ in compared)
+    utilization = sorted(new - old for _, _, old, new in compared)
+    return {
+        'version_id': candidate_id,
+        'samples': len(rows),
+        'errors': len(rows) - len(compared),
+        'runtime_delta_ms': {'p50': _percentile(runtime, 0.5), 'p95': _percentile(runtime, 0.95)},
+        'utilization_delta': {
+            'mean': sum(utilization) / len(utilization) if utilization else None,
+            'p5': _percentile(utilization, 0.05),
+            'p50': _percentile(utilization, 0.5),
+            'p95': _percentile(utilization, 0.95),
+        },
+        'faster_fraction': sum(1 for delta in runtime if delta < 0) / len(runtime) if runtime else None,
+        'fuller_fraction': sum(1 for delta in utilization if delta > 1e-9) / len(utilization) if utilization else None,
+    }
@@ -0,0 +1,53 @@
+# box_back/box_back/app/streaming.py
+import json
+from itertools import islice
+
+from django.conf import settings
+from rest_framework.renderers import JSONRenderer
+
+from .placements import iter_task_rows
+from .serializers import item_row_to_dict
+
+
+def _dumps(renderer):
+    """与 DRF JSONRenderer 相同的编码选项，输出逐字节一致"""
+    def dumps(value):
+        ret = json.dumps(value, cls=renderer.encoder_class, ensure_ascii=renderer.ensure_ascii,
+                         allow_nan=not renderer.strict, separators=(',', ':'))
+        return ret.replace('\u2028', '\\u2028').replace('\u2029', '\\u2029')
+    return dumps
+
+
+def stream_task_json(task, serializer_class, fields=None, chunk_size=None):
+    """
+    逐块生成任务的 JSON，内容与 serializer_class(task, fields=fields) 经 JSONRenderer 渲染的结果相同
+
+    除 items 外的字段先序列化；items 按 chunk_size 个物品一块编码输出，
+    任何时候内存中只有一块物品。
+    """
+    chunk_size = chunk_size or settings.TASK_STREAM_CHUNK_SIZE
+    dumps = _dumps(JSONRenderer())
+    names = list(fields or serializer_class.Meta.fields)
+    data = serializer_class(task, fields=[name for name in names if name != 'items']).data
+
+    separator = '{'
+    for name in serializer_class.Meta.fields:
+        if name not in names:
+            continue
+        if name != 'items':
+            yield f'{separator}{dumps(name)}:{dumps(data[name])}'.encode('utf-8')
+            separator = ','
+            continue
+        yield f'{separator}"items":['.encode('utf-8')
+        separator = ','
+        rows = iter_task_rows(task, chunk_size)
+        first = True
+        while True:
+            chunk = list(islice(rows, chunk_size))
+            if not chunk:
+                break
+            body = ','.join(dumps(item_row_to_dict(row)) for row in chunk)
+            yield (body if first else ',' + body).encode('utf-8')
+            first = False
+        yield b']'
+    yield b'}' if separator == ',' else b'{}'
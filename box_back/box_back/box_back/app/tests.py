@@ -0,0 +1,530 @@
+# box_back/box_back/app/tests.py
+import operator
+import os
+import random
+import time
+from unittest import mock
+
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from . import placement_cache, services
+from .algorithms import active_version, activate_version, algorithm_version, create_version
+from .models import PlacementCache, Task, User
+from .placements import task_rows
+from .packing.metrics import is_inside
+from .packing import portfolio, scoring
+from .packing.engine import pack_items
+from .packing.heightmap import pack_heightmap
+from .packing.multi import distribute, pack_containers
+from .packing.sandbox import PackingTimeout, SandboxPool, WorkerCrashed
+from .packing.verify import PlacementError, count_unsupported, verify_placement
+
+
+def _item(name, x, y, z, face_up=False, fragile=False):
+    return {'name': name, 'dimensions': {'x': x, 'y': y, 'z': z}, 'face_up': face_up, 'fragile': fragile}
+
+
+# 测试中算法在当前进程中运行，不启动子进程池和后台线程
+@override_settings(PACKING_PORTFOLIO_WORKERS=0, PACKING_JOB_WORKERS=0)
+class TaskJobTests(TestCase):
+    """异步任务的状态：pending -> running -> done / failed"""
+
+    def setUp(self):
+        self.user = User.objects.create(name='manager', password_hash='x', is_manager=True)
+
+    def _pending_task(self, items):
+        space = {'x': 10, 'y': 10, 'z': 10}
+        return Task.objects.create(
+            creator=self.user, space_x=space['x'], space_y=space['y'], space_z=space['z'],
+            status=Task.STATUS_PENDING,
+            input_data=services.build_job_input({'space_info': space, 'items': items}))
+
+    def test_claim_only_once(self):
+        task = self._pending_task([_item('a', 2, 2, 2)])
+        self.assertTrue(services.claim_task(task.id))
+        task.refresh_from_db()
+        self.assertEqual(task.status, Task.STATUS_RUNNING)
+        self.assertIsNotNone(task.started_at)
+        self.assertFalse(services.claim_task(task.id))
+
+    def test_job_done(self):
+        task = self._pending_task([_item('a', 2, 2, 2), _item('b', 3, 3, 3)])
+        self.assertTrue(services.run_task_job(task.id))
+        task.refresh_from_db()
+        self.assertEqual(task.status, Task.STATUS_DONE)
+        self.assertEqual(task.revision, 1)
+        self.assertIsNone(task.input_data)
+        self.assertIsNotNone(task.finished_at)
+        self.assertEqual(task.placement_count, 2)
+        self.assertEqual(task.packing_version, active_version().sha256)
+        # 已完成的任务不会再次运行
+        self.assertFalse(services.run_task_job(task.id))
+
+    def test_job_failed(self):
+        task = self._pending_task([{'name': 'broken', 'dimensions': {'x': 1}}])
+        with self.assertLogs(services.logger, 'ERROR'):
+            self.assertTrue(services.run_task_job(task.id))
+        task.refresh_from_db()
+        self.assertEqual(task.status, Task.STATUS_FAILED)
+        self.assertTrue(task.error)
+        self.assertIsNotNone(task.finished_at)
+
+
+def _placed(order_id, name, position, dimensions):
+    return {'order_id': order_id, 'name': name,
+            'position': dict(zip('xyz', position)), 'dimensions': dict(zip('xyz', dimensions)),
+            'face_up': False, 'fragile': False}
+
+
+class VerifyTests(SimpleTestCase):
+    """摆放结果的校验（packing.verify）"""
+
+    space = {'x': 10, 'y': 10, 'z': 10}
+
+    def test_accepts_valid_placement(self):
+        items = [_item('a', 4, 4, 4), _item('b', 4, 4, 4)]
+        placed = [_placed(1, 'a', (0, 0, 0), (4, 4, 4)), _placed(2, 'b', (4, 0, 0), (4, 4, 4))]
+        verify_placement(items, placed, self.space)
+        self.assertEqual(count_unsupported(placed, self.space), 0)
+
+    def test_rejects_overlap(self):
+        items = [_item('a', 4, 4, 4), _item('b', 4, 4, 4)]
+        placed = [_placed(1, 'a', (0, 0, 0), (4, 4, 4)), _placed(2, 'b', (3, 0, 3), (4, 4, 4))]
+        with self.assertRaises(PlacementError) as caught:
+            verify_placement(items, placed, self.space)
+        self.assertEqual(caught.exception.violations['overlap'], 1)
+        self.assertEqual(caught.exception.examples, [(1, 2)])
+
+    def test_counts_unsupported(self):
+        placed = [_placed(1, 'a', (0, 0, 0), (4, 4, 4)),
+                  # 只有四分之一的底面压在 a 上
+                  _placed(2, 'b', (2, 4, 2), (4, 4, 4)),
+                  # 悬空
+                  _placed(3, 'c', (6, 5, 6), (2, 2, 2))]
+        self.assertEqual(count_unsupported(placed, self.space), 2)
+        self.assertEqual(count_unsupported(placed, self.space, min_support=0.25), 1)
+
+
+def _above_fragile(placed_items, space_dimensions):
+    # 容器内底面高于易碎物品底面、水平投影与之相交的物品个数
+    inside = [item for item in placed_items if is_inside(item, space_dimensions)]
+    count = 0
+    for fragile in (item for item in inside if item['fragile']):
+        p, d = fragile['position'], fragile['dimensions']
+        count += sum(1 for item in inside if item is not fragile
+                     and item['position']['y'] > p['y']
+                     and item['position']['x'] < p['x'] + d['x'] and p['x'] < item['position']['x'] + item['dimensions']['x']
+                     and item['position']['z'] < p['z'] + d['z'] and p['z'] < item['position']['z'] + item['dimensions']['z'])
+    return count
+
+
+def _random_items(seed, count):
+    rng = random.Random(seed)
+    items = []
+    for i in range(count):
+        kind = rng.random()
+        items.append(_item(f'box-{i % 7}', rng.choice((1, 1.5, 2, 3)), rng.choice((1, 2, 2.5)), rng.choice((1, 2, 3)),
+                           face_up=kind < 0.2, fragile=0.2 <= kind < 0.3))
+    return items
+
+
+class EngineTests(SimpleTestCase):
+    """极点引擎的结果满足 place_items 的约束（packing.engine）"""
+
+    space = {'x': 10.0, 'y': 8.0, 'z': 9.0}
+
+    def test_invariants(self):
+        for seed in range(3):
+            items = _random_items(seed, 120)
+            for group_skus in (True, False):
+                with self.subTest(seed=seed, group_skus=group_skus):
+                    placed = pack_items(items, self.space, group_skus=group_skus)
+                    # 不重叠、在容器内或完整地位于容器外、尺寸与输入一致
+                    verify_placement(items, placed, self.space)
+                    self.assertEqual(count_unsupported(placed, self.space), 0)
+                    self.assertEqual(_above_fragile(placed, self.space), 0)
+                    self.assertGreater(sum(is_inside(item, self.space) for item in placed), len(items) // 2)
+
+    def test_face_up_keeps_height(self):
+        items = [_item('upright', 2, 5, 3, face_up=True) for _ in range(6)] + [_item('free', 2, 5, 3) for _ in range(6)]
+        space = {'x': 10.0, 'y': 4.0, 'z': 10.0}
+        placed = pack_items(items, space)
+        verify_placement(items, placed, space)
+        for item in placed:
+            if item['face_up']:
+                # 高度 5 超过容器，face_up 物品不能躺倒，只能放在容器外
+                self.assertEqual(item['dimensions']['y'], 5)
+                self.assertFalse(is_inside(item, space))
+            else:
+                self.assertTrue(is_inside(item, space))
+
+    def test_nothing_above_fragile(self):
+        items = [_item('glass', 4, 2, 4, fragile=True)] + [_item('box', 4, 2, 4) for _ in range(8)]
+        space = {'x': 4.0, 'y': 10.0, 'z': 8.0}
+        placed = pack_items(items, space)
+        verify_placement(items, placed, space)
+        self.assertEqual(_above_fragile(placed, space), 0)
+        glass = next(item for item in placed if item['fragile'])
+        self.assertTrue(is_inside(glass, space))
+
+    def test_overflow_along_x(self):
+        items = [_item('big', 6, 6, 6) for _ in range(4)]
+        placed = pack_items(items, self.space)
+        verify_placement(items, placed, self.space)
+        outside = [item for item in placed if not is_inside(item, self.space)]
+        self.assertEqual(len(outside), 3)
+        # 放不下的物品从容器的 X 边界开始沿 +X 依次排开
+        self.assertEqual([item['position'] for item in outside],
+                         [{'x': 10.0 + 6 * n, 'y': 0.0, 'z': 0.0} for n in range(3)])
+        self.assertEqual([item['order_id'] for item in placed], [1, 2, 3, 4])
+
+
+class ScoringTests(SimpleTestCase):
+    """向量化打分与纯 Python 实现的结果相同（packing.scoring）"""
+
+    def test_numpy_matches_python(self):
+        rng = random.Random(0)
+        space = (10.0, 10.0, 10.0)
+        # 坐标取在半格上，候选经常与已有物品贴合、部分重叠或压在易碎品上
+
+        def coord():
+            return rng.randrange(0, 18) / 2
+
+        def size():
+            return rng.randrange(1, 8) / 2
+
+        for case in range(300):
+            boxes = []
+            for _ in range(rng.randrange(0, 12)):
+                x, y, z = coord(), coord(), coord()
+                boxes.append((x, y, z, x + size(), y + size(), z + size()))
+            fragile = [rng.random() < 0.3 for _ in boxes]
+            rows = [(coord(), rng.choice((0.0, coord())), coord(), size(), size(), size())
+                    for _ in range(rng.randrange(1, 30))]
+            fragile_item = rng.random() < 0.3
+            args = (rows, space, boxes, fragile, 0.6, fragile_item)
+            expected = scoring._score_numpy(*args)
+            with self.subTest(case=case), mock.patch.object(scoring, 'np', None):
+                self.assertEqual(scoring.score_candidates(*args), expected)
+
+
+@override_settings(PACKING_PORTFOLIO_WORKERS=0, PACKING_JOB_WORKERS=0)
+class AppendItemsTests(TestCase):
+    """追加物品时按 revision 比较并交换"""
+
+    def setUp(self):
+        user = User.objects.create(name='manager', password_hash='x', is_manager=True)
+        self.task = services.create_task_with_items(
+            [_placed(1, 'a', (0, 0, 0), (4, 4, 4))], creator=user, space_x=10, space_y=10, space_z=10)
+
+    def test_append(self):
+        task, placed = services.append_items(self.task.id, [_item('b', 4, 4, 4)])
+        self.assertEqual(len(placed), 1)
+        self.assertEqual(placed[0]['order_id'], 2)
+        task.refresh_from_db()
+        self.assertEqual(task.revision, self.task.revision + 1)
+        self.assertEqual(task.placement_count, 2)
+
+    def test_conflict(self):
+        run_extend = services.run_extend
+
+        def concurrent_append(*args, **kwargs):
+            # 计算期间另一个追加先完成，revision 已经变化
+            result = run_extend(*args, **kwargs)
+            Task.objects.filter(pk=self.task.id).update(revision=self.task.revision + 1)
+            return result
+
+        with mock.patch.object(services, 'run_extend', concurrent_append):
+            with self.assertRaises(services.TaskConflict):
+                services.append_items(self.task.id, [_item('b', 4, 4, 4)])
+        task = Task.objects.get(pk=self.task.id)
+        self.assertEqual(task.revision, self.task.revision + 1)
+        self.assertEqual(task.placement_count, 1)
+        self.assertEqual(len(task_rows(task)), 1)
+
+
+
+@override_settings(PACKING_PORTFOLIO_WORKERS=0, PACKING_JOB_WORKERS=0)
+class TaskResponseCacheTests(TestCase):
+    """get_task 的响应缓存按数据库中的修订号使用"""
+
+    def setUp(self):
+        user = User.objects.create(name='manager', password_hash='x', is_manager=True)
+        self.task = services.create_task_with_items(
+            [_placed(1, 'a', (0, 0, 0), (4, 4, 4))], creator=user, space_x=10, space_y=10, space_z=10)
+        self.url = f'/api/tasks/{self.task.id}/'
+
+    def test_not_modified(self):
+        etag = self.client.get(self.url).headers['ETag']
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_revision_changed_elsewhere(self):
+        first = self.client.get(self.url)
+        # update 不发送 post_save，相当于另一个进程修改了任务
+        Task.objects.filter(pk=self.task.id).update(revision=self.task.revision + 1)
+        second = self.client.get(self.url, HTTP_IF_NONE_MATCH=first.headers['ETag'])
+        self.assertEqual(second.status_code, 200)
+        self.assertNotEqual(second.headers['ETag'], first.headers['ETag'])
+
+    def test_etag_uses_packing_version(self):
+        first = self.client.get(self.url).headers['ETag']
+        Task.objects.filter(pk=self.task.id).update(packing_version='heightmap')
+        self.assertNotEqual(self.client.get(self.url).headers['ETag'], first)
+
+
+@override_settings(PACKING_PORTFOLIO_WORKERS=0, PACKING_JOB_WORKERS=0)
+class CreateTasksTests(TestCase):
+    """批量创建任务时按算法分组计算，并使用摆放缓存"""
+
+    def setUp(self):
+        self.user = User.objects.create(name='manager', password_hash='x', is_manager=True)
+
+    def _entry(self, engine, count):
+        return {'creator_id': self.user.id, 'space_info': {'x': 10, 'y': 10, 'z': 10},
+                'items': [_item(f'box-{i}', 2, 2, 2) for i in range(count)],
+                'run_async': False, 'portfolio': False, 'multi_container': False, 'engine': engine}
+
+    def test_groups_by_engine(self):
+        entries = [self._entry('place_items', 2), self._entry('heightmap', 2), self._entry('heightmap', 3)]
+        with mock.patch.object(services, 'pack_many', wraps=services.pack_many) as pack_many:
+            results = services.create_tasks(entries)
+            self.assertEqual([result['status'] for result in results], ['created'] * 3)
+            calls = {call.kwargs['algorithm']: len(call.args[0]) for call in pack_many.call_args_list}
+            self.assertEqual(calls, {services.request_algorithm()[1]: 1, 'heightmap': 2})
+            # 相同的输入再次创建时直接使用缓存
+            results = services.create_tasks(entries)
+            self.assertEqual(pack_many.call_count, 2)
+        self.assertEqual([result['item_count'] for result in results], [2, 2, 3])
+        self.assertEqual(Task.objects.get(pk=results[1]['id']).packing_version, 'heightmap')
+
+class TaskListTests(TestCase):
+    """任务列表的查询数与任务数无关，游标分页不重复、不遗漏（get_user_tasks、get_worker_tasks）"""
+
+    def setUp(self):
+        self.manager = User.objects.create(name='manager', password_hash='x', is_manager=True)
+        self.worker = User.objects.create(name='worker', password_hash='x')
+
+    def _create(self, count):
+        for n in range(count):
+            services.create_task_with_items(
+                [_placed(i, f'box-{i}', (2 * i, 0, 0), (2, 2, 2)) for i in range(1, n % 3 + 2)],
+                creator=self.manager, worker=self.worker, space_x=10, space_y=10, space_z=10)
+
+    def _count_queries(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(queries), response.json()
+
+    def test_query_count_constant(self):
+        urls = [f'/api/users/{self.manager.id}/tasks/', f'/api/workers/{self.worker.id}/tasks/']
+        self._create(2)
+        counts = [self._count_queries(url)[0] for url in urls]
+        self._create(8)
+        for url, count in zip(urls, counts):
+            with self.subTest(url=url), self.assertNumQueries(count):
+                response = self.client.get(url)
+            self.assertEqual(len(response.json()['results']), 10)
+            self.assertTrue(all(task['items'] for task in response.json()['results']))
+
+    def test_cursor_walk(self):
+        self._create(7)
+        # 创建时间相同的任务按 id 排序
+        Task.objects.filter(id__in=Task.objects.order_by('id').values('id')[:4]).update(created_at=timezone.now())
+        seen = []
+        url = f'/api/workers/{self.worker.id}/tasks/?page_size=2'
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            seen.extend(task['id'] for task in response.json()['results'])
+            url = response.json()['next']
+        expected = list(Task.objects.order_by('-created_at', '-id').values_list('id', flat=True))
+        self.assertEqual(seen, expected)
+        self.assertEqual(len(set(seen)), 7)
+
+
+@override_settings(PACKING_PORTFOLIO_WORKERS=0, PACKING_JOB_WORKERS=0)
+class PlacementCacheTests(TestCase):
+    """摆放缓存的键、失效和计数（placement_cache）"""
+
+    space = {'x': 10, 'y': 10, 'z': 10}
+    items = [_item('a', 2, 2, 2), _item('b', 3, 1, 2, face_up=True), _item('c', 1, 1, 1, fragile=True)]
+
+    def setUp(self):
+        placement_cache._entries.clear()
+
+    def test_key_ignores_item_order(self):
+        key = placement_cache.placement_key(self.items, self.space)
+        self.assertEqual(placement_cache.placement_key(self.items[::-1], self.space), key)
+        # 尺寸统一为浮点数
+        as_floats = [dict(item, dimensions={axis: float(v) for axis, v in item['dimensions'].items()})
+                     for item in self.items]
+        self.assertEqual(placement_cache.placement_key(as_floats, self.space), key)
+        changed = self.items[:2] + [_item('c', 1, 1, 1)]
+        self.assertNotEqual(placement_cache.placement_key(changed, self.space), key)
+        self.assertNotEqual(placement_cache.placement_key(self.items, self.space, version='heightmap'), key)
+
+    def test_invalidate_keeps_engine_rows(self):
+        result = placement_cache.encode_result(pack_items(self.items, self.space), 'place_items', 1.0)
+        active_key = placement_cache.placement_key(self.items, self.space)
+        engine_key = placement_cache.placement_key(self.items, self.space, version='heightmap:0.5')
+        placement_cache.put(active_key, result)
+        placement_cache.put(engine_key, result, 'heightmap:0.5')
+
+        self.addCleanup(activate_version, None)
+        create_version('def place_items(items_data, space_dimensions):\n    return []\n', name='empty.py')
+        self.assertNotEqual(placement_cache.placement_key(self.items, self.space), active_key)
+        placement_cache.invalidate()
+        self.assertFalse(PlacementCache.objects.filter(key=active_key).exists())
+        self.assertIsNone(placement_cache.get(active_key))
+        self.assertIsNotNone(placement_cache.get(engine_key))
+
+    def test_truncated_result_not_stored(self):
+        def truncated(jobs, **kwargs):
+            return [outcome[:3] + (True,) for outcome in pack_many(jobs, **kwargs)]
+
+        pack_many = services.pack_many
+        with mock.patch.object(services, 'pack_many', side_effect=truncated) as patched:
+            for _ in range(2):
+                _, _, _, was_truncated, _ = services.compute_placement(self.items, self.space, time_budget_ms=50)
+                self.assertTrue(was_truncated)
+        self.assertEqual(patched.call_count, 2)
+        self.assertFalse(PlacementCache.objects.exists())
+
+    def test_counters(self):
+        before = placement_cache.stats()
+        first = services.compute_placement(self.items, self.space)
+        # 第二次命中本进程的 LRU，清空 LRU 后命中数据库
+        second = services.compute_placement(self.items[::-1], self.space)
+        placement_cache._entries.clear()
+        services.compute_placement(self.items, self.space)
+        after = placement_cache.stats()
+        self.assertEqual(after['misses'] - before['misses'], 1)
+        self.assertEqual(after['memory_hits'] - before['memory_hits'], 1)
+        self.assertEqual(after['db_hits'] - before['db_hits'], 1)
+        self.assertEqual(after['algorithm_version'], algorithm_version())
+        self.assertEqual(after['db_entries'], 1)
+        self.assertEqual(after['db_total_hits'], 1)
+        self.assertEqual(second[0].to_placements(), first[0].to_placements())
+        verify_placement(self.items[::-1], second[0].to_placements(), self.space)
+
+
+class MultiContainerTests(SimpleTestCase):
+    """多容器装箱（packing.multi）"""
+
+    def test_first_size_fits_nothing(self):
+        items = [_item(f'box-{i}', 4, 4, 4) for i in range(3)]
+        small, large = {'x': 2.0, 'y': 2.0, 'z': 2.0}, {'x': 8.0, 'y': 8.0, 'z': 8.0}
+        containers = pack_containers(items, [small, large])
+        # 任务本身的容器保留为空，物品都装进之后的容器
+        self.assertEqual(containers[0], (small, []))
+        self.assertEqual([space for space, _ in containers[1:]], [large])
+        self.assertEqual(len(containers[1][1]), 3)
+        self.assertTrue(all(is_inside(item, large) for item in containers[1][1]))
+
+    def test_distribute_keeps_size_positions(self):
+        sizes = [{'x': 10.0, 'y': 10.0, 'z': 10.0}, {'x': 2.0, 'y': 2.0, 'z': 2.0}, {'x': 10.0, 'y': 10.0, 'z': 10.0}]
+        items = [_item(f'box-{i}', 5, 5, 5) for i in range(12)]
+        jobs, deferred = distribute(items, sizes, 1, 5, 1.0)
+        # 位置 1 的容器放不下任何物品，不返回，位置 2 的容器仍按自己的位置计
+        self.assertEqual([(position, space, len(chosen)) for position, space, chosen in jobs], [(2, sizes[2], 12)])
+        self.assertEqual(deferred, [])
+
+    def test_overflow_stays_in_first_container(self):
+        items = [_item('huge', 9, 9, 9), _item('small', 1, 1, 1)]
+        space = {'x': 8.0, 'y': 8.0, 'z': 8.0}
+        containers = pack_containers(items, [space])
+        self.assertEqual(len(containers), 1)
+        placed = {item['name']: item for item in containers[0][1]}
+        self.assertTrue(is_inside(placed['small'], space))
+        self.assertFalse(is_inside(placed['huge'], space))
+
+
+def _stacked(items_data, space_dimensions, deadline=None):
+    # 所有物品都放在原点，利用率按体积计算会高于任何合法结果
+    return [_placed(index, item['name'], (0, 0, 0), [item['dimensions'][axis] for axis in 'xyz'])
+            for index, item in enumerate(items_data, start=1)]
+
+
+class PortfolioTests(SimpleTestCase):
+    """组合模式只比较通过校验的结果（packing.portfolio）"""
+
+    space = {'x': 10.0, 'y': 10.0, 'z': 10.0}
+    items = [_item(f'box-{i}', 5, 5, 5) for i in range(4)]
+
+    def test_skips_invalid_outcome(self):
+        with mock.patch.dict(portfolio.STRATEGIES, {'stacked': _stacked}):
+            result = portfolio.run_portfolio(self.items, self.space, strategies=['stacked', 'sku_blocks'])
+        self.assertEqual(result['strategy'], 'sku_blocks')
+        verify_placement(self.items, result['items'], self.space)
+        summaries = {summary['strategy']: summary for summary in result['results']}
+        self.assertGreater(summaries['stacked']['violations']['overlap'], 0)
+        self.assertNotIn('violations', summaries['sku_blocks'])
+
+    def test_raises_when_nothing_valid(self):
+        with mock.patch.dict(portfolio.STRATEGIES, {'stacked': _stacked}):
+            with self.assertRaises(PlacementError):
+                portfolio.run_portfolio(self.items, self.space, strategies=['stacked'])
+
+
+class HeightmapTests(SimpleTestCase):
+    """高度图引擎的结果满足与 place_items 相同的约束（packing.heightmap）"""
+
+    space = {'x': 12.0, 'y': 10.0, 'z': 12.0}
+
+    def _mixed_items(self):
+        items = []
+        for i in range(40):
+            items.append(_item(f'box-{i % 4}', 2 + i % 3, 1.5 + i % 2, 3 - i % 2 * 0.5))
+            if i % 5 == 0:
+                items.append(_item(f'upright-{i}', 2.5, 3.5, 1.5, face_up=True))
+            if i % 7 == 0:
+                items.append(_item(f'glass-{i}', 2, 2, 2, fragile=True))
+        return items
+
+    def test_mixed_items_non_integer_resolution(self):
+        items = self._mixed_items()
+        for resolution in (None, 0.7):
+            with self.subTest(resolution=resolution):
+                placed = pack_heightmap(items, self.space, resolution=resolution)
+                verify_placement(items, placed, self.space)
+                self.assertEqual(count_unsupported(placed, self.space), 0)
+                self.assertEqual(_above_fragile(placed, self.space), 0)
+                # 容器足够大，所有物品（包括易碎物品）都在容器内
+                self.assertTrue(all(is_inside(item, self.space) for item in placed))
+                self.assertTrue(all(item['dimensions']['y'] == 3.5 for item in placed if item['face_up']))
+
+
+class SandboxPoolTests(SimpleTestCase):
+    """超时或崩溃的子进程被替换，池继续处理之后的调用（packing.sandbox）"""
+
+    def setUp(self):
+        # 子进程按引用 unpickle 函数，使用标准库的模块级函数，不必在子进程中配置 Django
+        self.pool = SandboxPool(1, timeout=30)
+        self.addCleanup(self.pool.shutdown)
+
+    def test_timeout(self):
+        with self.assertLogs('box_back.app.packing.sandbox', 'WARNING'):
+            with self.assertRaises(PackingTimeout):
+                self.pool.submit(time.sleep, 30, timeout=0.5).result()
+        self.assertEqual(self.pool.submit(operator.add, 2, 3).result(), 5)
+
+    def test_crash(self):
+        pid = self.pool.submit(os.getpid).result()
+        with self.assertLogs('box_back.app.packing.sandbox', 'WARNING'):
+            with self.assertRaises(WorkerCrashed):
+                self.pool.submit(os._exit, 3).result()
+        # 崩溃的子进程被替换
+        self.assertNotEqual(self.pool.submit(os.getpid).result(), pid)
+        self.assertEqual(self.pool.submit(operator.add, 2, 3).result(), 5)
+
+    def test_error_keeps_worker(self):
+        with self.assertRaises(ZeroDivisionError):
+            self.pool.submit(operator.truediv, 1, 0).result()
+        pid = self.pool.submit(os.getpid).result()
+        self.assertNotEqual(pid, os.getpid())
+        self.assertEqual(self.pool.submit(os.getpid).result(), pid)
@@ -1,20 +1,33 @@
-from django.http import HttpResponse
+from django.http import HttpResponse, HttpResponseNotModified, StreamingHttpResponse
 from rest_framework import status
 from rest_framework.response import Response
 from .serializers import *
-from .models import User, Task, Item
+from .models import User, Task, AlgorithmVersion
 from drf_yasg.utils import swagger_auto_schema
 from drf_yasg import openapi
-from .packing_algorithm import place_items
+from . import algorithms, placement_cache, response_cache, shadow
+from .columnar import ColumnarRenderer, encode_task
+from .placements import task_rows
+from .response_cache import current_etag, task_etag
+from .streaming import stream_task_json
+from .pagination import TaskCursorPagination
+from .services import (TaskConflict, TaskNotReady, append_items, benchmark_uploaded_algorithm,
+                       build_job_input, check_uploaded_algorithm, compute_containers, compute_placement,
+                       create_tasks, create_task_with_containers, create_task_with_items, enqueue_task,
+                       MULTI_CONTAINER_STRATEGY)
+from .packing.sandbox import PackingTimeout, WorkerCrashed
+from .packing.verify import PlacementError
 from django.views.decorators.csrf import csrf_exempt
-from rest_framework.decorators import api_view, authentication_classes, permission_classes
+from rest_framework.decorators import api_view, authentication_classes, permission_classes, renderer_classes
+from rest_framework.renderers import BrowsableAPIRenderer, JSONRenderer
 from rest_framework.permissions import AllowAny
-import os
-import importlib.util
-import sys
 from django.conf import settings
-from django.core.files.storage import default_storage
-from django.core.files.base import ContentFile
+from django.db import OperationalError, transaction
+from django.db.models import Count, F, FloatField, Sum
+from django.db.models.functions import Coalesce
+from django.utils.cache import patch_cache_control, patch_vary_headers
+import gzip
+from rest_framework.exceptions import ValidationError
 
 
 @api_view(['GET'])
@@ -139,9 +152,23 @@ def login_user(request):
                     },
                 ),
             ),
+            'portfolio': openapi.Schema(type=openapi.TYPE_BOOLEAN, description='并行运行多种策略并取最优结果'),
+            'time_budget_ms': openapi.Schema(type=openapi.TYPE_INTEGER, description='计算时间预算（毫秒）'),
+            'run_async': openapi.Schema(type=openapi.TYPE_BOOLEAN, description='异步计算，立即返回 202 和任务 id'),
+            'multi_container': openapi.Schema(type=openapi.TYPE_BOOLEAN, description='放不下的物品装进新打开的容器'),
+            'container_sizes': openapi.Schema(
+                type=openapi.TYPE_ARRAY,
+                description='新打开容器的尺寸，依次使用，用完后重复最后一个；默认与 space_info 相同',
+                items=openapi.Schema(type=openapi.TYPE_OBJECT),
+            ),
+            'engine': openapi.Schema(
+                type=openapi.TYPE_STRING, enum=['place_items', 'extreme_point', 'heightmap'],
+                description='摆放引擎：place_items 为当前激活的算法版本，其余为内置引擎'),
+            'heightmap_resolution': openapi.Schema(type=openapi.TYPE_NUMBER,
+                                                   description='heightmap 引擎的网格边长，默认自动选择'),
         },
     ),
-    responses={201: TaskSerializer}
+    responses={201: TaskSerializer, 202: "任务已进入后台队列"}
 )
 
 @csrf_exempt
@@ -175,88 +202,256 @@ def create_task(request):
         # 获取物品信息
         items_data = validated_data['items']
         
-        # 创建任务
-        task = Task.objects.create(
+        # 异步模式：只保存任务和输入，由后台进程计算
+        if validated_data['run_async']:
+            task = Task.objects.create(
+                creator=creator,
+                worker=worker,
+                space_x=space_data['x'],
+                space_y=space_data['y'],
+                space_z=space_data['z'],
+                status=Task.STATUS_PENDING,
+                input_data=build_job_input(validated_data)
+            )
+            transaction.on_commit(lambda: enqueue_task(task.id))
+            return Response({"id": task.id, "status": task.status}, status=status.HTTP_202_ACCEPTED)
+        
+        # 使用算法模块计算物品的摆放位置（在 sandbox 子进程中运行）
+        try:
+            if validated_data['multi_container']:
+                containers, time_ms, ref = compute_containers(
+                    items_data, space_data,
+                    container_sizes=validated_data.get('container_sizes'),
+                    time_budget_ms=validated_data.get('time_budget_ms'),
+                    engine=validated_data['engine'],
+                    resolution=validated_data.get('heightmap_resolution'))
+            else:
+                placed_items, strategy, time_ms, truncated, ref = compute_placement(
+                    items_data, space_data,
+                    portfolio=validated_data['portfolio'],
+                    time_budget_ms=validated_data.get('time_budget_ms'),
+                    engine=validated_data['engine'],
+                    resolution=validated_data.get('heightmap_resolution'))
+        except PackingTimeout as e:
+            return Response({"error": str(e)}, status=status.HTTP_504_GATEWAY_TIMEOUT)
+        except WorkerCrashed as e:
+            return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        except PlacementError as e:
+            # 算法返回的结果违反约束，不保存任务
+            return Response({"error": str(e), "violations": e.violations, "overlapping_items": e.examples},
+                            status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        
+        # 多容器模式：任务本身为第一个容器，其余容器保存为子任务
+        if validated_data['multi_container']:
+            task = create_task_with_containers(
+                containers,
+                creator=creator,
+                worker=worker,
+                space_x=space_data['x'],
+                space_y=space_data['y'],
+                space_z=space_data['z'],
+                packing_strategy=MULTI_CONTAINER_STRATEGY,
+                packing_time_ms=time_ms,
+                packing_version=ref
+            )
+            data = TaskSerializer(task).data
+            data['containers'] = task_containers(task)
+            return Response(data, status=status.HTTP_201_CREATED)
+        
+        # 在同一个事务中创建任务并批量保存物品
+        task = create_task_with_items(
+            placed_items,
             creator=creator,
             worker=worker,
             space_x=space_data['x'],
             space_y=space_data['y'],
-            space_z=space_data['z']
+            space_z=space_data['z'],
+            packing_strategy=strategy,
+            packing_time_ms=time_ms,
+            packing_truncated=truncated,
+            packing_version=ref
         )
         
-        # 这里应该有算法计算物品的最佳位置和顺序
-        # 暂时使用简单规则：按输入顺序排列，简单摆放
-        # current_x = 0
-        # for index, item_data in enumerate(items_data):
-        #     # 分配顺序号（从1开始）
-        #     order_id = index + 1
-            
-        #     # 获取尺寸
-        #     dimensions = item_data['dimensions']
-            
-        #     # 计算位置（简单示例：沿X轴顺序排列）
-        #     position = {
-        #         'x': current_x,
-        #         'y': 0,
-        #         'z': 0
-        #     }
-            
-        #     # 更新下一个物品的X起始位置
-        #     current_x += dimensions['x']
-            
-        #     # 创建完整的物品数据（添加位置和顺序）
-        #     complete_item_data = {
-        #         'order_id': order_id,
-        #         'name': item_data['name'],
-        #         'position': position,
-        #         'dimensions': dimensions,
-        #         'face_up': item_data.get('face_up', False),
-        #         'fragile': item_data.get('fragile', False)
-        #     }
-            
-        #     # 保存物品到数据库
-        #     item = Item.objects.create(
-        #         task=task,
-        #         order_id=order_id,
-        #         name=item_data['name'],
-        #         position_x=position['x'],
-        #         position_y=position['y'],
-        #         position_z=position['z'],
-        #         width=dimensions['x'],
-        #         height=dimensions['y'],
-        #         depth=dimensions['z'],
-        #         face_up=item_data.get('face_up', False),
-        #         fragile=item_data.get('fragile', False)
-        #     )
-
-
-                # 使用算法模块计算物品的摆放位置
-        placed_items = place_items(items_data, space_data)
-        
-        # 保存物品到数据库
-        for item_data in placed_items:
-            Item.objects.create(
-                task=task,
-                order_id=item_data['order_id'],
-                name=item_data['name'],
-                position_x=item_data['position']['x'],
-                position_y=item_data['position']['y'],
-                position_z=item_data['position']['z'],
-                width=item_data['dimensions']['x'],
-                height=item_data['dimensions']['y'],
-                depth=item_data['dimensions']['z'],
-                face_up=item_data.get('face_up', False),
-                fragile=item_data.get('fragile', False)
-            )
-        
         # 返回完整的任务信息
         return Response(TaskSerializer(task).data, status=status.HTTP_201_CREATED)
     
     return Response(input_serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+# 批量创建任务
+@swagger_auto_schema(
+    method='post',
+    request_body=openapi.Schema(
+        type=openapi.TYPE_OBJECT,
+        required=['tasks'],
+        properties={
+            'tasks': openapi.Schema(
+                type=openapi.TYPE_ARRAY,
+                description='与 api/tasks/create/ 相同格式的任务列表',
+                items=openapi.Schema(type=openapi.TYPE_OBJECT),
+            ),
+        },
+    ),
+    responses={
+        201: "全部任务创建成功",
+        207: "部分任务失败，见每项结果",
+        400: "请求格式错误",
+    }
+)
+@csrf_exempt
+@api_view(['POST'])
+@authentication_classes([])  # 移除所有认证类
+@permission_classes([AllowAny])  # 允许任何请求
+def create_task_batch(request):
+    batch_serializer = TaskBatchInputSerializer(data=request.data)
+    if not batch_serializer.is_valid():
+        return Response(batch_serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+    # 逐项验证，错误的任务单独报告，不影响其他任务
+    entries = []
+    for task_data in batch_serializer.validated_data['tasks']:
+        input_serializer = TaskInputSerializer(data=task_data)
+        if input_serializer.is_valid():
+            entries.append(input_serializer.validated_data)
+        else:
+            entries.append({'errors': input_serializer.errors})
+
+    results = create_tasks(entries)
+    failed = sum(1 for result in results if result['status'] == 'error')
+    return Response({
+        "created": len(results) - failed,
+        "failed": failed,
+        "results": results,
+    }, status=status.HTTP_207_MULTI_STATUS if failed else status.HTTP_201_CREATED)
+
+# 向已完成的任务追加物品
+@swagger_auto_schema(
+    method='post',
+    request_body=openapi.Schema(
+        type=openapi.TYPE_OBJECT,
+        required=['items'],
+        properties={
+            'items': openapi.Schema(
+                type=openapi.TYPE_ARRAY,
+                description='与 api/tasks/create/ 相同格式的物品列表',
+                items=openapi.Schema(type=openapi.TYPE_OBJECT),
+            ),
+        },
+    ),
+    responses={
+        201: "新物品的摆放结果",
+        404: "任务不存在",
+        409: "任务尚未完成",
+    }
+)
+@csrf_exempt
+@api_view(['POST'])
+@authentication_classes([])  # 移除所有认证类
+@permission_classes([AllowAny])  # 允许任何请求
+def append_task_items(request, task_id):
+    """
+    把物品追加到已完成的任务中，已放置的物品不移动
+
+    只返回新物品的摆放结果；任务的 revision 递增，GET 的 ETag 随之变化。同一任务的并发
+    追加只有一个成功，其余返回 409，客户端重试即可。
+    """
+    input_serializer = TaskAppendInputSerializer(data=request.data)
+    if not input_serializer.is_valid():
+        return Response(input_serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        task, placed_items = append_items(task_id, input_serializer.validated_data['items'])
+    except Task.DoesNotExist:
+        return Response({"error": "Task not found"}, status=status.HTTP_404_NOT_FOUND)
+    except (TaskNotReady, TaskConflict) as e:
+        return Response({"error": str(e)}, status=status.HTTP_409_CONFLICT)
+    except OperationalError as e:
+        # SQLite 等待写锁超时（database is locked）
+        return Response({"error": f"Task {task_id} is being modified, retry the append: {e}"},
+                        status=status.HTTP_409_CONFLICT)
+    except PackingTimeout as e:
+        return Response({"error": str(e)}, status=status.HTTP_504_GATEWAY_TIMEOUT)
+    except WorkerCrashed as e:
+        return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+    except PlacementError as e:
+        return Response({"error": str(e), "violations": e.violations, "overlapping_items": e.examples},
+                        status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+    return Response({
+        "id": task.id,
+        "revision": task.revision,
+        "item_count": task.placement_count,
+        "total_volume": task.placement_volume,
+        "items": placed_items,
+    }, status=status.HTTP_201_CREATED)
+
+# ?view= 可选的输出形式
+TASK_VIEWS = {
+    'full': TaskSerializer,
+    'summary': TaskSummarySerializer,
+}
+
+def task_output_options(request):
+    """解析 ?view= 和 ?fields=，返回 (序列化器类, 字段列表)；未指定 fields 时字段列表为 None"""
+    view = request.query_params.get('view', 'full')
+    if view not in TASK_VIEWS:
+        raise ValidationError({"view": [f"Must be one of: {', '.join(TASK_VIEWS)}."]})
+    serializer_class = TASK_VIEWS[view]
+    fields = request.query_params.get('fields')
+    if not fields:
+        return serializer_class, None
+    fields = [name.strip() for name in fields.split(',') if name.strip()]
+    unknown = [name for name in fields if name not in serializer_class.Meta.fields]
+    if unknown:
+        raise ValidationError({"fields": [f"Unknown fields: {', '.join(unknown)}."]})
+    return serializer_class, fields
+
+def prepare_tasks(tasks, serializer_class, fields):
+    """
+    只加载输出字段需要的数据
+
+    物品明细由序列化器批量读取，不需要时不读取 placement_blob；物品数量和总体积
+    优先使用任务上保存的值，旧任务用数据库聚合。
+    """
+    wanted = set(fields or serializer_class.Meta.fields)
+    related = [name for name in ('creator', 'worker') if name in wanted]
+    if related:
+        tasks = tasks.select_related(*related)
+    if 'items' not in wanted:
+        tasks = tasks.defer('placement_blob')
+    # 追加物品用的引擎状态不输出
+    tasks = tasks.defer('packing_state')
+    if 'item_count' in wanted:
+        tasks = tasks.annotate(item_count=Coalesce('placement_count', Count('items')))
+    if 'total_volume' in wanted:
+        tasks = tasks.annotate(total_volume=Coalesce(
+            'placement_volume', Sum(F('items__width') * F('items__height') * F('items__depth')), 0.0,
+            output_field=FloatField()))
+    return tasks
+
+def paginated_tasks(request, tasks):
+    """按游标分页返回任务列表；每页的查询数固定，与任务和物品的数量无关"""
+    serializer_class, fields = task_output_options(request)
+    tasks = prepare_tasks(tasks, serializer_class, fields)
+    paginator = TaskCursorPagination()
+    page = paginator.paginate_queryset(tasks, request)
+    serializer = serializer_class(page, many=True, fields=fields)
+    return paginator.get_paginated_response(serializer.data)
+
+task_output_parameters = [
+    openapi.Parameter('view', openapi.IN_QUERY, description='full（默认，含物品明细）或 summary（物品数量和总体积）', type=openapi.TYPE_STRING, enum=list(TASK_VIEWS)),
+    openapi.Parameter('fields', openapi.IN_QUERY, description='只返回这些字段，逗号分隔，例如 id,creator,created_at', type=openapi.TYPE_STRING),
+]
+
+task_list_parameters = task_output_parameters + [
+    openapi.Parameter('cursor', openapi.IN_QUERY, description='上一页响应中 next/previous 链接里的游标', type=openapi.TYPE_STRING),
+    openapi.Parameter('page_size', openapi.IN_QUERY, description='每页条数', type=openapi.TYPE_INTEGER),
+]
+
 # 获取任务
 @swagger_auto_schema(
     method='get',
+    manual_parameters=task_output_parameters + [
+        openapi.Parameter('stream', openapi.IN_QUERY, description='true：流式输出 JSON；默认在物品数达到 TASK_STREAM_MIN_ITEMS 时启用', type=openapi.TYPE_BOOLEAN),
+        openapi.Parameter('format', openapi.IN_QUERY, description='columnar：列式二进制格式（见 app/columnar.py），也可通过 Accept: application/vnd.boxback.columnar 选择', type=openapi.TYPE_STRING, enum=['json', 'columnar']),
+    ],
     responses={
         200: TaskSerializer,
         404: "任务不存在"
@@ -265,19 +460,132 @@ def create_task(request):
 
 @csrf_exempt
 @api_view(['GET'])
+@renderer_classes([JSONRenderer, BrowsableAPIRenderer, ColumnarRenderer])
 @authentication_classes([])  # 移除所有认证类
 @permission_classes([AllowAny])  # 允许任何请求
 def get_task(request, task_id):
+    """
+    返回任务；已完成的任务带强 ETag，If-None-Match 匹配时返回 304
+
+    JSON 和列式格式渲染好的字节保存在本进程的 LRU 中。命中前只查询任务当前的修订号，
+    与缓存的 ETag 相同时才使用缓存（其他进程可能已修改任务），不读取物品也不序列化。
+    """
+    serializer_class, fields = task_output_options(request)
+    columnar = request.accepted_renderer.format == 'columnar'
+    use_gzip = columnar and 'gzip' in request.META.get('HTTP_ACCEPT_ENCODING', '')
+    cacheable = (request.accepted_renderer.format in ('json', 'columnar')
+                 and 'indent' not in request.accepted_media_type)
+    variant = (request.accepted_renderer.format, serializer_class.__name__,
+               tuple(fields or ()), use_gzip)
+
+    if cacheable:
+        etag = current_etag(task_id, variant)
+        if etag and etag_matches(request, etag):
+            return not_modified_response(etag, columnar)
+        cached = response_cache.get(task_id, variant) if etag else None
+        if cached is not None and cached.etag == etag:
+            return cached_task_response(request, cached)
+
+    if columnar:
+        serializer_class, fields = TaskSerializer, None
+    try:
+        task = prepare_tasks(Task.objects.filter(id=task_id), serializer_class, fields).get()
+    except Task.DoesNotExist:
+        return Response({"error": "Task not found"}, status=status.HTTP_404_NOT_FOUND)
+
+    # 未完成的任务内容还会变化，不缓存
+    etag = task_etag(task, variant) if task.status == Task.STATUS_DONE else None
+    if etag and etag_matches(request, etag):
+        return not_modified_response(etag, columnar)
+
+    if columnar:
+        task_info = TaskSerializer(task, fields=['id', 'creator', 'worker', 'space_info', 'created_at']).data
+        body = encode_task(task_info, task_rows(task))
+        headers = {'Content-Type': ColumnarRenderer.media_type}
+        if use_gzip:
+            body = gzip.compress(body, compresslevel=6)
+            headers['Content-Encoding'] = 'gzip'
+    elif should_stream(request, task, serializer_class, fields):
+        response = StreamingHttpResponse(
+            stream_task_json(task, serializer_class, fields), content_type='application/json')
+        return finish_task_response(response, etag, columnar)
+    elif cacheable:
+        body = JSONRenderer().render(serializer_class(task, fields=fields).data)
+        headers = {'Content-Type': 'application/json'}
+    else:
+        # 可浏览 API 等其他格式
+        return finish_task_response(Response(serializer_class(task, fields=fields).data), etag, columnar)
+
+    cached = response_cache.CachedResponse(etag, body, headers)
+    if etag:
+        response_cache.put(task_id, variant, cached)
+    return cached_task_response(request, cached, columnar)
+
+def etag_matches(request, etag):
+    if_none_match = request.META.get('HTTP_IF_NONE_MATCH', '')
+    return if_none_match.strip() == '*' or etag in [tag.strip() for tag in if_none_match.split(',')]
+
+def finish_task_response(response, etag, columnar):
+    """设置 ETag、Cache-Control 和 Vary"""
+    if etag:
+        response['ETag'] = etag
+        patch_cache_control(response, private=True, max_age=settings.TASK_CACHE_MAX_AGE, must_revalidate=True)
+    else:
+        patch_cache_control(response, no_store=True)
+    patch_vary_headers(response, ['Accept', 'Accept-Encoding'] if columnar else ['Accept'])
+    return response
+
+def not_modified_response(etag, columnar):
+    return finish_task_response(HttpResponseNotModified(), etag, columnar)
+
+def cached_task_response(request, cached, columnar=None):
+    if columnar is None:
+        columnar = cached.headers['Content-Type'] == ColumnarRenderer.media_type
+    if cached.etag and etag_matches(request, cached.etag):
+        return not_modified_response(cached.etag, columnar)
+    response = HttpResponse(cached.body)
+    for name, value in cached.headers.items():
+        response[name] = value
+    return finish_task_response(response, cached.etag, columnar)
+
+def should_stream(request, task, serializer_class, fields):
+    """
+    是否以流式 JSON 返回任务：?stream=true/false 指定，否则物品数达到
+    TASK_STREAM_MIN_ITEMS 时自动启用。只用于包含物品明细的 JSON 输出。
+    """
+    if request.accepted_renderer.format != 'json' or 'indent' in request.accepted_media_type:
+        return False
+    if 'items' not in (fields or serializer_class.Meta.fields):
+        return False
+    stream = request.query_params.get('stream')
+    if stream is not None:
+        return stream.lower() in ('1', 'true', 'yes')
+    return task.placement_count is not None and task.placement_count >= settings.TASK_STREAM_MIN_ITEMS
+
+# 查询异步任务的计算状态
+@swagger_auto_schema(
+    method='get',
+    responses={
+        200: TaskStatusSerializer,
+        404: "任务不存在"
+    }
+)
+
+@csrf_exempt
+@api_view(['GET'])
+@authentication_classes([])  # 移除所有认证类
+@permission_classes([AllowAny])  # 允许任何请求
+def get_task_status(request, task_id):
     try:
         task = Task.objects.get(id=task_id)
-        serializer = TaskSerializer(task)
-        return Response(serializer.data)
+        return Response(TaskStatusSerializer(task).data)
     except Task.DoesNotExist:
         return Response({"error": "Task not found"}, status=status.HTTP_404_NOT_FOUND)
 
 # 获取用户创建的所有任务
 @swagger_auto_schema(
     method='get',
+    manual_parameters=task_list_parameters,
     responses={200: TaskSerializer(many=True)}
 )
 
@@ -287,12 +595,12 @@ def get_task(request, task_id):
 @permission_classes([AllowAny])  # 允许任何请求
 def get_user_tasks(request, user_id):
     tasks = Task.objects.filter(creator_id=user_id)
-    serializer = TaskSerializer(tasks, many=True)
-    return Response(serializer.data)
+    return paginated_tasks(request, tasks)
 
 # 获取分配给工人的所有任务
 @swagger_auto_schema(
     method='get',
+    manual_parameters=task_list_parameters,
     responses={200: TaskSerializer(many=True)}
 )
 @csrf_exempt
@@ -301,8 +609,7 @@ def get_user_tasks(request, user_id):
 @permission_classes([AllowAny])  # 允许任何请求
 def get_worker_tasks(request, worker_id):
     tasks = Task.objects.filter(worker_id=worker_id)
-    serializer = TaskSerializer(tasks, many=True)
-    return Response(serializer.data)
+    return paginated_tasks(request, tasks)
 
 
 
@@ -350,42 +657,145 @@ def upload_algorithm(request):
             "error": "The algorithm file must contain a 'place_items' function with the signature: place_items(items_data, space_dimensions)"
         }, status=status.HTTP_400_BAD_REQUEST)
     
-    # 创建临时文件来验证语法
-    temp_path = os.path.join(settings.BASE_DIR, 'temp_algorithm.py')
-    with open(temp_path, 'w') as f:
-        f.write(file_content)
-    
-    # 尝试导入验证语法
+    # 在 sandbox 子进程中编译并检查 place_items，上传的代码不在 web 进程中执行
     try:
-        spec = importlib.util.spec_from_file_location("temp_algorithm", temp_path)
-        temp_module = importlib.util.module_from_spec(spec)
-        spec.loader.exec_module(temp_module)
-        
-        # 检查place_items函数是否正确定义
-        if not hasattr(temp_module, 'place_items') or not callable(getattr(temp_module, 'place_items')):
-            os.remove(temp_path)
+        error = check_uploaded_algorithm(file_content)
+    except (PackingTimeout, WorkerCrashed) as e:
+        error = f"The algorithm file contains errors: {e}"
+    if error:
+        return Response({"error": error}, status=status.HTTP_400_BAD_REQUEST)
+    
+    # 在基准套件上与激活版本比较，耗时、利用率或约束检查退化时拒绝；force=true 跳过比较
+    activate = str(request.data.get('activate', 'true')).lower() not in ('0', 'false', 'no')
+    force = str(request.data.get('force', 'false')).lower() in ('1', 'true', 'yes')
+    benchmark = None
+    if settings.ALGORITHM_BENCH_ON_UPLOAD and not force:
+        regressions, benchmark = benchmark_uploaded_algorithm(file_content)
+        if regressions:
             return Response({
-                "error": "The algorithm file must contain a callable 'place_items' function"
+                "error": "The algorithm regresses against the active version",
+                "regressions": regressions,
+                "benchmark": benchmark
             }, status=status.HTTP_400_BAD_REQUEST)
-    except Exception as e:
-        os.remove(temp_path)
-        return Response({
-            "error": f"The algorithm file contains errors: {str(e)}"
-        }, status=status.HTTP_400_BAD_REQUEST)
     
-    # 清理临时文件
-    os.remove(temp_path)
+    # 保存为新的算法版本；默认立即激活，各 worker 在下次检查激活指针时切换
+    version = algorithms.create_version(file_content, name=algorithm_file.name, activate=activate)
     
-    # 保存文件到正确位置，替换原有算法
-    algorithm_path = os.path.join(settings.BASE_DIR, 'box_back', 'app', 'packing_algorithm.py')
-    with open(algorithm_path, 'w') as f:
-        f.write(file_content)
-    
-    # 重新加载算法模块
-    if 'box_back.app.packing_algorithm' in sys.modules:
-        del sys.modules['box_back.app.packing_algorithm']
+    # 旧算法的摆放结果不再有效
+    if activate:
+        placement_cache.invalidate()
     
     return Response({
-        "message": "Algorithm updated successfully",
-        "function": "place_items"
-    }, status=status.HTTP_200_OK)
\ No newline at end of file
+        "message": "Algorithm updated successfully" if activate else "Algorithm version saved",
+        "function": "place_items",
+        "version_id": version.id,
+        "sha256": version.sha256,
+        "active": activate,
+        "benchmark": benchmark
+    }, status=status.HTTP_200_OK)
+
+
+# 算法版本列表
+@swagger_auto_schema(
+    method='get',
+    responses={200: AlgorithmVersionSerializer(many=True)}
+)
+@csrf_exempt
+@api_view(['GET'])
+@authentication_classes([])  # 移除所有认证类
+@permission_classes([AllowAny])  # 允许任何请求
+def get_algorithm_versions(request):
+    active = algorithms.active_version()
+    versions = AlgorithmVersion.objects.order_by('-id').defer('source')
+    return Response({
+        "active_version_id": active.version_id,
+        "active_sha256": active.sha256,
+        "versions": AlgorithmVersionSerializer(versions, many=True).data
+    })
+
+
+# 切换激活的算法版本（也用于回滚）
+@swagger_auto_schema(
+    method='post',
+    request_body=openapi.Schema(
+        type=openapi.TYPE_OBJECT,
+        properties={
+            'version_id': openapi.Schema(type=openapi.TYPE_INTEGER, description='要激活的版本 id，为空时恢复内置算法'),
+        }
+    ),
+    responses={200: "已切换", 404: "版本不存在"}
+)
+@csrf_exempt
+@api_view(['POST'])
+@authentication_classes([])  # 移除所有认证类
+@permission_classes([AllowAny])  # 允许任何请求
+def activate_algorithm(request):
+    version_id = request.data.get('version_id')
+    if version_id is not None and not AlgorithmVersion.objects.filter(pk=version_id).exists():
+        return Response({"error": "Algorithm version not found"}, status=status.HTTP_404_NOT_FOUND)
+    algorithms.activate_version(version_id)
+    placement_cache.invalidate()
+    return Response({"message": "Algorithm activated", "version_id": version_id})
+
+
+# 候选算法的影子运行：GET 返回当前设置及比较结果汇总，POST 设置候选版本和抽样比例
+@swagger_auto_schema(
+    method='post',
+    request_body=openapi.Schema(
+        type=openapi.TYPE_OBJECT,
+        properties={
+            'version_id': openapi.Schema(type=openapi.TYPE_INTEGER, description='候选版本 id，为空时停止影子运行'),
+            'sample_rate': openapi.Schema(type=openapi.TYPE_NUMBER, description='参与比较的请求比例，0 到 1'),
+        }
+    ),
+    responses={200: "已设置", 400: "参数错误", 404: "版本不存在"}
+)
+@swagger_auto_schema(
+    method='get',
+    manual_parameters=[
+        openapi.Parameter('version_id', openapi.IN_QUERY, type=openapi.TYPE_INTEGER,
+                          description='要汇总的候选版本，默认为当前影子运行的版本'),
+    ],
+    responses={200: "影子运行的设置及 p50/p95 耗时差、利用率差"}
+)
+@csrf_exempt
+@api_view(['GET', 'POST'])
+@authentication_classes([])  # 移除所有认证类
+@permission_classes([AllowAny])  # 允许任何请求
+def shadow_algorithm(request):
+    if request.method == 'POST':
+        version_id = request.data.get('version_id')
+        try:
+            sample_rate = float(request.data.get('sample_rate', 0.1))
+        except (TypeError, ValueError):
+            sample_rate = -1
+        if not 0 <= sample_rate <= 1:
+            return Response({"error": "sample_rate must be between 0 and 1"}, status=status.HTTP_400_BAD_REQUEST)
+        if version_id is not None and not AlgorithmVersion.objects.filter(pk=version_id).exists():
+            return Response({"error": "Algorithm version not found"}, status=status.HTTP_404_NOT_FOUND)
+        algorithms.set_shadow(version_id, sample_rate)
+
+    candidate = algorithms.shadow_version()
+    version_id = request.query_params.get('version_id') or (candidate.version_id if candidate else None)
+    if version_id is not None and not str(version_id).isdigit():
+        return Response({"error": "version_id must be an integer"}, status=status.HTTP_400_BAD_REQUEST)
+    return Response({
+        "shadow_version_id": candidate.version_id if candidate else None,
+        "sample_rate": candidate.sample_rate if candidate else 0,
+        "summary": shadow.summary(int(version_id)) if version_id is not None else None
+    })
+
+
+# 摆放结果缓存的命中统计
+@swagger_auto_schema(
+    method='get',
+    responses={
+        200: openapi.Response(description="本进程的命中/未命中计数及数据库中的缓存概况")
+    }
+)
+@csrf_exempt
+@api_view(['GET'])
+@authentication_classes([])  # 移除所有认证类
+@permission_classes([AllowAny])  # 允许任何请求
+def get_placement_cache_stats(request):
+    return Response(placement_cache.stats())
\ No newline at end of file
@@ -175,6 +175,66 @@ REST_FRAMEWORK = {
     # 'UNAUTHENTICATED_USER': None,  # 对于未认证的请求，不创建匿名用户
 }
 
+# 运行装箱算法的 sandbox 子进程池大小，默认为CPU核数；为 0 时在 web 进程内运行（仅用于调试）
+PACKING_PORTFOLIO_WORKERS = int(os.environ.get('PACKING_PORTFOLIO_WORKERS', os.cpu_count() or 1))
+
+# 异步装箱任务在 web 进程内的后台线程数；为 0 时只由 manage.py packing_worker 处理
+PACKING_JOB_WORKERS = int(os.environ.get('PACKING_JOB_WORKERS', 2))
+
+# 保存任务物品时每条 INSERT 语句包含的行数
+PACKING_ITEM_BATCH_SIZE = int(os.environ.get('PACKING_ITEM_BATCH_SIZE', 500))
+
+# 批量创建接口一次最多接受的任务数
+PACKING_BATCH_MAX_TASKS = int(os.environ.get('PACKING_BATCH_MAX_TASKS', 100))
+
+# 摆放结果缓存：本进程 LRU 的条目数上限，以及缓存结果的有效期（秒）
+PLACEMENT_CACHE_ENABLED = os.environ.get('PLACEMENT_CACHE_ENABLED', '1') != '0'
+PLACEMENT_CACHE_SIZE = int(os.environ.get('PLACEMENT_CACHE_SIZE', 256))
+PLACEMENT_CACHE_TTL = int(os.environ.get('PLACEMENT_CACHE_TTL', 7 * 24 * 3600))
+
+# 任务列表每页的默认条数和最大条数（?page_size=）
+TASK_LIST_PAGE_SIZE = int(os.environ.get('TASK_LIST_PAGE_SIZE', 20))
+TASK_LIST_MAX_PAGE_SIZE = int(os.environ.get('TASK_LIST_MAX_PAGE_SIZE', 100))
+
+# 摆放结果的保存方式：rows 为每个物品一行 Item，blob 为任务上的一个压缩列式 blob
+PLACEMENT_STORAGE = os.environ.get('PLACEMENT_STORAGE', 'rows')
+PLACEMENT_BLOB_COMPRESSION = int(os.environ.get('PLACEMENT_BLOB_COMPRESSION', 6))
+
+# 物品数达到 TASK_STREAM_MIN_ITEMS 的任务以流式 JSON 返回，每次从数据库读取并输出 TASK_STREAM_CHUNK_SIZE 个物品
+TASK_STREAM_MIN_ITEMS = int(os.environ.get('TASK_STREAM_MIN_ITEMS', 20000))
+TASK_STREAM_CHUNK_SIZE = int(os.environ.get('TASK_STREAM_CHUNK_SIZE', 2000))
+
+# get_task 渲染结果的进程内缓存：总字节数上限和有效期（秒）；客户端缓存的 max-age（秒），0 表示每次重新验证
+TASK_RESPONSE_CACHE_BYTES = int(os.environ.get('TASK_RESPONSE_CACHE_BYTES', 64 * 1024 * 1024))
+TASK_RESPONSE_CACHE_TTL = int(os.environ.get('TASK_RESPONSE_CACHE_TTL', 300))
+TASK_CACHE_MAX_AGE = int(os.environ.get('TASK_CACHE_MAX_AGE', 0))
+
+# 每个进程检查数据库中激活算法指针的最短间隔（秒）
+ALGORITHM_POLL_INTERVAL = float(os.environ.get('ALGORITHM_POLL_INTERVAL', 1.0))
+
+# sandbox 子进程的限制：每次调用的墙钟时限和 CPU 时间（秒）、地址空间上限（MB），
+# 以及子进程被替换前最多处理的调用数；为 0 表示不限制
+PACKING_TIMEOUT_S = float(os.environ.get('PACKING_TIMEOUT_S', 60))
+PACKING_CPU_LIMIT_S = int(os.environ.get('PACKING_CPU_LIMIT_S', 60))
+PACKING_MEMORY_LIMIT_MB = int(os.environ.get('PACKING_MEMORY_LIMIT_MB', 2048))
+PACKING_WORKER_MAX_CALLS = int(os.environ.get('PACKING_WORKER_MAX_CALLS', 1000))
+
+# 上传算法时先在小规模基准套件上与激活版本比较，退化时拒绝（上传时 force=true 可跳过）：
+# 总耗时不得超过激活版本的 ALGORITHM_BENCH_MAX_SLOWDOWN 倍，平均利用率下降不得超过 ALGORITHM_BENCH_MAX_UTILIZATION_DROP
+ALGORITHM_BENCH_ON_UPLOAD = os.environ.get('ALGORITHM_BENCH_ON_UPLOAD', '1') != '0'
+ALGORITHM_BENCH_MAX_SLOWDOWN = float(os.environ.get('ALGORITHM_BENCH_MAX_SLOWDOWN', 1.5))
+ALGORITHM_BENCH_MAX_UTILIZATION_DROP = float(os.environ.get('ALGORITHM_BENCH_MAX_UTILIZATION_DROP', 0.02))
+
+# 候选算法影子运行的后台线程数（同时也是其独立子进程池的大小），以及最多积压的样本数
+SHADOW_WORKERS = int(os.environ.get('SHADOW_WORKERS', 1))
+SHADOW_MAX_PENDING = int(os.environ.get('SHADOW_MAX_PENDING', 100))
+
+# 保存前校验算法返回的摆放结果（物品齐全、尺寸和 face_up、容器边界、互不重叠），违反约束时不保存
+PLACEMENT_VERIFY = os.environ.get('PLACEMENT_VERIFY', '1') != '0'
+
+# 多容器模式最多打开的容器数（包括任务本身的容器）
+PACKING_MAX_CONTAINERS = int(os.environ.get('PACKING_MAX_CONTAINERS', 20))
+
 # 为Swagger特别设置权限
 REST_FRAMEWORK_SWAGGER = {
     'DEFAULT_AUTO_SCHEMA_CLASS': 'rest_framework.schemas.coreapi.AutoSchema',
@@ -51,12 +51,19 @@ urlpatterns = [
     
     # 任务相关API
     path('api/tasks/create/', views.create_task),
+    path('api/tasks/batch/', views.create_task_batch),
     path('api/tasks/<int:task_id>/', views.get_task),
+    path('api/tasks/<int:task_id>/status/', views.get_task_status),
+    path('api/tasks/<int:task_id>/items/', views.append_task_items),
     path('api/users/<int:user_id>/tasks/', views.get_user_tasks),
     path('api/workers/<int:worker_id>/tasks/', views.get_worker_tasks),
     
     # alg api
     path('api/algorithm/upload/', views.upload_algorithm, name='upload_algorithm'),
+    path('api/algorithm/versions/', views.get_algorithm_versions),
+    path('api/algorithm/activate/', views.activate_algorithm),
+    path('api/algorithm/shadow/', views.shadow_algorithm),
+    path('api/algorithm/cache/stats/', views.get_placement_cache_stats),
 
     # Swagger URLs
     re_path(r'^swagger(?P<format>\.json|\.yaml)$', schema_view.without_ui(cache_timeout=0), name='schema-json'),
@@ -137,18 +137,27 @@ const WorkerConsole = () => {
             setLoading(true);
             setError(null);
             
-            const response = await fetch(`${API_BASE_URL}/api/workers/${workerId}/tasks/`);
-                        
-            if (!response.ok) {
-                throw new Error(`Failed to fetch tasks: ${response.statusText}`);
-            }
-            
-            const data = await response.json();
-            setWorkerTasks(data);
+            // 任务列表按游标分页，沿 next 链接取完所有页；只取 next 中的查询参数，
+            // 请求仍然发往 API_BASE_URL
+            const tasksUrl = `${API_BASE_URL}/api/workers/${workerId}/tasks/`;
+            const tasks = [];
+            let query = '';
+            do {
+                const response = await fetch(`${tasksUrl}${query}`);
+                
+                if (!response.ok) {
+                    throw new Error(`Failed to fetch tasks: ${response.statusText}`);
+                }
+                
+                const data = await response.json();
+                tasks.push(...data.results);
+                query = data.next ? new URL(data.next).search : '';
+            } while (query);
+            setWorkerTasks(tasks);
             
             // If tasks available, select the first one by default
-            if (data.length > 0) {
-                handleSelectTask(data[0]);
+            if (tasks.length > 0) {
+                handleSelectTask(tasks[0]);
             }
         } catch (err) {
             console.error('Error fetching worker tasks:', err);